@@ -2,11 +2,16 @@ import random
 import string
 import argparse
 
+
+def generate_etl_batch_id():
+    return ''.join(random.choice(string.ascii_uppercase + string.ascii_lowercase + string.digits) for _ in range(11))
+
+
 class ArgumentParser:
     def __init__(self):
         self.parser = argparse.ArgumentParser()
         self._setup_arguments()
-        self.etl_batch_id = self._generate_etl_batch_id()
+        self.etl_batch_id = generate_etl_batch_id()
     
     def _setup_arguments(self):
         self.parser.add_argument('-s', '--sources', help="IDs of sources to process, delimited by ','")
@@ -19,12 +24,28 @@ class ArgumentParser:
         self.parser.add_argument('-f', '--failed', action='store_true', help='Run only failed items in the Control table')
         self.parser.add_argument('-d', '--delimiter', help='Character used to specify multiple sources in "--sources" switch (default: ,)', default=',')
         self.parser.add_argument('--list_sources', action='store_true', help='List all Source IDs available in the Control Table')
+        self.parser.add_argument('--snapshot', action='store_true', help='Reuse the local control-plan snapshot while it is fresh, else query the control tables and save one (see etl.control_snapshot)')
+        self.parser.add_argument('--refresh_snapshot', action='store_true', help='Query the control tables and overwrite the local control-plan snapshot')
         self.parser.add_argument('-p', '--parallel', action='store_true', help='Spawn separate process for handling each source')
+        self.parser.add_argument('-w', '--workers', type=int, default=8, help='Maximum number of sources processed concurrently with --parallel (default: 8)')
+        self.parser.add_argument('-e', '--executor', choices=['thread', 'process'], default='thread', help='Run parallel sources on threads or on separate processes (process implies --parallel)')
         self.parser.add_argument('-u', '--user_agent', help="User Agent", default='terminal')
+        self.parser.add_argument('--chunksize', type=int, help='Rows fetched per batch when streaming from a source (default: etl.chunksize in config)')
+        self.parser.add_argument('--batch_mb', type=float, help='Memory budget in MB per in-flight batch, 0 to size batches by rows only (default: etl.batch_mb in config)')
+        self.parser.add_argument('--partitions', type=int, help='Split each DB table into N key ranges extracted and loaded concurrently (default: etl.partitions in config)')
+        self.parser.add_argument('--writer', choices=['copy', 'multi', 'to_sql', 'clickhouse'], help='Staging writer: COPY FROM STDIN, multi-row INSERT, plain to_sql or ClickHouse native inserts (default: etl.writer in config)')
+        self.parser.add_argument('--pipeline', choices=['pandas', 'arrow'], help='Batch format for DB sources: pandas DataFrames or Arrow record batches end to end (default: etl.pipeline in config)')
+        self.parser.add_argument('--load_mode', choices=['append', 'swap', 'merge'], help='Append to the staging table, refresh full loads through a shadow table swapped in atomically, or upsert only new and changed rows by primary key (default: etl.load_mode in config)')
+        self.parser.add_argument('--checkpoints', action='store_true', help='Load with chunk checkpoints, so an interrupted object resumes where it stopped (default: etl.checkpoints in config)')
+        self.parser.add_argument('--no_checkpoints', action='store_true', help='Load without chunk checkpoints, so an interrupted object is reloaded from scratch (default: etl.checkpoints in config)')
+        self.parser.add_argument('--stage', choices=['extract', 'load', 'all'], help='extract lands source data as Parquet under etl.landing.root, load moves landed batches into staging, all does both (default: etl.stage in config, else all)')
+        self.parser.add_argument('--replay', action='store_true', help='With --stage load, reload the newest landed batch of each object even if it was loaded before')
+        self.parser.add_argument('--no_audit', action='store_true', help='Do not record start/end/error audit events for this run')
+        self.parser.add_argument('--profile', help='SourceId or TargetObject to profile; the capture is written to the log (and a .prof file for cProfile)')
+        self.parser.add_argument('--profile_mode', choices=['cprofile', 'tracemalloc'], help='Profiler used with --profile (default: etl.profile_mode in config, else cprofile)')
     
     def parse_args(self):
-        return self.parser.parse_args()
-    
-    def _generate_etl_batch_id(self):
-        return ''.join(random.choice(string.ascii_uppercase + string.ascii_lowercase + string.digits) for _ in range(11))
+        args = self.parser.parse_args()
+        args.etl_batch_id = self.etl_batch_id
+        return args
 
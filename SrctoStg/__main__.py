@@ -1,17 +1,104 @@
 import sys
 import time
+import datetime as dt
+import threading
+import multiprocessing
 import concurrent.futures
-from SrctoStg.db import DatabaseETL
+from collections import Counter
+from SrctoStg.audit import AuditWriter
 from SrctoStg.onesource import OneSource
+from SrctoStg.scheduler import DagScheduler
+from SrctoStg.snapshot import ControlPlanSnapshot
 from SrctoStg.connections import DBConnectionManager
 from SrctoStg import ArgumentParser
 from SrctoStg.logs import LoggerManager
+from SrctoStg.metrics import metrics, peak_rss_mb
 
 class ETLRunner:
     def __init__(self, args):
         self.args = args
         self.logger = LoggerManager().logger
-        self.db = None
+        self.catalog_objects = None
+
+    def etl_options(self):
+        """Runtime options forwarded to every DatabaseETL instance."""
+        return {
+            'chunksize': self.args.chunksize,
+            'batch_mb': self.args.batch_mb,
+            'writer': self.args.writer,
+            'partitions': self.args.partitions,
+            'pipeline': self.args.pipeline,
+            'profile': self.args.profile,
+            'profile_mode': self.args.profile_mode,
+            'checkpoints': False if self.args.no_checkpoints else True if self.args.checkpoints else None,
+            'load_mode': self.args.load_mode,
+            'catalog_objects': self.catalog_objects,
+            'stage': self.args.stage,
+            'replay': self.args.replay or None,
+            'etl_batch_id': self.args.etl_batch_id,
+        }
+
+    @staticmethod
+    def plan_catalog(records):
+        """Source objects of the run per SourceType; each source connection fetches their catalog in one query."""
+        objects = {}
+        for record in records:
+            if record.sourceschema and record.sourceobject:
+                objects.setdefault(record.sourcetype, set()).add((record.sourceschema, record.sourceobject))
+        return {sourcetype: sorted(names) for sourcetype, names in objects.items()}
+
+    def control_snapshot(self):
+        """Control-plan snapshot for this run (--snapshot, --refresh_snapshot or etl.control_snapshot.enabled), else None."""
+        settings = (DBConnectionManager().config.get('etl') or {}).get('control_snapshot') or {}
+        if not (self.args.snapshot or self.args.refresh_snapshot or settings.get('enabled')):
+            return None
+        return ControlPlanSnapshot.from_config(settings, refresh=self.args.refresh_snapshot)
+
+    def audit_writer(self, etl_batch_id):
+        """Background audit writer for this run, or None when auditing is disabled (etl.audit.enabled / --no_audit)."""
+        settings = (DBConnectionManager().config.get('etl') or {}).get('audit') or {}
+        if self.args.no_audit or not settings.get('enabled', True):
+            return None
+        return AuditWriter(
+            self.args.user_agent,
+            etl_batch_id,
+            batch_size=settings.get('batch_size', 50),
+            max_pending=settings.get('max_pending', 1000),
+        )
+
+    @staticmethod
+    def row_counts(record, outcome):
+        """``(source_count, insert_count, update_count)`` for a finished record.
+
+        Rows read come from the stage metrics. Merge loads count the rows they actually inserted and
+        updated; other loads insert every row they write.
+        """
+        label = DagScheduler.label(record)
+        if isinstance(outcome, tuple):
+            rows, report = outcome
+        else:
+            rows, report = outcome, metrics.report([label])
+        entry = next((entry for entry in report if entry['object'] == label), {})
+        stages, counters = entry.get('stages', {}), entry.get('counters', {})
+        return stages.get('read', {}).get('rows', rows), counters.get('inserted', rows), counters.get('updated', 0)
+
+    def concurrency_limits(self, record):
+        """Concurrency caps for a record from etl.max_per_source_type and etl.max_per_connection."""
+        config = DBConnectionManager().config
+        settings = config.get('etl') or {}
+        limits = []
+
+        cap = (settings.get('max_per_source_type') or {}).get(record.sourcetype)
+        if cap:
+            limits.append((f"type:{record.sourcetype}", int(cap)))
+
+        connection = ((config.get(record.sourcetype) or {}).get('connection')) or {}
+        if connection.get('host'):
+            server = f"{connection['host']}:{connection.get('port')}"
+            cap = (settings.get('max_per_connection') or {}).get(server)
+            if cap:
+                limits.append((f"connection:{server}", int(cap)))
+        return limits
 
     def toggle_db_restore_schedule(self, dbs, enable):
         """Toggle the restore schedule for the given databases."""
@@ -28,7 +115,8 @@ class ETLRunner:
 
     def run(self):
         """Main ETL execution logic."""
-        records = OneSource().control_entries(
+        onesource = OneSource(self.args.etl_batch_id)
+        records = onesource.control_entries(
             'SRCtoStg',
             self.args.sources and self.args.sources.split(self.args.delimiter),
             self.args.groups and self.args.groups.split(self.args.delimiter),
@@ -38,6 +126,7 @@ class ETLRunner:
             self.args.calling_sequence and self.args.calling_sequence.split(self.args.delimiter),
             self.args.loadfrequency,
             self.args.failed,
+            snapshot=self.control_snapshot(),
         )
 
         if not records:
@@ -51,39 +140,119 @@ class ETLRunner:
                 self.logger.info(f"{record.dataflowflag:<20} - {record.sourceid}")
             sys.exit(0)
 
+        self.catalog_objects = self.plan_catalog(records)
+        started_at = dt.datetime.now().isoformat(timespec='seconds')
         time_start = time.perf_counter()
 
+        # ✅ pandas, pyarrow and the extractors load only once there is data to move, not for --list_sources
+        from SrctoStg import worker
+        from SrctoStg.db import DatabaseETL
+
+        local = threading.local()
+
         def process_record(record):
-            """Process a single record from source to staging."""
-            try:
-                db = DatabaseETL(record.sourcetype)  # Initialize inside the function
-                db.copy_single_record_from_source(record)
-                self.logger.info(f"✅ Successfully processed record: {record.sourceobject}")
-            except Exception as e:
-                self.logger.error(f"❌ Error processing record {record.sourceobject}: {e}")
-
-        if self.args.parallel:
-            # Parallel execution using threads
-            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(records), 8)) as executor:
-                try:
-                    executor.map(process_record, records)
-                    self.logger.info("✅ Finished running source to staging in parallel.")
-                except Exception as e:
-                    self.logger.error(f"❌ Parallel processing error: {e}")
-        else:
-            # Serial execution with optimized DB initialization
-            previous_sourcetype = None
-            for record in records:
-                if record.sourcetype != previous_sourcetype:
-                    self.db = DatabaseETL(record.sourcetype)  # Reinitialize only when sourcetype changes
-                    previous_sourcetype = record.sourcetype  # Update tracker
-                
-                self.db.copy_single_record_from_source(record)  # Process record
-            
-            self.logger.info("✅ Finished running source to staging in series.")
+            """Process a single record from source to staging, reusing one DatabaseETL per source type and thread."""
+            etls = local.__dict__.setdefault('etls', {})
+            if record.sourcetype not in etls:
+                etls[record.sourcetype] = DatabaseETL(record.sourcetype, **self.etl_options())
+            rows = etls[record.sourcetype].copy_single_record_from_source(record)
+            self.logger.info(f"✅ Successfully processed record: {record.sourceobject}")
+            return rows
+
+        # Dependency-aware execution: independent branches run concurrently, serial mode is a width of 1
+        parallel = self.args.parallel or self.args.executor == 'process'
+        workers = max(1, min(len(records), self.args.workers)) if parallel else 1
+        scheduler = DagScheduler(records, max_workers=workers, delimiter=self.args.delimiter, limits=self.concurrency_limits)
+
+        audit = self.audit_writer(onesource.etl_batch_id)
+        batch_ids = {}
+
+        def on_start(record):
+            if audit is not None:
+                batch_ids[DagScheduler.label(record)] = audit.start(record)
+
+        def on_finish(record, status, outcome):
+            if audit is None:
+                return
+            batch_id = batch_ids.pop(DagScheduler.label(record))
+            if status == DagScheduler.SUCCEEDED:
+                source_count, insert_count, update_count = self.row_counts(record, outcome)
+                audit.end(record, batch_id, source_count=source_count, insert_count=insert_count, update_count=update_count)
+            else:
+                audit.error(record, batch_id, outcome)
+
+        try:
+            if self.args.executor == 'process':
+                # GIL-bound pandas work scales across cores; each process builds its DatabaseETLs once per source type.
+                # Workers start from a clean interpreter: forking here would copy the running audit writer thread's locks.
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context(start_method),
+                    initializer=worker.init_worker, initargs=(self.etl_options(),),
+                ) as executor:
+                    results = scheduler.run(worker.process_record, executor, payload=lambda record: record._asdict(), on_start=on_start, on_finish=on_finish)
+            else:
+                results = scheduler.run(process_record, on_start=on_start, on_finish=on_finish)
+        finally:
+            if audit is not None:
+                audit.close()
+
+        if self.args.executor == 'process':
+            # ✅ Workers return their stage metrics alongside the row count
+            for label, (status, outcome) in results.items():
+                if status == DagScheduler.SUCCEEDED:
+                    rows, report = outcome
+                    metrics.merge(report)
+                    results[label] = (status, rows)
+
+        statuses = Counter(status for status, _ in results.values())
+        self.logger.info(
+            "✅ Finished running source to staging %s: %d succeeded, %d failed, %d skipped.",
+            f"with {workers} {self.args.executor} workers" if parallel else "in series",
+            statuses[DagScheduler.SUCCEEDED], statuses[DagScheduler.FAILED], statuses[DagScheduler.SKIPPED],
+        )
+        for label, (status, outcome) in results.items():
+            if status != DagScheduler.SUCCEEDED:
+                self.logger.error(f"❌ {label} {status}: {outcome}")
 
         time_end = time.perf_counter()
         self.logger.info("⏱️ Total time taken: %.2f seconds", (time_end - time_start))
+        pool_stats = DBConnectionManager().pool_stats()
+        for location, stats in pool_stats.items():
+            self.logger.info("🔌 Pool %s: %s", location, stats)
+
+        self.save_run_report(results, started_at, time_end - time_start, workers if parallel else 1, pool_stats)
+
+    def save_run_report(self, results, started_at, seconds, workers, pool_stats):
+        """Writes the machine-readable run report (per-object stage timings, rows, bytes, RSS) to Logs/*.json."""
+        objects = {entry['object']: entry for entry in metrics.report()}
+        entries = []
+        for label, (status, outcome) in results.items():
+            entry = objects.pop(label, {'object': label, 'seconds': 0.0, 'peak_rss_mb': None, 'stages': {}})
+            entries.append({
+                **entry,
+                'status': status,
+                'rows': outcome if status == DagScheduler.SUCCEEDED else None,
+                'error': None if status == DagScheduler.SUCCEEDED else str(outcome),
+            })
+        entries.extend(objects.values())
+
+        statuses = Counter(status for status, _ in results.values())
+        log_manager = LoggerManager()
+        log_manager.log_event(
+            event='run_report',
+            started_at=started_at,
+            seconds=round(seconds, 2),
+            executor=self.args.executor,
+            workers=workers,
+            succeeded=statuses[DagScheduler.SUCCEEDED],
+            failed=statuses[DagScheduler.FAILED],
+            skipped=statuses[DagScheduler.SKIPPED],
+            peak_rss_mb=peak_rss_mb(),
+            pools=pool_stats,
+            objects=entries,
+        )
+        log_manager.save_logs()
 
 if __name__ == "__main__":
     arg_parser = ArgumentParser()
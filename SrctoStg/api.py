@@ -0,0 +1,250 @@
+import json
+import time
+import asyncio
+import threading
+import requests
+from urllib.parse import parse_qsl, urljoin
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from SrctoStg.logs import LoggerManager
+
+
+class APIExtractor:
+    """Fetches API records over a pooled keep-alive session and follows pagination.
+
+    Pagination is described per SourceType (or TargetObject) with a dict:
+
+        type:          none | link | cursor | next_url | offset | page
+        records:       dotted path to the record list in the response body (default: the body)
+        cursor:        dotted path to the next cursor (cursor)
+        cursor_param:  query parameter that carries the cursor (cursor)
+        next_url:      dotted path to the next page URL, absolute or relative (next_url)
+        size_param:    query parameter for the page size (offset, page, cursor)
+        offset_param:  query parameter for the row offset (offset)
+        page_param:    query parameter for the page number (page)
+        first_page:    number of the first page (page, default 1)
+        total:         dotted path to the total record count, when the server reports one (offset, page)
+        has_more:      dotted path to a "more pages" flag, when the server reports one (offset, page)
+
+    Offset and page pagination fetch the first page alone, then ``concurrency`` pages at a time with
+    asyncio. Offsets advance by the size of the first page, so a server that caps the page size
+    below ``page_size`` is paged correctly. Paging stops at an empty page, when ``has_more`` is false
+    or once ``total`` records have arrived; a 4xx error (other than 429) past the last page with
+    records is taken as the end of the data. Cursor, link and next_url pagination are inherently
+    sequential. 429 and 5xx responses are retried with exponential backoff, honouring Retry-After.
+    """
+
+    DEFAULT_PAGINATION = {
+        "Hubspot": {"type": "cursor", "records": "results", "cursor": "paging.next.after", "cursor_param": "after", "size_param": "limit"},
+        "Salesforce": {"type": "next_url", "records": "records", "next_url": "nextRecordsUrl"},
+        "KEKA": {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"},
+        "API": {"type": "link"},
+    }
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.logger = LoggerManager().logger
+        self.page_size = int(settings.get("page_size") or 100)
+        self.concurrency = max(1, int(settings.get("concurrency") or 4))
+        self.rate_limit = float(settings.get("rate_limit") or 0)
+        self.timeout = float(settings.get("timeout") or 60)
+        self.pagination = settings.get("pagination") or {}
+
+        retry = Retry(
+            total=int(settings.get("retries") or 5),
+            backoff_factor=float(settings.get("backoff") or 0.5),
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=None,  # retry POST searches too; they are read-only here
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._next_request_at = 0.0
+        self._throttle_lock = threading.Lock()
+
+    def close(self):
+        self.session.close()
+
+    def pagination_for(self, record):
+        """Returns the pagination spec for a record: config by TargetObject, then by SourceType, then the defaults."""
+        return (
+            self.pagination.get(record.targetobject)
+            or self.pagination.get(record.sourcetype)
+            or self.DEFAULT_PAGINATION.get(record.sourcetype)
+            or {"type": "link"}
+        )
+
+    def extract(self, record):
+        """Yields pages (lists of JSON records) for an API record in page order."""
+        spec = self.pagination_for(record)
+        kind = spec.get("type", "none")
+        request = self._base_request(record)
+
+        if kind in ("offset", "page"):
+            yield from self._extract_numbered(request, spec, kind)
+            return
+
+        url, params = request["url"], dict(request["params"])
+        if kind == "cursor" and spec.get("size_param"):
+            params[spec["size_param"]] = self.page_size
+        while url:
+            response = self._request({**request, "url": url, "params": params})
+            body = response.json()
+            yield self._records(body, spec)
+
+            if kind == "cursor":
+                cursor = self._lookup(body, spec.get("cursor"))
+                url = url if cursor else None
+                params = {**params, spec.get("cursor_param", "after"): cursor}
+            elif kind == "next_url":
+                next_url = self._lookup(body, spec.get("next_url"))
+                url, params = (urljoin(url, next_url), {}) if next_url else (None, params)
+            elif kind == "link":
+                next_link = response.links.get("next", {}).get("url")
+                url, params = (urljoin(url, next_link), {}) if next_link else (None, params)
+            else:
+                url = None
+
+    def _extract_numbered(self, request, spec, kind):
+        """Fetches offset/page-number pages concurrently, ``concurrency`` pages per window after the first."""
+        size_param = spec.get("size_param", "limit")
+        number = 0 if kind == "offset" else int(spec.get("first_page", 1))
+
+        def page_request(number):
+            number_param = spec.get("offset_param", "offset") if kind == "offset" else spec.get("page_param", "page")
+            return {**request, "params": {**request["params"], number_param: number, size_param: self.page_size}}
+
+        # ✅ The first page gives the page size the server actually serves, and the total when reported
+        body = self._request(page_request(number)).json()
+        records = self._records(body, spec)
+        if not records:
+            return
+        yield records
+        fetched = per_page = len(records)
+        step = per_page if kind == "offset" else 1
+        number += step
+        if self._last_page(body, spec, fetched):
+            return
+
+        loop = asyncio.new_event_loop()
+        try:
+            while True:
+                size = self.concurrency
+                total = self._lookup(body, spec.get("total"))
+                if total is not None:
+                    # ✅ Fetch no more pages than the reported total still needs
+                    size = min(size, max(1, -(-(int(total) - fetched) // per_page)))
+                window = [page_request(number + i * step) for i in range(size)]
+                number += size * step
+
+                pages = loop.run_until_complete(self._fetch_window(window))
+                for i, body in enumerate(pages):
+                    if isinstance(body, Exception):
+                        if self._past_end(body) and not any(
+                            not isinstance(later, Exception) and self._records(later, spec) for later in pages[i + 1:]
+                        ):
+                            self.logger.warning(f"⚠️ {body} past the last page of {request['url']}; treating it as the end of the data")
+                            return
+                        raise body
+                    records = self._records(body, spec)
+                    if not records:
+                        return
+                    yield records
+                    fetched += len(records)
+                    if self._last_page(body, spec, fetched):
+                        return
+        finally:
+            loop.close()
+
+    def _last_page(self, body, spec, fetched):
+        """Whether the server reports no pages after ``body``: ``has_more`` false, or ``total`` records fetched."""
+        has_more = self._lookup(body, spec.get("has_more"))
+        if has_more is not None and not has_more:
+            return True
+        total = self._lookup(body, spec.get("total"))
+        return total is not None and fetched >= int(total)
+
+    @staticmethod
+    def _past_end(error):
+        """Client errors other than 429 are what servers return for a page number or offset beyond the data."""
+        response = getattr(error, "response", None)
+        return isinstance(error, requests.HTTPError) and response is not None and 400 <= response.status_code < 500 and response.status_code != 429
+
+    async def _fetch_window(self, window):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(request):
+            async with semaphore:
+                response = await asyncio.to_thread(self._request, request)
+                return response.json()
+
+        return await asyncio.gather(*(fetch(request) for request in window), return_exceptions=True)
+
+    def _throttle(self):
+        """Spaces requests so no more than ``rate_limit`` start per second, across threads."""
+        if not self.rate_limit:
+            return
+        with self._throttle_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at)
+            self._next_request_at = start_at + 1 / self.rate_limit
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def _request(self, request):
+        self._throttle()
+        response = self.session.request(
+            request["method"],
+            request["url"],
+            params=request["params"] or None,
+            json=request["body"],
+            headers=request["headers"],
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response
+
+    def _base_request(self, record):
+        headers = {"Accept": "application/json"}
+        if record.apiaccesstoken:
+            headers["Authorization"] = f"Bearer {record.apiaccesstoken}"
+        return {
+            "method": (record.apimethod or "GET").upper(),
+            "url": record.apiurl,
+            "params": self._parse_params(record.apiqueryparameters),
+            "body": json.loads(record.apirequestbody) if record.apirequestbody else None,
+            "headers": headers,
+        }
+
+    @staticmethod
+    def _parse_params(raw):
+        """Accepts query parameters as a JSON object or as ``a=1&b=2``."""
+        if not raw:
+            return {}
+        if isinstance(raw, dict):
+            return dict(raw)
+        try:
+            return dict(json.loads(raw))
+        except ValueError:
+            return dict(parse_qsl(str(raw).lstrip("?")))
+
+    @classmethod
+    def _records(cls, body, spec):
+        records = cls._lookup(body, spec.get("records")) if spec.get("records") else body
+        if records is None:
+            return []
+        return records if isinstance(records, list) else [records]
+
+    @staticmethod
+    def _lookup(body, path):
+        if not path:
+            return None
+        for key in path.split("."):
+            if not isinstance(body, dict):
+                return None
+            body = body.get(key)
+        return body
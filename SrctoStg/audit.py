@@ -0,0 +1,151 @@
+import queue
+import atexit
+import threading
+from concurrent.futures import Future
+from sqlalchemy import text
+from SrctoStg.connections import DBConnectionManager
+from SrctoStg.logs import LoggerManager
+
+
+class AuditWriter:
+    """Sends ETL audit events (usp_etlpreprocess / postprocess / errorinsert) from a background thread.
+
+    Callers only enqueue. One thread drains the queue and sends up to ``batch_size`` events per
+    transaction on a single pooled connection. If a batch fails, its events are retried one by
+    one, so a single bad event cannot drop the others. The queue holds at most ``max_pending``
+    events; when it is full, the caller sends its event itself rather than waiting for room or
+    dropping the audit row. ``close`` (also registered with ``atexit``) flushes everything that is
+    still queued.
+
+    ``start`` returns a Future that resolves to the LatestBatchId; later events for the same
+    object take that Future and resolve it when they are sent.
+    """
+
+    PREPROCESS = "CALL ods.usp_etlpreprocess(:sourceid, :targetobject, :dataflowflag, :source_count, :user_agent, :etl_batch_id, NULL);"
+    POSTPROCESS = "CALL ods.usp_etlpostprocess(:sourceid, :targetobject, :dataflowflag, :latestbatchid, :source_count, :insert_count, :update_count);"
+    ERRORINSERT = "CALL ods.usp_etlerrorinsert(:sourceid, :targetobject, :dataflowflag, :latestbatchid, :task, :package, :error_id, :error_desc, :error_line);"
+    _STOP = object()
+
+    def __init__(self, user_agent, etl_batch_id, location="source-config", batch_size=50, max_pending=1000):
+        self.logger = LoggerManager().logger
+        self.engine = DBConnectionManager().new_db_connection(location)
+        self.user_agent = user_agent
+        self.etl_batch_id = etl_batch_id
+        self.batch_size = max(1, int(batch_size))
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def start(self, record, source_count=0):
+        """Queues the start event for a record; returns a Future for its LatestBatchId."""
+        batch_id = Future()
+        self._put(self.PREPROCESS, {
+            **self._keys(record),
+            "source_count": source_count,
+            "user_agent": self.user_agent,
+            "etl_batch_id": self.etl_batch_id,
+        }, batch_id)
+        return batch_id
+
+    def end(self, record, batch_id, source_count, insert_count, update_count=0):
+        self._put(self.POSTPROCESS, {
+            **self._keys(record),
+            "latestbatchid": batch_id,
+            "source_count": source_count,
+            "insert_count": insert_count,
+            "update_count": update_count,
+        })
+
+    def error(self, record, batch_id, error, task="SrctoStg", package="SrctoStg"):
+        traceback = getattr(error, "__traceback__", None)
+        while traceback is not None and traceback.tb_next is not None:
+            traceback = traceback.tb_next
+        self._put(self.ERRORINSERT, {
+            **self._keys(record),
+            "latestbatchid": batch_id,
+            "task": task,
+            "package": package,
+            "error_id": type(error).__name__,
+            "error_desc": str(error)[:4000],
+            "error_line": traceback.tb_lineno if traceback is not None else None,
+        })
+
+    def flush(self):
+        """Blocks until every queued event has been sent (or has failed and been logged)."""
+        self._queue.join()
+
+    def close(self):
+        """Flushes the queue and stops the background thread; safe to call more than once."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+    @staticmethod
+    def _keys(record):
+        return {"sourceid": record.sourceid, "targetobject": record.targetobject, "dataflowflag": record.dataflowflag}
+
+    def _put(self, query, params, result=None):
+        if self._closed:
+            raise RuntimeError("AuditWriter is closed")
+        try:
+            self._queue.put_nowait((query, params, result))
+        except queue.Full:
+            self.logger.warning(f"⚠️ Audit queue full; sending the event for {params['sourceid']}:{params['targetobject']} directly")
+            self._send([(query, params, result)])
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            events = [item for item in items if item is not self._STOP]
+            if events:
+                self._send(events)
+            for _ in items:
+                self._queue.task_done()
+            if len(events) < len(items):
+                return
+
+    def _send(self, events):
+        # ✅ One transaction for the whole batch; LatestBatchIds are published only after it commits
+        batch_ids = {}
+        try:
+            with self.engine.begin() as conn:
+                for query, params, result in events:
+                    self._execute(conn, query, params, result, batch_ids)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Audit batch of {len(events)} events failed ({e}); retrying them one by one")
+            batch_ids = {}
+            for query, params, result in events:
+                try:
+                    with self.engine.begin() as conn:
+                        self._execute(conn, query, params, result, batch_ids)
+                    if result is not None:
+                        result.set_result(batch_ids.get(result))
+                except Exception as event_error:
+                    self.logger.error(f"❌ Audit event for {params['sourceid']}:{params['targetobject']} failed: {event_error}")
+                    if result is not None:
+                        result.set_result(None)
+            return
+
+        for result, value in batch_ids.items():
+            result.set_result(value)
+
+    @staticmethod
+    def _execute(conn, query, params, result, batch_ids):
+        # ✅ A LatestBatchId from earlier in the same batch is not published yet, so look it up locally
+        params = {
+            key: (batch_ids.get(value) if value in batch_ids else value.result()) if isinstance(value, Future) else value
+            for key, value in params.items()
+        }
+        row = conn.execute(text(query), params)
+        if result is not None:
+            batch_ids[result] = row.fetchone()[0]
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+from sqlalchemy import text, bindparam
+from SrctoStg.logs import LoggerManager
+
+
+class SourceCatalog:
+    """Column, type and primary-key metadata of source tables, fetched set-based and cached for the run.
+
+    The first lookup on a source connection fetches every object planned for the run (``objects``)
+    with one INFORMATION_SCHEMA query, in chunks of ``CHUNK`` tables to stay under driver parameter
+    limits. Later lookups, for schema registration and for the cast query alike, are served from
+    memory; objects outside the plan are fetched on their own. With ``cache`` on, the result is also
+    kept in ``directory`` for ``ttl`` seconds so later runs (and worker processes) skip the query.
+    ``invalidate`` drops an object whose load failed, so a retry reads the catalog again.
+    """
+
+    SOURCE_TYPES = {"SQL Server", "PostgreSQL", "MySQL"}
+    # Default collations of these sources compare identifiers case-insensitively
+    CASE_INSENSITIVE = {"SQL Server", "MySQL"}
+    COLUMNS = ["column_id", "column_name", "source_data_type", "length", "precisions", "scale", "nullable", "key_constraint"]
+    CHUNK = 500
+    QUERY = text("""
+        SELECT
+            cols.TABLE_SCHEMA AS source_schema,
+            cols.TABLE_NAME AS source_table,
+            cols.ORDINAL_POSITION AS column_id,
+            cols.COLUMN_NAME AS column_name,
+            cols.DATA_TYPE AS source_data_type,
+            cols.CHARACTER_MAXIMUM_LENGTH AS length,
+            cols.NUMERIC_PRECISION AS precisions,
+            cols.NUMERIC_SCALE AS scale,
+            CASE WHEN cols.IS_NULLABLE = 'YES' THEN 1 ELSE 0 END AS nullable,
+            CASE WHEN pk.COLUMN_NAME IS NOT NULL THEN 'PRIMARY KEY' ELSE '' END AS key_constraint
+        FROM INFORMATION_SCHEMA.COLUMNS cols
+        LEFT JOIN (
+            SELECT kcu.TABLE_SCHEMA, kcu.TABLE_NAME, kcu.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.TABLE_CONSTRAINTS tc
+            JOIN INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
+                ON kcu.CONSTRAINT_SCHEMA = tc.CONSTRAINT_SCHEMA AND kcu.CONSTRAINT_NAME = tc.CONSTRAINT_NAME
+                AND kcu.TABLE_SCHEMA = tc.TABLE_SCHEMA AND kcu.TABLE_NAME = tc.TABLE_NAME
+            WHERE tc.CONSTRAINT_TYPE = 'PRIMARY KEY'
+        ) pk
+            ON pk.TABLE_SCHEMA = cols.TABLE_SCHEMA AND pk.TABLE_NAME = cols.TABLE_NAME AND pk.COLUMN_NAME = cols.COLUMN_NAME
+        WHERE cols.TABLE_SCHEMA IN :schemas AND cols.TABLE_NAME IN :tables
+        ORDER BY cols.TABLE_SCHEMA, cols.TABLE_NAME, cols.ORDINAL_POSITION
+    """).bindparams(bindparam("schemas", expanding=True), bindparam("tables", expanding=True))
+
+    _entries = {}
+    _saved_at = {}
+    _lock = threading.Lock()
+
+    def __init__(self, engine, source_type, objects=(), cache=False, directory=".catalog_cache", ttl=3600):
+        self.engine = engine
+        self.source_type = source_type
+        self.objects = [tuple(obj) for obj in objects or ()]
+        self.cache = cache
+        self.directory = directory
+        self.ttl = float(ttl)
+        self.logger = LoggerManager().logger
+        self.location = engine.url.render_as_string(hide_password=True)
+
+    @classmethod
+    def from_settings(cls, engine, source_type, settings):
+        """Builds the catalog from the ``etl.catalog`` config section and the run's planned objects."""
+        catalog = settings.get("catalog") or {}
+        return cls(
+            engine,
+            source_type,
+            objects=(settings.get("catalog_objects") or {}).get(source_type, ()),
+            cache=catalog.get("cache", False),
+            directory=catalog.get("directory", ".catalog_cache"),
+            ttl=catalog.get("ttl", 3600),
+        )
+
+    @property
+    def supported(self):
+        return self.source_type in self.SOURCE_TYPES
+
+    def metadata(self, schema, table):
+        """Returns the column metadata of ``schema.table`` in ordinal order (empty when the table is unknown)."""
+        return self._entry(schema, table).copy()
+
+    def columns(self, schema, table):
+        """Returns ``{column_name: data_type}`` for ``schema.table`` in ordinal order."""
+        entry = self._entry(schema, table)
+        return dict(zip(entry["column_name"], entry["source_data_type"]))
+
+    def invalidate(self, schema, table):
+        """Forgets one object, here and in the disk cache, so its next lookup queries the source again."""
+        with SourceCatalog._lock:
+            entries = SourceCatalog._entries.get(self._cache_key())
+            if entries is not None:
+                entries.pop(self._key(schema, table), None)
+                if self.cache:
+                    self._save(entries)
+
+    def _entry(self, schema, table):
+        key = self._key(schema, table)
+        with SourceCatalog._lock:
+            entries = SourceCatalog._entries.get(self._cache_key())
+            if entries is None:
+                entries = SourceCatalog._entries[self._cache_key()] = self._load() if self.cache else {}
+                SourceCatalog._saved_at.setdefault(self._cache_key(), time.time())
+            if key not in entries:
+                # ✅ Fetch every planned object still missing, including this one, in one pass
+                wanted = {self._key(*obj): obj for obj in self.objects if self._key(*obj) not in entries}
+                wanted[key] = (schema, table)
+                entries.update(self._fetch(list(wanted.values())))
+                if self.cache:
+                    self._save(entries)
+            return entries[key]
+
+    def _fetch(self, objects):
+        """Queries the catalog for ``objects``; tables that do not exist get an empty frame."""
+        started = time.perf_counter()
+        frames = []
+        with self.engine.connect() as conn:
+            for start in range(0, len(objects), self.CHUNK):
+                chunk = objects[start:start + self.CHUNK]
+                params = {"schemas": sorted({obj[0] for obj in chunk}), "tables": sorted({obj[1] for obj in chunk})}
+                frames.append(pd.read_sql(self.QUERY, conn, params=params))
+        found = pd.concat(frames, ignore_index=True)
+        found.columns = [col.lower() for col in found.columns]
+
+        empty = pd.DataFrame(columns=self.COLUMNS)
+        groups = {self._key(schema, table): group for (schema, table), group in found.groupby(["source_schema", "source_table"], sort=False)}
+        entries = {
+            self._key(*obj): groups[self._key(*obj)][self.COLUMNS].reset_index(drop=True) if self._key(*obj) in groups else empty
+            for obj in objects
+        }
+        self.logger.info(
+            f"✅ Catalog of {len(groups)}/{len(objects)} {self.source_type} objects fetched in "
+            f"{(len(objects) + self.CHUNK - 1) // self.CHUNK} queries ({time.perf_counter() - started:.2f}s)"
+        )
+        return entries
+
+    def _key(self, schema, table):
+        key = (str(schema), str(table))
+        return tuple(part.lower() for part in key) if self.source_type in self.CASE_INSENSITIVE else key
+
+    def _cache_key(self):
+        return (self.location, self.source_type)
+
+    def _path(self):
+        digest = hashlib.sha1(f"{self.source_type}|{self.location}".encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f"{self.source_type.replace(' ', '_')}-{digest}.json")
+
+    def _load(self):
+        """Reads the disk cache while it is younger than ``ttl``; anything else starts empty."""
+        try:
+            with open(self._path(), "r") as file:
+                payload = json.load(file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Ignoring unreadable catalog cache {self._path()}: {e}")
+            return {}
+        if time.time() - payload.get("saved_at", 0) > self.ttl:
+            return {}
+        SourceCatalog._saved_at[self._cache_key()] = payload["saved_at"]
+        return {
+            tuple(entry["key"]): pd.DataFrame(entry["rows"], columns=self.COLUMNS)
+            for entry in payload.get("objects", [])
+        }
+
+    def _save(self, entries):
+        """Writes the cache atomically; it keeps the age of its oldest entries, so ``ttl`` bounds staleness."""
+        os.makedirs(self.directory, exist_ok=True)
+        payload = {
+            "saved_at": SourceCatalog._saved_at.get(self._cache_key(), time.time()),
+            "source_type": self.source_type,
+            "objects": [
+                {"key": list(key), "rows": frame.astype(object).where(frame.notna(), None).values.tolist()}
+                for key, frame in entries.items()
+            ],
+        }
+        temp_path = f"{self._path()}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(payload, file, separators=(",", ":"))
+        os.replace(temp_path, self._path())
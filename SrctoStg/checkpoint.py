@@ -0,0 +1,190 @@
+import threading
+from sqlalchemy import text
+from SrctoStg.logs import LoggerManager
+
+
+class SegmentCheckpoint:
+    """Progress of one segment (the whole object, or one key range) of a checkpointed load.
+
+    With a resume ``key`` (a unique, non-null integer column) the segment is read in key order and
+    every batch commits together with the highest key it contains, so a rerun continues after it.
+    Without one, the segment is written in a single staging transaction that also marks it done,
+    so a failure leaves no partial rows behind and a rerun only repeats unfinished segments.
+    """
+
+    def __init__(self, store, record, segment, predicate=None, range_start=None, range_end=None, key=None,
+                 last_key=None, rows=0, high_watermark=None, done=False):
+        self.store = store
+        self.record = record
+        self.segment = segment
+        self.predicate = predicate
+        self.range_start = range_start
+        self.range_end = range_end
+        self.key = key
+        self.last_key = last_key
+        self.rows = rows
+        self.high_watermark = high_watermark
+        self.done = done
+
+    @property
+    def per_batch(self):
+        return self.key is not None
+
+    def query(self, params):
+        """Returns ``(predicate, params, order_by)`` that read what is left of this segment."""
+        predicate = self.predicate
+        params = dict(params)
+        if self.range_start is not None:
+            params.update(range_start=self.range_start, range_end=self.range_end)
+        if self.key is not None and self.last_key is not None:
+            predicate = f"({predicate}) AND {self.key} > :checkpoint_key" if predicate else f"{self.key} > :checkpoint_key"
+            params["checkpoint_key"] = self.last_key
+        return predicate, params, self.key
+
+    def advance(self, conn, last_key, rows, high_watermark):
+        """Records a committed batch on ``conn``, inside the transaction that wrote it."""
+        self.last_key = max(int(last_key), self.last_key) if self.last_key is not None else int(last_key)
+        self.rows += rows
+        if high_watermark is not None:
+            self.high_watermark = str(high_watermark)
+        self.store.save(conn, self)
+
+    def finish(self, conn=None, rows=0, high_watermark=None):
+        """Marks the segment done, on ``conn`` when its ``rows`` were written in that same transaction."""
+        self.done = True
+        if not self.per_batch:
+            self.rows += rows
+        if high_watermark is not None:
+            self.high_watermark = str(high_watermark)
+        self.store.save(conn, self)
+
+
+class CheckpointStore:
+    """Segment checkpoints of in-flight loads, kept in the staging database next to the data they describe.
+
+    Rows are keyed by object and segment and tagged with a fingerprint of the extract (columns,
+    incremental predicate, resume key); a rerun only resumes from checkpoints with a matching
+    fingerprint. They are removed once the object has loaded completely.
+    """
+
+    TABLE = "etl_checkpoint"
+    _ready = set()
+    _lock = threading.Lock()
+
+    def __init__(self, engine, schema):
+        self.engine = engine
+        self.schema = schema
+        preparer = engine.dialect.identifier_preparer
+        self.table = f"{preparer.quote(schema)}.{preparer.quote(self.TABLE)}"
+        self.logger = LoggerManager().logger
+
+    def ensure(self):
+        key = (str(self.engine.url), self.schema)
+        with CheckpointStore._lock:
+            if key in CheckpointStore._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        sourceid VARCHAR(255) NOT NULL,
+                        targetobject VARCHAR(255) NOT NULL,
+                        segment INTEGER NOT NULL,
+                        fingerprint VARCHAR(64) NOT NULL,
+                        segment_predicate TEXT,
+                        range_start BIGINT,
+                        range_end BIGINT,
+                        resume_key VARCHAR(255),
+                        last_key BIGINT,
+                        rows_committed BIGINT NOT NULL DEFAULT 0,
+                        high_watermark TEXT,
+                        done BOOLEAN NOT NULL DEFAULT FALSE,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (sourceid, targetobject, segment)
+                    );
+                """))
+            CheckpointStore._ready.add(key)
+
+    def load(self, record, fingerprint):
+        """Returns the segments of an interrupted load of ``record`` with this fingerprint, else an empty list."""
+        self.ensure()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT segment, fingerprint, segment_predicate, range_start, range_end, resume_key, last_key, rows_committed, high_watermark, done
+                FROM {self.table}
+                WHERE sourceid = :sourceid AND targetobject = :targetobject
+                ORDER BY segment
+            """), self._keys(record)).fetchall()
+
+        if rows and any(row.fingerprint != fingerprint for row in rows):
+            self.logger.warning(
+                f"⚠️ Discarding checkpoints of {record.targetobject}: the extract changed since the interrupted load, "
+                f"whose {sum(row.rows_committed for row in rows)} committed rows stay in staging"
+            )
+            self.clear(record)
+            return []
+
+        return [
+            SegmentCheckpoint(
+                self, record, row.segment, row.segment_predicate, row.range_start, row.range_end, row.resume_key,
+                row.last_key, row.rows_committed, row.high_watermark, bool(row.done),
+            )
+            for row in rows
+        ]
+
+    def plan(self, record, fingerprint, ranges, key=None):
+        """Stores one pending segment per ``(predicate, params)`` range before any data moves."""
+        self.ensure()
+        segments = [
+            SegmentCheckpoint(self, record, index, predicate, params.get("range_start"), params.get("range_end"), key)
+            for index, (predicate, params) in enumerate(ranges)
+        ]
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.table} WHERE sourceid = :sourceid AND targetobject = :targetobject"), self._keys(record))
+            conn.execute(
+                text(f"""
+                    INSERT INTO {self.table} (sourceid, targetobject, segment, fingerprint, segment_predicate, range_start, range_end, resume_key)
+                    VALUES (:sourceid, :targetobject, :segment, :fingerprint, :segment_predicate, :range_start, :range_end, :resume_key)
+                """),
+                [
+                    {
+                        **self._keys(record),
+                        "segment": segment.segment,
+                        "fingerprint": fingerprint,
+                        "segment_predicate": segment.predicate,
+                        "range_start": segment.range_start,
+                        "range_end": segment.range_end,
+                        "resume_key": key,
+                    }
+                    for segment in segments
+                ],
+            )
+        return segments
+
+    def save(self, conn, segment):
+        query = text(f"""
+            UPDATE {self.table}
+            SET last_key = :last_key, rows_committed = :rows_committed, high_watermark = :high_watermark,
+                done = :done, updated_at = CURRENT_TIMESTAMP
+            WHERE sourceid = :sourceid AND targetobject = :targetobject AND segment = :segment
+        """)
+        params = {
+            **self._keys(segment.record),
+            "segment": segment.segment,
+            "last_key": segment.last_key,
+            "rows_committed": segment.rows,
+            "high_watermark": segment.high_watermark,
+            "done": segment.done,
+        }
+        if conn is not None:
+            conn.execute(query, params)
+        else:
+            with self.engine.begin() as own_conn:
+                own_conn.execute(query, params)
+
+    def clear(self, record):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {self.table} WHERE sourceid = :sourceid AND targetobject = :targetobject"), self._keys(record))
+
+    @staticmethod
+    def _keys(record):
+        return {"sourceid": str(record.sourceid), "targetobject": record.targetobject}
@@ -1,31 +1,168 @@
 import sys
 import os
 import yaml
-import pyodbc
-import oracledb
-import psycopg2
-import clickhouse_driver
+import importlib
+import threading
 from SrctoStg.logs import LoggerManager
 from urllib.parse import quote_plus
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.pool import QueuePool
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+
+
+def _alias_cx_oracle(module):
+    module.version = "8.3.0"
+    sys.modules["cx_Oracle"] = module  # Alias for cx_Oracle compatibility
+
+
+class DriverRegistry:
+    """Imports a database driver the first time a config section with its dialect is used.
+
+    Each driver is registered by dialect prefix with the dotted path of its base error class
+    (retried by ``new_db_connection``) and an optional setup hook run once after import.
+    Errors are only matched against drivers that are already imported, so checking them
+    never loads a driver.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._drivers = {}
+        self._loaded = set()
+
+    def register(self, dialect, module, error, setup=None):
+        self._drivers[dialect] = (module, error, setup)
+
+    def load(self, dialect):
+        """Imports (once) the driver for ``dialect``; dialects without a registered driver are left to SQLAlchemy."""
+        name = dialect.split("+")[0] if dialect not in self._drivers else dialect
+        if name not in self._drivers:
+            return None
+        module_name, _, setup = self._drivers[name]
+        with self._lock:
+            module = importlib.import_module(module_name)
+            if name not in self._loaded:
+                if setup is not None:
+                    setup(module)
+                self._loaded.add(name)
+        return module
+
+    def errors(self):
+        """Base error classes of the drivers imported so far."""
+        errors = []
+        for module_name, error, _ in self._drivers.values():
+            module = sys.modules.get(module_name)
+            for attr in error.split(".") if module is not None else ():
+                module = getattr(module, attr, None)
+            if isinstance(module, type):
+                errors.append(module)
+        return tuple(errors)
+
+    def is_error(self, exc):
+        return isinstance(exc, self.errors())
+
+
+drivers = DriverRegistry()
+drivers.register("mssql+pyodbc", "pyodbc", "Error")
+drivers.register("postgresql", "psycopg2", "DatabaseError")
+drivers.register("oracle", "oracledb", "Error", setup=_alias_cx_oracle)
+drivers.register("clickhouse", "clickhouse_driver", "errors.Error")
+
+class EngineRegistry:
+    """Process-wide cache of parsed config files and pooled SQLAlchemy engines, keyed by config section.
+
+    Every DBConnectionManager shares this registry, so each config file is parsed once and each
+    section gets a single pool. After ``fork`` the child drops the inherited pools (without closing
+    the parent's sockets) and builds its own on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._configs = {}
+        self._engines = {}
+        self._checkouts = {}
+        self._capacities = {}
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def config(self, config_path):
+        """Returns the parsed YAML config for ``config_path``, reading the file only once."""
+        with self._lock:
+            if config_path not in self._configs:
+                if not os.path.exists(config_path):
+                    raise FileNotFoundError(f"Config file not found: {config_path}")
+                with open(config_path, "r") as f:
+                    self._configs[config_path] = yaml.safe_load(f)
+            return self._configs[config_path]
+
+    def engine(self, config_path, location, factory, pool_size=None, max_overflow=None):
+        """Returns the pooled engine for a config section, building it with ``factory()`` on first use.
+
+        ``pool_size`` and ``max_overflow`` are the pool settings ``factory`` uses; they are kept so
+        callers can size their own concurrency to the pool (see ``capacity``).
+        """
+        key = (config_path, location)
+        with self._lock:
+            if key not in self._engines:
+                engine = factory()
+                self._checkouts[key] = 0
+                event.listen(engine, "checkout", lambda *args, key=key: self._count_checkout(key))
+                self._engines[key] = engine
+                if pool_size is not None and max_overflow is not None and int(max_overflow) >= 0:
+                    self._capacities[id(engine)] = int(pool_size) + int(max_overflow)
+            return self._engines[key]
+
+    def capacity(self, engine):
+        """Connections ``engine``'s pool hands out before callers block (pool_size + max_overflow).
+
+        None for engines the registry did not build, and for pools with unbounded overflow.
+        """
+        with self._lock:
+            return self._capacities.get(id(engine))
+
+    def _count_checkout(self, key):
+        with self._lock:
+            self._checkouts[key] = self._checkouts.get(key, 0) + 1
+
+    def pool_stats(self):
+        """Returns checkout/overflow statistics for every pooled engine, keyed by config section."""
+        stats = {}
+        with self._lock:
+            for (config_path, location), engine in self._engines.items():
+                pool = engine.pool
+                stats[location] = {
+                    "pool_size": pool.size() if hasattr(pool, "size") else None,
+                    "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                    "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                    "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                    "total_checkouts": self._checkouts.get((config_path, location), 0),
+                }
+        return stats
+
+    def dispose_all(self):
+        """Closes every pooled connection; engines stay registered and reconnect lazily."""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+
+    def _reset_after_fork(self):
+        self._lock = threading.RLock()
+        for engine in self._engines.values():
+            engine.dispose(close=False)
+        self._engines.clear()
+        self._checkouts.clear()
+        self._capacities.clear()
+
+
+registry = EngineRegistry()
 
-oracledb.version = "8.3.0"
-sys.modules["cx_Oracle"] = oracledb  # Alias for cx_Oracle compatibility
 
 class DBConnectionManager:
     """Manages database connections with connection pooling, retry logic, and dynamic database support."""
 
     def __init__(self, config_path=None, pool_size=5, max_overflow=10, max_retries=3):
         """Initialize the DB connection manager with pooling and retry logic."""
-        config_path = config_path or os.path.join(os.getcwd(), "config.example.yml")
-        
-        if not os.path.exists(config_path):
-            raise FileNotFoundError(f"Config file not found: {config_path}")
-
-        with open(config_path, "r") as f:
-            self.config = yaml.safe_load(f)
+        self.config_path = os.path.abspath(config_path or os.path.join(os.getcwd(), "config.example.yml"))
+        self.config = registry.config(self.config_path)
 
         self.pool_size = pool_size
         self.max_overflow = max_overflow
@@ -36,7 +173,7 @@ class DBConnectionManager:
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((pyodbc.Error, psycopg2.DatabaseError, clickhouse_driver.errors.Error)),
+        retry=retry_if_exception(drivers.is_error),
         reraise=True
     )
     def new_db_connection(self, location="", use_sqlalchemy=True):
@@ -64,14 +201,25 @@ class DBConnectionManager:
             dialect = config_section.get("dialect", "").lower()
             driver = config_section.get("driver", "")
 
-            return self._get_sqlalchemy_engine(dialect, driver, conn_details)
+            pool_size = config_section.get("pool_size", self.pool_size)
+            max_overflow = config_section.get("max_overflow", self.max_overflow)
+            engine = registry.engine(
+                self.config_path,
+                location,
+                lambda: self._get_sqlalchemy_engine(dialect, driver, conn_details, pool_size=pool_size, max_overflow=max_overflow),
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+            )
+            self.sqlalchemy_engines[location] = engine
+            return engine
 
         except Exception as e:
             raise RuntimeError(f"Database connection error: {str(e)}") from e
 
-    def _get_sqlalchemy_engine(self, dialect, driver, conn_details):
+    def _get_sqlalchemy_engine(self, dialect, driver, conn_details, pool_size, max_overflow):
         """Handles all database connections using SQLAlchemy (where possible)."""
-        conn_details["password"] = quote_plus(conn_details["password"])
+        drivers.load(dialect)
+        conn_details = {**conn_details, "password": quote_plus(str(conn_details.get("password") or ""))}
 
         if dialect.startswith("mssql+pyodbc"):
             driver = driver or "ODBC Driver 17 for SQL Server"
@@ -88,18 +236,20 @@ class DBConnectionManager:
         else:
             sqlalchemy_conn_str = f"{dialect}://{conn_details['username']}:{conn_details['password']}@{conn_details['host']}:{conn_details['port']}/{conn_details['database']}"
 
-        engine = create_engine(
+        return create_engine(
             sqlalchemy_conn_str,
             poolclass=QueuePool,
-            pool_size=self.pool_size,
-            max_overflow=self.max_overflow
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_recycle=3600,  # engines are long-lived and shared, so recycle idle server connections
         )
 
-        self.sqlalchemy_engines[dialect] = engine
-        return engine
+    def pool_stats(self):
+        """Returns checkout/overflow statistics for all shared engines."""
+        return registry.pool_stats()
 
     def close_all_connections(self):
         """Closes all database connections properly."""
         for location, engine in self.sqlalchemy_engines.items():
             engine.dispose()
-            print(f"Closed SQLAlchemy connection for {location}")
\ No newline at end of file
+            print(f"Closed SQLAlchemy connection for {location}")
@@ -1,133 +1,338 @@
 import os
 import sys
+import glob
 import yaml
+import hashlib
+import threading
+import contextlib
+import concurrent.futures
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import requests
 import time
 from sqlalchemy import create_engine, inspect, text
-from SrctoStg.connections import DBConnectionManager
+from SrctoStg.connections import DBConnectionManager, registry
 from SrctoStg.logs import LoggerManager
+from SrctoStg.writers import ClickHouseWriter, PostgresMergeWriter, get_staging_writer
+from SrctoStg.checkpoint import CheckpointStore
+from SrctoStg.manifest import FileManifest
+from SrctoStg.shadow import ShadowTable
+from SrctoStg.catalog import SourceCatalog
+from SrctoStg.landing import LandingZone
+from SrctoStg.api import APIExtractor
+from SrctoStg.flatfile import FlatFileReader
+from SrctoStg.metrics import metrics, profiled
+from SrctoStg.scheduler import DagScheduler
 from sqlalchemy.sql.sqltypes import NullType
 
 class DatabaseETL:
     """Handles data extraction from various sources and loads it into the staging database."""
 
-    def __init__(self,sourcetype):
-        """Initialize ETL process, load config, and establish connections."""
+    INCREMENTAL_LOAD_TYPES = {"incremental", "delta"}
+    WATERMARK_DATE_TYPES = {
+        "date", "datetime", "datetime2", "smalldatetime", "datetimeoffset", "timestamp",
+        "timestamp without time zone", "timestamp with time zone",
+    }
+    WATERMARK_KEY_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint"}
+    FINGERPRINT_COLUMNS = ["column_id", "column_name", "source_data_type", "length", "precisions", "scale", "nullable", "key_constraint"]
+    _watermark_table_ready = False
+    _fingerprints = None
+    _fingerprint_lock = threading.Lock()
+    _staging_catalog = {}
+    _staging_catalog_lock = threading.Lock()
+    _conversion_plans = {}
+    _conversion_plan_lock = threading.Lock()
+    _stream_slots = {}
+    _stream_slot_lock = threading.Lock()
+    _source_file_tables = set()
+    _source_file_lock = threading.Lock()
+
+    # Source DATA_TYPE -> in-flight dtype; booleans stay integers for PostgreSQL staging as before
+    SOURCE_TYPE_CONVERSIONS = {
+        "datetimeoffset": "datetimetz", "timestamp with time zone": "datetimetz",
+        "datetime": "datetime", "datetime2": "datetime", "smalldatetime": "datetime",
+        "timestamp": "datetime", "timestamp without time zone": "datetime",
+        "bit": "Int8", "boolean": "Int8", "bool": "Int8",
+        "tinyint": "Int16", "smallint": "Int16", "mediumint": "Int32", "int": "Int32", "integer": "Int32", "bigint": "Int64",
+        "real": "float32", "float": "float64", "double": "float64", "double precision": "float64",
+        "char": "string", "nchar": "string", "varchar": "string", "nvarchar": "string", "character": "string",
+        "character varying": "string", "text": "string", "ntext": "string", "enum": "string",
+    }
+    # Types modify_sqlalchemy_query casts to NVARCHAR(MAX)
+    CAST_TO_TEXT_TYPES = {"geography", "geometry", "hierarchyid", "xml", "uniqueidentifier"}
+    CATEGORY_RATIO = 0.1
+    # Conversion-plan kind -> Arrow type used by the arrow pipeline
+    ARROW_TYPES = {
+        "Int8": pa.int8(), "Int16": pa.int16(), "Int32": pa.int32(), "Int64": pa.int64(),
+        "float32": pa.float32(), "float64": pa.float64(),
+        "datetime": pa.timestamp("us"), "datetimetz": pa.timestamp("us", tz="UTC"),
+        "string": pa.string(), "category": pa.string(), "object": pa.string(),
+    }
+
+    def __init__(self,sourcetype, **options):
+        """Initialize ETL process, load config, and establish connections.
+
+        Keyword options override the ``etl`` section of the config file (``None`` values are ignored).
+        """
         self.db_manager = DBConnectionManager()
-        self.engine_source = self.db_manager.new_db_connection(sourcetype)
-        self.engine_staging = self.db_manager.new_db_connection("staging")
-        self.engine_srcconfig = self.db_manager.new_db_connection("source-config")
+        self._setup(
+            sourcetype,
+            self.db_manager.new_db_connection(sourcetype),
+            self.db_manager.new_db_connection("staging"),
+            self.db_manager.new_db_connection("source-config"),
+            self.db_manager.config,
+            options,
+        )
+
+    @classmethod
+    def from_engines(cls, sourcetype, engine_source, engine_staging, engine_srcconfig=None, config=None, **options):
+        """A DatabaseETL on the given engines instead of the configured connections (benchmarks and tools).
+
+        ``config`` stands in for the config file and defaults to empty, so only ``options`` apply.
+        """
+        etl = cls.__new__(cls)
+        etl.db_manager = None
+        etl._setup(sourcetype, engine_source, engine_staging, engine_srcconfig, config or {}, options)
+        return etl
+
+    def _setup(self, sourcetype, engine_source, engine_staging, engine_srcconfig, config, options):
+        self.engine_source = engine_source
+        self.engine_staging = engine_staging
+        self.engine_srcconfig = engine_srcconfig
         self.logger = LoggerManager().logger
+        self.settings = {**(config.get("etl") or {}), **{k: v for k, v in options.items() if v is not None}}
+        self.chunk_size = int(self.settings.get("chunksize") or 50000)
+        self.batch_bytes = int(float(self.settings.get("batch_mb") or 0) * 1024 * 1024)
+        if str(self.settings.get("writer") or "").lower() == "clickhouse":
+            self.writer = ClickHouseWriter.from_config(config, self.settings.get("clickhouse"))
+        else:
+            self.writer = get_staging_writer(self.engine_staging, self.settings.get("writer"))
+        self.pipeline = str(self.settings.get("pipeline") or "pandas").lower()
+        self.load_mode = str(self.settings.get("load_mode") or "append").lower()
+        if self.load_mode == "merge":
+            if isinstance(self.writer, ClickHouseWriter) or self.engine_staging.dialect.name != "postgresql":
+                self.logger.warning("⚠️ load_mode merge needs PostgreSQL staging; appending to the staging table instead")
+            else:
+                self.writer = PostgresMergeWriter(self.engine_staging, (self.settings.get("merge") or {}).get("hash_column") or "etl_row_hash")
+        self._shadows = {}
+        self.catalog = SourceCatalog.from_settings(self.engine_source, sourcetype, self.settings)
+        self.stage = str(self.settings.get("stage") or "all").lower()
+        landing_enabled = (self.settings.get("landing") or {}).get("enabled") or self.stage != "all"
+        self.landing = LandingZone.from_settings(self.settings) if landing_enabled else None
+        self._landed = {}
+        self.api_extractor = None
     
     def copy_single_record_from_source(self, record):
         """Determines the source type and processes the record accordingly."""
         try:
-                        
-            if record.sourcetype =='Flatfile':
-                return self._copy_single_record_flat_file(record)
-            elif record.sourcetype in ["API", "KEKA", "Hubspot", "Salesforce"]:
-                return self._copy_single_record_api(record)
-            else:
-                return self._copy_single_record_db(record)
-            return True
+            with metrics.track(DagScheduler.label(record)), self._profiler(record):
+                if record.sourcetype =='Flatfile':
+                    if self.stage == "extract":
+                        self.logger.info(f"⏭️ Flat file {record.sourceobject} is already on disk; it is loaded in the load stage")
+                        return 0
+                    return self._copy_single_record_flat_file(record)
+                elif self.landing is not None:
+                    return self._copy_through_landing(record)
+                else:
+                    return self._copy_from_source(record)
         except Exception as e:
             self.logger.error(f"❌ Error processing record {record.sourceid}: {str(e)}")
+            raise
+
+    def _copy_from_source(self, record):
+        if record.sourcetype in ["API", "KEKA", "Hubspot", "Salesforce"]:
+            return self._copy_single_record_api(record)
+        return self._copy_single_record_db(record)
+
+    def _copy_through_landing(self, record):
+        """Extracts the record into the landing zone and/or loads its landed batches into staging, per ``etl.stage``.
+
+        While extracting, staging writes and schema registration are routed into the landed batch,
+        so the extract neither waits on nor needs the staging database.
+        """
+        rows = 0
+        if self.stage in ("extract", "all"):
+            key = (record.targetschemaname, record.targetobject)
+            with self.landing.extract(record) as landed:
+                self._landed[key] = landed
+                try:
+                    rows = self._copy_from_source(record)
+                finally:
+                    self._landed.pop(key, None)
+        if self.stage in ("load", "all"):
+            rows = self._load_landed(record)
+        return rows
+
+    def _load_landed(self, record):
+        """Loads the record's pending landed batches into staging, oldest first, each in one staging transaction.
+
+        A failed batch leaves staging untouched and stays pending, so the load can be retried
+        without extracting again. A full extract supersedes the batches landed before it.
+        """
+        batches = self.landing.pending(record, replay=bool(self.settings.get("replay")))
+        if not batches:
+            self.logger.warning(f"⚠️ Nothing landed to load for {record.sourceid}:{record.targetobject}")
             return 0
+
+        last_full = max((index for index, batch in enumerate(batches) if batch.full), default=0)
+        for batch in batches[:last_full]:
+            batch.mark_loaded(0, superseded=True)
+
+        total_rows = 0
+        for batch in batches[last_full:]:
+            schema = batch.schema()
+            if schema is not None:
+                self.register_schema(*schema)
+
+            rows = 0
+            with self._full_refresh(record, batch.full and self._swap_enabled()), self.engine_staging.begin() as conn:
+                for data in self._timed(batch.iter_batches(self.chunk_size), "landing_read"):
+                    rows += self._write(data if self.pipeline == "arrow" else data.to_pandas(), record, conn)
+            batch.mark_loaded(rows)
+            total_rows += rows
+            self.logger.info(f"✅ Loaded {rows} landed records of {record.targetobject} from {batch.name}")
+
+        self.landing.prune(record)
+        return total_rows
         
-    def extract_and_store_schema(self, source_type, source_schema, source_table, target_table):
-        """Extracts schema from various sources and stores it in source_lookup."""
+    def _profiler(self, record):
+        """cProfile/tracemalloc capture when ``etl.profile`` names this record's SourceId or TargetObject."""
+        target = self.settings.get("profile")
+        if target is None or str(target) not in (str(record.sourceid), str(record.targetobject)):
+            return contextlib.nullcontext()
+        return profiled(DagScheduler.label(record), self.settings.get("profile_mode") or "cprofile")
+
+    @staticmethod
+    def _timed(batches, stage_name="read"):
+        """Yields from ``batches``, timing each fetch as ``stage_name`` with its rows and in-memory bytes."""
+        iterator = iter(batches)
+        while True:
+            with metrics.stage(stage_name) as stage:
+                batch = next(iterator, None)
+                if batch is None:
+                    break
+                if isinstance(batch, pa.RecordBatch):
+                    stage.add(batch.num_rows, batch.nbytes)
+                elif isinstance(batch, pd.DataFrame):
+                    stage.add(len(batch), batch.memory_usage(index=False, deep=True).sum())
+                else:
+                    stage.add(len(batch))
+            yield batch
+
+    def extract_and_store_schema(self, source_type, source_schema, source_table, target_table, target_schema):
+        """Extracts schema from various sources and registers it unless its fingerprint is unchanged."""
         self.logger.info(f"🔹 Extracting schema from {source_type} source: {source_schema}.{source_table}")
 
         # ✅ Fetch metadata dynamically
-        metadata = self._get_source_metadata(source_type, source_schema, source_table)
+        with metrics.stage("metadata") as stage:
+            metadata = self._get_source_metadata(source_type, source_schema, source_table)
+            stage.add(len(metadata))
         
         if metadata.empty:
             self.logger.warning(f"⚠️ No metadata found for {source_schema}.{source_table}")
-            return
+            return metadata
+
+        metadata["nullable"] = metadata["nullable"].astype(bool)
+        self.register_schema(metadata, source_type, source_schema, source_table, target_table, target_schema)
+        return metadata
+
+    def register_schema(self, metadata, source_type, source_schema, source_table, target_table, target_schema):
+        """Stores metadata in source_lookup, runs usp_srctomain_lookup and creates the staging table.
+
+        The whole phase is skipped when the schema fingerprint matches the one recorded for this
+        source object and the staging table exists. Returns True when the schema was (re)registered.
+        """
+        landed = self._landed.get((target_schema, target_table))
+        if landed is not None:
+            # ✅ Extracting into the landing zone: the load stage registers the schema
+            landed.defer_schema(metadata, source_type, source_schema, source_table, target_table, target_schema)
+            return False
+
+        key = (source_type, source_schema, source_table, target_table)
+        fingerprint = self._schema_fingerprint(metadata)
+        if self._stored_fingerprints().get(key) == fingerprint and target_table in self._staging_tables(target_schema):
+            self.logger.info(f"⏭️ Schema unchanged for {source_schema}.{source_table}, skipping metadata registration and DDL")
+            return False
 
         # ✅ Format DataFrame to match `source_lookup` schema
         metadata["source_type"] = source_type
         metadata["source_schema"] = source_schema
         metadata["source_table"] = source_table
         metadata["target_table"] = target_table
-        metadata["nullable"] = metadata["nullable"].astype(bool)
-
 
         # ✅ Store metadata in `source_lookup`
-        with self.engine_srcconfig.connect() as conn:
+        with metrics.stage("register") as stage, self.engine_srcconfig.connect() as conn:
             metadata.to_sql("source_lookup", conn, if_exists="append", index=False,schema="ods")
+            stage.add(len(metadata))
 
         self.logger.info(f"✅ Metadata for {source_schema}.{source_table} stored in source_lookup successfully!")
-        self.call_sp()
+        with metrics.stage("call_sp"):
+            self.call_sp()
 
+        # ✅ Create table using metadata from `main_lookup`
+        with metrics.stage("ddl"):
+            self.create_tables_from_lookup(target_schema, [target_table])
+
+        # ✅ Record the fingerprint only once registration and DDL succeeded
+        self._save_fingerprint(key, fingerprint)
+        return True
+
+    @classmethod
+    def _schema_fingerprint(cls, metadata):
+        """Hashes column names, types, lengths, nullability and keys into a stable fingerprint."""
+        columns = metadata.reindex(columns=cls.FINGERPRINT_COLUMNS).astype(str)
+        return hashlib.sha256(columns.to_csv(index=False).encode("utf-8")).hexdigest()
+
+    def _stored_fingerprints(self):
+        """Loads every stored fingerprint once per process and serves later lookups from memory."""
+        with DatabaseETL._fingerprint_lock:
+            if DatabaseETL._fingerprints is None:
+                with self.engine_srcconfig.begin() as conn:
+                    conn.execute(text("""
+                        CREATE TABLE IF NOT EXISTS ods.schema_fingerprint (
+                            source_type VARCHAR(255) NOT NULL,
+                            source_schema VARCHAR(255) NOT NULL,
+                            source_table VARCHAR(255) NOT NULL,
+                            target_table VARCHAR(255) NOT NULL,
+                            fingerprint CHAR(64) NOT NULL,
+                            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            PRIMARY KEY (source_type, source_schema, source_table, target_table)
+                        );
+                    """))
+                    rows = conn.execute(text(
+                        "SELECT source_type, source_schema, source_table, target_table, fingerprint FROM ods.schema_fingerprint"
+                    )).fetchall()
+                DatabaseETL._fingerprints = {tuple(row[:4]): row[4] for row in rows}
+            return DatabaseETL._fingerprints
+
+    def _save_fingerprint(self, key, fingerprint):
+        query = """
+            INSERT INTO ods.schema_fingerprint (source_type, source_schema, source_table, target_table, fingerprint, updated_at)
+            VALUES (:source_type, :source_schema, :source_table, :target_table, :fingerprint, CURRENT_TIMESTAMP)
+            ON CONFLICT (source_type, source_schema, source_table, target_table) DO UPDATE
+            SET fingerprint = EXCLUDED.fingerprint, updated_at = EXCLUDED.updated_at
+        """
+        fingerprints = self._stored_fingerprints()
+        source_type, source_schema, source_table, target_table = key
+        with self.engine_srcconfig.begin() as conn:
+            conn.execute(text(query), {
+                "source_type": source_type,
+                "source_schema": source_schema,
+                "source_table": source_table,
+                "target_table": target_table,
+                "fingerprint": fingerprint,
+            })
+        fingerprints[key] = fingerprint
 
     def _get_source_metadata(self, source_type, source_schema, source_table):
         """Fetches metadata for databases, CSVs, Excel, and APIs."""
-        query = None
-
-        if source_type == "SQL Server":
-            query = f"""
-                SELECT distinct
-                    c.ORDINAL_POSITION AS column_id,
-                    c.COLUMN_NAME as column_name,
-                    c.DATA_TYPE as source_data_type,
-                    c.CHARACTER_MAXIMUM_LENGTH as length,
-                    c.NUMERIC_PRECISION as precisions,
-                    c.NUMERIC_SCALE as scale,
-                    c.IS_NULLABLE as nullable,
-                    CASE WHEN kcu.COLUMN_NAME IS NOT NULL THEN 'PRIMARY KEY' ELSE '' END AS key_constraint
-                FROM 
-                    INFORMATION_SCHEMA.COLUMNS c
-                LEFT JOIN 
-                    INFORMATION_SCHEMA.KEY_COLUMN_USAGE kcu
-                ON 
-                    c.TABLE_NAME = kcu.TABLE_NAME AND c.COLUMN_NAME = kcu.COLUMN_NAME
-                WHERE 
-                    c.TABLE_NAME = '{source_table}'
-                ORDER BY 
-                    c.ORDINAL_POSITION;
-
-            """
+        if source_type in SourceCatalog.SOURCE_TYPES:
+            # ✅ Served from the run's catalog, fetched once per source connection
+            return self.catalog.metadata(source_schema, source_table)
 
-        elif source_type in ["PostgreSQL", "MySQL"]:
-            query = f"""
-                SELECT distinct
-                    cols.ordinal_position AS column_id,
-                    cols.column_name as column_name,
-                    cols.data_type AS source_data_type,
-                    cols.character_maximum_length AS length,
-                    cols.numeric_precision AS precisions,
-                    cols.numeric_scale AS scale,
-                    CASE
-                        WHEN cols.is_nullable = 'YES' THEN TRUE
-                        ELSE FALSE
-                    END AS nullable ,
-                    CASE 
-                        WHEN kcu.constraint_name IS NOT NULL THEN 'PRIMARY KEY'
-                        ELSE ''
-                    END AS key_constraint
-                FROM 
-                    information_schema.columns AS cols
-                LEFT JOIN 
-                    information_schema.key_column_usage AS kcu
-                    ON cols.column_name = kcu.column_name
-                    AND cols.table_name = kcu.table_name
-                    AND cols.table_schema = kcu.table_schema
-                LEFT JOIN 
-                    information_schema.table_constraints AS tc
-                    ON kcu.constraint_name = tc.constraint_name
-                    AND tc.constraint_type = 'PRIMARY KEY'
-                WHERE 
-                    cols.table_schema = '{source_schema}' 
-                    AND cols.table_name = '{source_table}'
-                ORDER BY 
-                    cols.ordinal_position;
-
-            """
-
-        elif source_type == "CSV":
+        if source_type == "CSV":
             df = pd.read_csv(source_table, nrows=5)  # Read first few rows to infer schema
             metadata = pd.DataFrame({
                 "column_id": range(1, len(df.columns) + 1),
@@ -167,11 +372,6 @@ class DatabaseETL:
             metadata["key_constraint"] = None
             return metadata
 
-        # Execute query for databases
-        if query:
-            with self.engine_source.connect() as conn:
-                return pd.read_sql(query, conn)
-
         self.logger.warning(f"⚠️ No metadata extraction logic for source type: {source_type}")
         return pd.DataFrame()
     
@@ -180,8 +380,12 @@ class DatabaseETL:
             conn.execute(text("CALL ods.usp_srctomain_lookup();"))
             self.logger.info("✅ Stored procedure ods.usp_SrcToMain_lookup executed successfully!")
     
-    def create_tables_from_lookup(self, target_schema):
-        """Creates target tables based on transformed metadata from main_lookup."""
+    def create_tables_from_lookup(self, target_schema, target_tables=None):
+        """Creates target tables based on transformed metadata from main_lookup.
+
+        Only ``target_tables`` are considered when given, tables already present in the cached
+        staging catalog are skipped, and all statements run in a single transaction.
+        """
         self.logger.info("🔹 Generating CREATE TABLE statements from main_lookup...")
 
         query = """
@@ -189,118 +393,502 @@ class DatabaseETL:
                 target_data_type, length, precisions, scale, nullable, 
                 key_constraint, default_value
             FROM ods.main_lookup
-            ORDER BY target_table, column_id;
         """
+        params = {}
+        if target_tables:
+            query += "WHERE target_table IN :target_tables\n"
+            params["target_tables"] = tuple(target_tables)
+        query += "ORDER BY target_table, column_id;"
 
         with self.engine_srcconfig.connect() as conn:
-            df = pd.read_sql(query, conn)
-        
-        
-        # Group by target_table to create tables
-        tables = df.groupby("target_table")
-        
-
-        for table, group in tables:
-            columns_def = []
-            primary_keys = []  # List to store primary key columns
-
-            for _, row in group.iterrows():
-                col_def = f'{row["column_name"]} {row["target_data_type"]}'
-
-                # ✅ Apply length only for VARCHAR, CHAR, TEXT-like types
-                if row["target_data_type"].upper() in ["VARCHAR", "CHAR"] and pd.notna(row["length"]):
-                    col_def += f"({int(row['length'])})"
-
-                # ✅ Apply precision & scale only for DECIMAL, NUMERIC
-                elif row["target_data_type"].upper() in ["DECIMAL", "NUMERIC"] and pd.notna(row["precisions"]) and pd.notna(row["scale"]):
-                    col_def += f"({int(row['precisions'])}, {int(row['scale'])})"
-
-                # ❌ DO NOT apply length for INTEGER, TIMESTAMP, UUID, GEOGRAPHY, etc.
-
-                # ✅ Handle NULL/NOT NULL
-                if row["nullable"] == False:
-                    col_def += " NOT NULL"
-
-                # ✅ Handle default values
-                if pd.notna(row["default_value"]):
-                    col_def += f" DEFAULT {row['default_value']}"
-
-                # ✅ Handle constraints
-                if row["key_constraint"] == "PRIMARY KEY":
-                    primary_keys.append(f'{row["column_name"]}')  # Add column name to primary key list
-                elif row["key_constraint"] == "UNIQUE":
-                    col_def += " UNIQUE"
+            df = pd.read_sql(text(query), conn, params=params)
 
-                columns_def.append(col_def)
-
-            # ✅ Build CREATE TABLE statement with schema "stg"
-            sql_stmt = f'CREATE TABLE IF NOT EXISTS {target_schema}."{table}" (\n    ' + ",\n    ".join(columns_def)
-
-            # ✅ Add primary keys at the end
-            if primary_keys:
-                pk_constraint = ",\n    " + f"PRIMARY KEY ({', '.join(primary_keys)})"
-                sql_stmt += pk_constraint
-
-            sql_stmt += "\n);"
+        existing = self._staging_tables(target_schema)
+        df = df[~df["target_table"].isin(existing)]
+        if df.empty:
+            self.logger.info("✅ All target tables already exist, nothing to create")
+            return
 
-            # self.logger.info(f"📝 Executing SQL:\n{sql_stmt}\n")
+        if isinstance(self.writer, ClickHouseWriter):
+            # ✅ ClickHouse staging: MergeTree tables with ClickHouse types, created over the native protocol
+            created = self.writer.create_tables(df, target_schema)
+            existing.update(created)
+            self.logger.info(f"✅ Table creation process completed! Created in ClickHouse: {', '.join(created)}")
+            return
 
-            # ✅ Execute the statement
-            with self.engine_staging.connect() as conn:
+        # ✅ Assemble column definitions for every row at once
+        data_type = df["target_data_type"].astype(str)
+        upper_type = data_type.str.upper()
+        col_def = df["column_name"].astype(str) + " " + data_type
+
+        # ✅ Apply length only for VARCHAR, CHAR; precision & scale only for DECIMAL, NUMERIC
+        has_length = upper_type.isin(["VARCHAR", "CHAR"]) & df["length"].notna()
+        col_def = col_def.mask(has_length, col_def + "(" + df["length"].fillna(0).astype(int).astype(str) + ")")
+        has_precision = upper_type.isin(["DECIMAL", "NUMERIC"]) & df["precisions"].notna() & df["scale"].notna()
+        col_def = col_def.mask(
+            has_precision,
+            col_def + "(" + df["precisions"].fillna(0).astype(int).astype(str) + ", " + df["scale"].fillna(0).astype(int).astype(str) + ")",
+        )
+
+        # ✅ Handle NULL/NOT NULL, default values and UNIQUE constraints
+        col_def = col_def.mask(df["nullable"] == False, col_def + " NOT NULL")
+        col_def = col_def.mask(df["default_value"].notna(), col_def + " DEFAULT " + df["default_value"].astype(str))
+        col_def = col_def.mask(df["key_constraint"] == "UNIQUE", col_def + " UNIQUE")
+
+        columns_def = col_def.groupby(df["target_table"]).agg(",\n    ".join)
+        is_pk = df["key_constraint"] == "PRIMARY KEY"
+        primary_keys = df.loc[is_pk, "column_name"].astype(str).groupby(df.loc[is_pk, "target_table"]).agg(", ".join)
+
+        # ✅ Build CREATE TABLE statements and execute them in one transaction
+        with self.engine_staging.begin() as conn:
+            for table, columns in columns_def.items():
+                sql_stmt = f'CREATE TABLE IF NOT EXISTS {target_schema}."{table}" (\n    ' + columns
+                if table in primary_keys.index:
+                    sql_stmt += ",\n    " + f"PRIMARY KEY ({primary_keys[table]})"
+                sql_stmt += "\n);"
                 conn.execute(text(sql_stmt))
-                conn.commit()
 
-        self.logger.info("✅ Table creation process completed!")
+        existing.update(columns_def.index)
+        self.logger.info(f"✅ Table creation process completed! Created: {', '.join(columns_def.index)}")
+
+    def _staging_tables(self, target_schema):
+        """Returns the cached set of table names in a staging schema, loading it once per process."""
+        with DatabaseETL._staging_catalog_lock:
+            if target_schema not in DatabaseETL._staging_catalog:
+                if isinstance(self.writer, ClickHouseWriter):
+                    DatabaseETL._staging_catalog[target_schema] = self.writer.table_names(target_schema)
+                else:
+                    DatabaseETL._staging_catalog[target_schema] = set(inspect(self.engine_staging).get_table_names(schema=target_schema))
+            return DatabaseETL._staging_catalog[target_schema]
 
 
     def _copy_single_record_db(self, record):
         """Extracts data from a source database and inserts it into the staging database."""
-        self.extract_and_store_schema(record.sourcetype,record.sourceschema,record.sourceobject,record.targetobject)
-        self.create_tables_from_lookup(record.targetschemaname)
+        metadata = self.extract_and_store_schema(record.sourcetype,record.sourceschema,record.sourceobject,record.targetobject,record.targetschemaname)
         self.logger.info(f"🔹 Processing DB record: {record.sourceid}")
 
         try:
-            with self.engine_source.connect() as conn_source, self.engine_staging.connect() as conn_staging:
-                # ✅ **Modify query to cast unsupported data types dynamically**
-                query = self.modify_sqlalchemy_query(conn_source, record.sourceschema, record.sourceobject)
-                df = pd.read_sql_query(text(query), conn_source)
-                # ✅ **Convert Data Types Dynamically**
-                df = self.convert_data_types(df, target_db="PostgreSQL")
-                df.columns = [col.lower().strip() for col in df.columns]
-
-
-                # ✅ **Optimize Column Name Formatting**
-                #df.columns = df.columns.str.replace(" ", "_").str.lower()
-
-                # ✅ **Optimized Batch Insert into Staging**
-                df.to_sql(
-                    record.targetobject,
-                    self.engine_staging,
-                    if_exists="append",
-                    index=False,
-                    schema=record.targetschemaname,
-                    method="multi",  # ✅ Faster bulk inserts
-                )
-
-                self.logger.info(f"✅ Copied {len(df)} records to staging")
-                return len(df)
+            with self.engine_source.connect() as conn_source:
+                with metrics.stage("metadata"):
+                    columns_info = self._fetch_source_columns(conn_source, record.sourceschema, record.sourceobject)
+
+                # ✅ **Push a watermark predicate down to the source for incremental loads**
+                watermark = self._incremental_watermark(record, columns_info)
+                predicate, params = (None, {}) if watermark is None else (watermark["predicate"], watermark["params"])
+
+                # ✅ **Plan type conversions once per object from the source column types**
+                plan = self._conversion_plan(record, columns_info)
+
+                # ✅ **Full loads in swap mode refresh a shadow table; a failed one leaves nothing to resume**
+                full_refresh = watermark is None and self._swap_enabled()
+                store = None if full_refresh else self._checkpoint_store(record)
+                if store is not None:
+                    # ✅ **Resume an interrupted load from its checkpoints, or plan checkpointed segments**
+                    segments = self._checkpoint_segments(store, conn_source, record, metadata, columns_info, predicate, params)
+                else:
+                    # ✅ **Split large tables into key ranges extracted concurrently**
+                    ranges = self._key_ranges(conn_source, record, metadata, columns_info, predicate, params)
+
+            with self._full_refresh(record, full_refresh):
+                if store is not None:
+                    total_rows, batches, high_watermark = self._load_segments(record, columns_info, watermark, segments, params, plan)
+                elif ranges:
+                    total_rows, batches, high_watermark = self._load_partitions(record, columns_info, watermark, ranges, plan)
+                else:
+                    # ✅ **Modify query to cast unsupported data types dynamically**
+                    query = self.modify_sqlalchemy_query(None, record.sourceschema, record.sourceobject, predicate=predicate, columns_info=columns_info)
+                    total_rows, batches, high_watermark = self._load_query(record, query, params, watermark, plan)
+
+            self.logger.info(f"✅ Copied {total_rows} records to staging in {batches} batches: {record.sourceobject}")
+
+            # ✅ **With a landing zone, seal the landed batch before the watermark moves past it**
+            landed = self._landed.get((record.targetschemaname, record.targetobject))
+            if landed is not None:
+                landed.seal(full=watermark is None)
+
+            # ✅ **Advance the watermark only once every batch is in staging (or landed)**
+            if watermark is not None and high_watermark is not None:
+                with metrics.stage("watermark"):
+                    self._advance_watermark(record, watermark, high_watermark)
+            if store is not None:
+                store.clear(record)
+            return total_rows
 
         except Exception as e:
             self.logger.error(f"❌ DB extraction error: {str(e)}")
-            return 0
+            # ✅ The failure may be schema drift; a retry reads this object's catalog again
+            self.catalog.invalidate(record.sourceschema, record.sourceobject)
+            raise
+
+    def _load_query(self, record, query, params, watermark, plan=None, checkpoint=None):
+        """Streams ``query`` from the source into staging; returns ``(rows, batches, high_watermark)``."""
+        if self.pipeline == "arrow":
+            return self._load_arrow_query(record, query, params, watermark, plan, checkpoint)
+
+        total_rows, batches = 0, 0
+        high_watermark = self._parse_watermark(watermark, checkpoint.high_watermark) if checkpoint is not None else None
+        # ✅ The cached plan is shared by every stream of the object; this stream resolves its own copy
+        plan = dict(plan) if plan is not None else None
+        with self._stream_slot(), self.engine_source.connect() as conn_source, self._segment_transaction(checkpoint) as staging_conn:
+            # ✅ **Stream batches from a server-side cursor and load each one as it arrives**
+            for df in self._timed(self._read_sql_batches(conn_source, query, params)):
+                if watermark is not None:
+                    batch_max = df[watermark["column"]].max()
+                    if pd.notna(batch_max) and (high_watermark is None or batch_max > high_watermark):
+                        high_watermark = batch_max
+                last_key = df[checkpoint.key].max() if checkpoint is not None and checkpoint.per_batch else None
+
+                # ✅ **Convert Data Types from the cached plan (value sniffing only without one)**
+                with metrics.stage("convert") as stage:
+                    df = self.apply_conversion_plan(df, plan) if plan is not None else self.convert_data_types(df, target_db="PostgreSQL")
+                    df.columns = [col.lower().strip() for col in df.columns]
+                    stage.add(len(df))
+
+                total_rows += self._write(df, record, staging_conn, checkpoint, last_key, high_watermark)
+                batches += 1
+            if checkpoint is not None:
+                checkpoint.finish(staging_conn, total_rows, high_watermark)
+        return total_rows, batches, high_watermark
+
+    def _load_arrow_query(self, record, query, params, watermark, plan=None, checkpoint=None):
+        """Arrow variant of ``_load_query``: batches stay Arrow record batches from the cursor to the staging writer."""
+        total_rows, batches = 0, 0
+        high_watermark = self._parse_watermark(watermark, checkpoint.high_watermark) if checkpoint is not None else None
+        watermark_column = watermark["column"].lower().strip() if watermark is not None else None
+        key_column = checkpoint.key.lower().strip() if checkpoint is not None and checkpoint.per_batch else None
+        with self._stream_slot(), self.engine_source.connect() as conn_source, self._segment_transaction(checkpoint) as staging_conn:
+            for batch in self._timed(self._read_arrow_batches(conn_source, query, params, plan)):
+                if watermark_column is not None:
+                    batch_max = pc.max(batch.column(watermark_column)).as_py()
+                    if batch_max is not None and (high_watermark is None or batch_max > high_watermark):
+                        high_watermark = batch_max
+                last_key = pc.max(batch.column(key_column)).as_py() if key_column is not None else None
+
+                total_rows += self._write(batch, record, staging_conn, checkpoint, last_key, high_watermark)
+                batches += 1
+            if checkpoint is not None:
+                checkpoint.finish(staging_conn, total_rows, high_watermark)
+        return total_rows, batches, high_watermark
+
+    def _key_ranges(self, conn_source, record, metadata, columns_info, predicate, params):
+        """Splits the table into ``partitions`` equal-width ranges on an integer key, or returns None.
+
+        The split column comes from ``etl.split_columns`` (per TargetObject) or else the first integer
+        primary-key column reported by ``_get_source_metadata``. Each range is ``(predicate, params)``.
+        """
+        partitions = int(self.settings.get("partitions") or 1)
+        if partitions <= 1:
+            return None
+
+        column = self._split_column(record, metadata, columns_info)
+        if column is None:
+            self.logger.info(f"🔹 No integer split column for {record.sourceobject}; extracting it as a single stream")
+            return None
+
+        bounds_query = f"SELECT MIN({column}), MAX({column}) FROM {record.sourceschema}.{record.sourceobject}"
+        if predicate:
+            bounds_query += f" WHERE {predicate}"
+        low, high = conn_source.execute(text(bounds_query), params).fetchone()
+        if low is None:
+            return None
+
+        low, high = int(low), int(high)
+        step = max(1, -(-(high - low + 1) // partitions))
+        ranges = []
+        for start in range(low, high + 1, step):
+            range_predicate = f"{column} >= :range_start AND {column} < :range_end"
+            if start == low:
+                range_predicate = f"(({range_predicate}) OR {column} IS NULL)"
+            if predicate:
+                range_predicate = f"({predicate}) AND {range_predicate}"
+            ranges.append((range_predicate, {**params, "range_start": start, "range_end": min(start + step, high + 1)}))
+
+        self.logger.info(f"🔹 Extracting {record.sourceobject} in {len(ranges)} ranges on {column} [{low}, {high}]")
+        return ranges
+
+    def _load_partitions(self, record, columns_info, watermark, ranges, plan=None):
+        """Extracts and loads key ranges concurrently over separate pooled connections and reconciles the totals."""
+        def load_range(key_range):
+            range_predicate, range_params = key_range
+            query = self.modify_sqlalchemy_query(None, record.sourceschema, record.sourceobject, predicate=range_predicate, columns_info=columns_info)
+            with metrics.track(DagScheduler.label(record), total=False):
+                return self._load_query(record, query, range_params, watermark, plan)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(ranges), self._stream_limit())) as executor:
+            results = list(executor.map(load_range, ranges))
+
+        high_watermarks = [high for _, _, high in results if high is not None]
+        return (
+            sum(rows for rows, _, _ in results),
+            sum(batches for _, batches, _ in results),
+            max(high_watermarks) if high_watermarks else None,
+        )
+
+    def _split_column(self, record, metadata, columns_info):
+        """Integer column to split or resume a table on: ``etl.split_columns`` for the TargetObject, else the first integer primary-key column."""
+        by_lower = {col.lower(): col for col in columns_info}
+        configured = (self.settings.get("split_columns") or {}).get(record.targetobject)
+        if configured:
+            candidates = [configured]
+        elif metadata is not None and not metadata.empty:
+            candidates = metadata.loc[metadata["key_constraint"] == "PRIMARY KEY", "column_name"].tolist()
+        else:
+            candidates = []
+        return next(
+            (by_lower[str(c).lower()] for c in candidates
+             if str(c).lower() in by_lower and str(columns_info[by_lower[str(c).lower()]]).lower() in self.WATERMARK_KEY_TYPES),
+            None,
+        )
+
+    def _checkpoint_store(self, record):
+        """Checkpoint store in the staging database, or None when checkpoints are off (etl.checkpoints / --no_checkpoints)."""
+        if not self.settings.get("checkpoints") or isinstance(self.writer, ClickHouseWriter):
+            # ✅ ClickHouse inserts are not transactional, so a checkpoint could not commit with its batch
+            return None
+        if (record.targetschemaname, record.targetobject) in self._landed:
+            # ✅ A landed batch is sealed whole or discarded, so there is nothing to resume
+            return None
+        return CheckpointStore(self.engine_staging, self.settings.get("checkpoint_schema") or record.targetschemaname)
+
+    def _resume_key(self, record, metadata, columns_info):
+        """The split column when it is the table's single-column primary key (unique and non-null), else None."""
+        column = self._split_column(record, metadata, columns_info)
+        if column is None or metadata is None or metadata.empty:
+            return None
+        primary_key = metadata.loc[metadata["key_constraint"] == "PRIMARY KEY", "column_name"].astype(str).str.lower().tolist()
+        return column if primary_key == [column.lower()] else None
+
+    def _checkpoint_segments(self, store, conn_source, record, metadata, columns_info, predicate, params):
+        """Segments of a checkpointed load: those of an interrupted attempt with the same extract, else a new plan."""
+        key = self._resume_key(record, metadata, columns_info)
+        fingerprint = hashlib.sha256(repr((
+            record.sourceschema, record.sourceobject, sorted(columns_info.items()), predicate,
+            sorted((name, str(value)) for name, value in params.items()), key,
+        )).encode("utf-8")).hexdigest()
+
+        segments = store.load(record, fingerprint)
+        if segments:
+            done = sum(segment.done for segment in segments)
+            self.logger.info(
+                f"🔁 Resuming {record.sourceobject} from its checkpoint: {done}/{len(segments)} segments done, "
+                f"{sum(segment.rows for segment in segments)} rows already in staging"
+            )
+            return segments
+
+        ranges = self._key_ranges(conn_source, record, metadata, columns_info, predicate, params) or [(predicate, params)]
+        if key is None:
+            self.logger.info(f"🔹 No single-column integer primary key on {record.sourceobject}; each segment loads in one staging transaction")
+        return store.plan(record, fingerprint, ranges, key)
+
+    def _load_segments(self, record, columns_info, watermark, segments, params, plan=None):
+        """Loads the unfinished segments of a checkpointed load; totals include rows committed by earlier attempts."""
+        pending = [segment for segment in segments if not segment.done]
+
+        def load_segment(segment):
+            predicate, segment_params, order_by = segment.query(params)
+            query = self.modify_sqlalchemy_query(None, record.sourceschema, record.sourceobject, predicate=predicate, columns_info=columns_info)
+            if order_by:
+                query += f" ORDER BY {order_by}"
+            with metrics.track(DagScheduler.label(record), total=False):
+                return self._load_query(record, query, segment_params, watermark, plan, checkpoint=segment)
+
+        if len(pending) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(pending), self._stream_limit())) as executor:
+                results = list(executor.map(load_segment, pending))
+        else:
+            results = [load_segment(segment) for segment in pending]
+
+        high_watermarks = [self._parse_watermark(watermark, segment.high_watermark) for segment in segments]
+        high_watermarks = [high for high in high_watermarks if high is not None]
+        return (
+            sum(segment.rows for segment in segments),
+            sum(batches for _, batches, _ in results),
+            max(high_watermarks) if high_watermarks else None,
+        )
+
+    def _stream_limit(self):
+        """Concurrent extract streams allowed per source: ``etl.max_streams_per_source``, else what both pools can serve.
+
+        Each stream holds one source and at most one staging connection, so without a configured cap
+        the limit is the smaller configured pool capacity (``pool_size + max_overflow``, from the
+        engine registry) less one connection kept for metadata queries of other records. Engines
+        built outside the registry fall back to ``partitions``.
+        """
+        configured = self.settings.get("max_streams_per_source")
+        if configured:
+            return max(1, int(configured))
+        capacities = [capacity for capacity in map(registry.capacity, (self.engine_source, self.engine_staging)) if capacity is not None]
+        return max(1, min(capacities) - 1) if capacities else max(1, int(self.settings.get("partitions") or 1))
+
+    def _stream_slot(self):
+        """Slot of the source's stream semaphore, shared by every record and partition extracting from it in this process."""
+        key = self.engine_source.url.render_as_string(hide_password=True)
+        with DatabaseETL._stream_slot_lock:
+            slots = DatabaseETL._stream_slots.get(key)
+            if slots is None:
+                slots = DatabaseETL._stream_slots[key] = threading.BoundedSemaphore(self._stream_limit())
+        return slots
+
+    @staticmethod
+    def _parse_watermark(watermark, value):
+        """Restores a high watermark stored as text in a checkpoint."""
+        if watermark is None or value is None:
+            return None
+        return pd.Timestamp(value) if watermark["kind"] == "date" else int(value)
+
+    def _segment_transaction(self, checkpoint):
+        """The staging transaction a segment without a resume key is written in; batch-checkpointed segments commit per batch."""
+        if checkpoint is None or checkpoint.per_batch:
+            return contextlib.nullcontext()
+        return self.engine_staging.begin()
+
+    def _swap_enabled(self):
+        """Whether full loads go through a shadow table (etl.load_mode: swap); needs PostgreSQL staging."""
+        if self.load_mode != "swap":
+            return False
+        if isinstance(self.writer, ClickHouseWriter) or self.engine_staging.dialect.name != "postgresql":
+            self.logger.warning("⚠️ load_mode swap needs PostgreSQL staging; appending to the staging table instead")
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def _full_refresh(self, record, enabled=True):
+        """Routes the record's writes into a shadow table and swaps it in when the block completes.
+
+        On failure the shadow table is dropped and the staging table keeps its previous contents.
+        """
+        if not enabled or (record.targetschemaname, record.targetobject) in self._landed:
+            yield
+            return
+        label = DagScheduler.label(record)
+        shadow = ShadowTable.from_settings(self.engine_staging, record.targetschemaname, record.targetobject, self.settings.get("swap"))
+        self._shadows[label] = shadow
+        try:
+            yield
+        except Exception:
+            shadow.discard()
+            raise
+        else:
+            with metrics.stage("swap"):
+                shadow.swap()
+        finally:
+            self._shadows.pop(label, None)
+
+    def _write(self, batch, record, conn=None, checkpoint=None, last_key=None, high_watermark=None):
+        """Writes one DataFrame or Arrow batch to the record's staging table, timed as the write stage.
+
+        With a per-batch checkpoint, the batch and its checkpoint commit in the same transaction.
+        While the record is extracted into the landing zone, the batch lands as Parquet instead.
+        """
+        if checkpoint is not None and checkpoint.per_batch and conn is None:
+            with self.engine_staging.begin() as conn:
+                rows = self._write(batch, record, conn)
+                checkpoint.advance(conn, last_key, rows, high_watermark)
+            return rows
+
+        landed = self._landed.get((record.targetschemaname, record.targetobject))
+        if landed is not None:
+            with metrics.stage("land") as stage:
+                rows = landed.write(batch)
+                stage.add(rows)
+            return rows
+
+        shadow = self._shadows.get(DagScheduler.label(record))
+        table = shadow.ensure() if shadow is not None else record.targetobject
+        with metrics.stage("write") as stage:
+            if isinstance(batch, pa.RecordBatch):
+                rows = self.writer.write_arrow(batch, table, record.targetschemaname, conn)
+            else:
+                rows = self.writer.write(batch, table, record.targetschemaname, conn)
+            stage.add(rows)
+        return rows
+
+    def _read_sql_batches(self, conn_source, query, params=None):
+        """Yields DataFrames of at most ``chunk_size`` rows (or ``batch_bytes`` bytes) from a server-side cursor."""
+        result = conn_source.execution_options(stream_results=True, max_row_buffer=self.chunk_size).execute(text(query), params or {})
+        columns = list(result.keys())
+
+        # ✅ With a byte budget, probe with a small first batch and size the rest from its footprint
+        fetch_size = min(self.chunk_size, 1000) if self.batch_bytes else self.chunk_size
+        while True:
+            rows = result.fetchmany(fetch_size)
+            if not rows:
+                break
+
+            df = pd.DataFrame.from_records(rows, columns=columns)
+            if self.batch_bytes:
+                row_bytes = max(1, int(df.memory_usage(deep=True).sum() / len(df)))
+                fetch_size = max(1, min(self.chunk_size, self.batch_bytes // row_bytes))
+            del rows
+            yield df
+
+    def _read_arrow_batches(self, conn_source, query, params=None, plan=None):
+        """Yields ``pyarrow.RecordBatch``es built column by column from a server-side cursor.
+
+        Columns are typed from the conversion plan and named in lower case, as in staging.
+        """
+        result = conn_source.execution_options(stream_results=True, max_row_buffer=self.chunk_size).execute(text(query), params or {})
+        columns = list(result.keys())
+        names = [col.lower().strip() for col in columns]
+        types = [self.ARROW_TYPES.get((plan or {}).get(col)) for col in columns]
+
+        fetch_size = min(self.chunk_size, 1000) if self.batch_bytes else self.chunk_size
+        while True:
+            rows = result.fetchmany(fetch_size)
+            if not rows:
+                break
+
+            arrays = [self._arrow_array(values, arrow_type) for values, arrow_type in zip(zip(*rows), types)]
+            batch = pa.RecordBatch.from_arrays(arrays, names=names)
+            if self.batch_bytes:
+                row_bytes = max(1, batch.nbytes // batch.num_rows)
+                fetch_size = max(1, min(self.chunk_size, self.batch_bytes // row_bytes))
+            del rows, arrays
+            yield batch
+
+    @staticmethod
+    def _arrow_array(values, arrow_type):
+        """Builds an Arrow array of the planned type, falling back to inference (plus a cast) and then to text."""
+        errors = (pa.ArrowException, TypeError, ValueError, OverflowError)
+        if any(isinstance(value, memoryview) for value in values[:1000]):
+            # ✅ psycopg2 returns bytea as memoryview; arrays built straight from them grow memory batch after batch
+            values = [bytes(value) if isinstance(value, memoryview) else value for value in values]
+        if arrow_type is not None:
+            try:
+                return pa.array(values, type=arrow_type)
+            except errors:
+                pass
+        try:
+            array = pa.array(values)
+        except errors:
+            return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+        if arrow_type is not None:
+            try:
+                return array.cast(arrow_type)
+            except errors:
+                pass
+        return array
+
+    def _fetch_source_columns(self, conn_source, schema_name, table_name):
+        """Returns ``{column_name: data_type}`` for a source table, from the run's catalog when the source has one."""
+        if self.catalog.supported:
+            return self.catalog.columns(schema_name, table_name)
 
-    def modify_sqlalchemy_query(self, conn_source, schema_name, table_name):
-        """Fetch column data types and modify query to cast unsupported types."""
-        query = f"""
+        query = """
             SELECT COLUMN_NAME, DATA_TYPE
             FROM INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_SCHEMA = '{schema_name}' AND TABLE_NAME = '{table_name}'
+            WHERE TABLE_SCHEMA = :schema_name AND TABLE_NAME = :table_name
+            ORDER BY ORDINAL_POSITION
         """
+        result = conn_source.execute(text(query), {"schema_name": schema_name, "table_name": table_name})
+        return {row[0]: row[1] for row in result.fetchall()}
 
-        result = conn_source.execute(text(query))
-        columns_info = {row[0]: row[1] for row in result.fetchall()}
+    def modify_sqlalchemy_query(self, conn_source, schema_name, table_name, predicate=None, columns_info=None):
+        """Fetch column data types and modify query to cast unsupported types."""
+        if columns_info is None:
+            columns_info = self._fetch_source_columns(conn_source, schema_name, table_name)
 
-        unsupported_types = {"geography", "geometry", "hierarchyid", "xml", "uniqueidentifier"}
+        unsupported_types = self.CAST_TO_TEXT_TYPES
         cast_columns = []
 
         for col_name, col_type in columns_info.items():
@@ -310,10 +898,183 @@ class DatabaseETL:
             else:
                 cast_columns.append(col_name)
         final_query = f"SELECT {', '.join(cast_columns)} FROM {schema_name}.{table_name}"
+        if predicate:
+            final_query += f" WHERE {predicate}"
         #self.logger.info(f"🔍 Final modified query: {final_query}")
 
         return final_query
-    
+
+    def _incremental_watermark(self, record, columns_info):
+        """Resolves the watermark predicate for incremental loads, or ``None`` for a full extract.
+
+        Date/time columns resume after the high watermark stored in ``EtlLastRunDate``; integer keys
+        resume after the highest key stored in ``ods.etl_watermark``. Both use a strict ``>``, so append
+        loads never stage a row twice. Only ``load_mode: merge`` re-reads ``IntervalDays`` of look-back
+        (``>=``) to pick up late-arriving rows, since the upsert applies repeated rows idempotently.
+        """
+        if str(record.loadtype or "").strip().lower() not in self.INCREMENTAL_LOAD_TYPES:
+            return None
+
+        column = self._watermark_column(record, columns_info)
+        if column is None:
+            self.logger.warning(f"⚠️ No watermark column found for incremental load of {record.sourceobject}; running a full extract")
+            return None
+
+        data_type = str(columns_info[column]).lower()
+        operator = ">"
+        if data_type in self.WATERMARK_DATE_TYPES:
+            kind = "date"
+            last_value = record.etllastrundate
+            look_back = int(record.intervaldays or 0)
+            if last_value is not None and look_back > 0:
+                if isinstance(self.writer, PostgresMergeWriter):
+                    last_value = pd.Timestamp(last_value) - pd.Timedelta(days=look_back)
+                    operator = ">="
+                else:
+                    self.logger.warning(
+                        f"⚠️ IntervalDays={look_back} of {record.sourceobject} ignored: look-back would duplicate rows "
+                        f"in load_mode {self.settings.get('load_mode', 'append')}; use load_mode merge to re-read late rows"
+                    )
+            if last_value is not None:
+                last_value = pd.Timestamp(last_value).to_pydatetime()
+        elif data_type in self.WATERMARK_KEY_TYPES:
+            kind = "key"
+            last_value = self._stored_key_watermark(record, column)
+        else:
+            self.logger.warning(f"⚠️ Watermark column {column} has unsupported type {data_type}; running a full extract")
+            return None
+
+        if last_value is None:
+            self.logger.info(f"🔹 No watermark yet for {record.sourceobject}; running a full extract to seed it")
+            predicate, params = None, {}
+        else:
+            predicate = f"{column} {operator} :watermark"
+            params = {"watermark": last_value}
+            self.logger.info(f"🔹 Incremental load of {record.sourceobject}: {column} {operator} {last_value}")
+
+        return {"column": column, "kind": kind, "predicate": predicate, "params": params}
+
+    def _watermark_column(self, record, columns_info):
+        """Picks the configured watermark column for the target object, else the first known candidate present."""
+        by_lower = {col.lower(): col for col in columns_info}
+        configured = (self.settings.get("watermark_columns") or {}).get(record.targetobject)
+        candidates = [configured] if configured else self.settings.get("watermark_candidates") or []
+        for candidate in candidates:
+            if str(candidate).lower() in by_lower:
+                return by_lower[str(candidate).lower()]
+        return None
+
+    def _ensure_watermark_table(self):
+        if DatabaseETL._watermark_table_ready:
+            return
+        with self.engine_srcconfig.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS ods.etl_watermark (
+                    sourceid VARCHAR(255) NOT NULL,
+                    targetobject VARCHAR(255) NOT NULL,
+                    watermark_column VARCHAR(255) NOT NULL,
+                    watermark_value TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (sourceid, targetobject)
+                );
+            """))
+        DatabaseETL._watermark_table_ready = True
+
+    def _stored_key_watermark(self, record, column):
+        self._ensure_watermark_table()
+        query = """
+            SELECT watermark_value FROM ods.etl_watermark
+            WHERE sourceid = :sourceid AND targetobject = :targetobject AND watermark_column = :watermark_column
+        """
+        with self.engine_srcconfig.connect() as conn:
+            value = conn.execute(text(query), {
+                "sourceid": str(record.sourceid),
+                "targetobject": record.targetobject,
+                "watermark_column": column,
+            }).scalar()
+        return None if value is None else int(value)
+
+    def _advance_watermark(self, record, watermark, high_watermark):
+        """Persists the highest extracted watermark value in the control tables."""
+        if watermark["kind"] == "date":
+            query = """
+                UPDATE ods.ControlDetail SET EtlLastRunDate = :watermark
+                WHERE SourceId = :sourceid AND TargetObject = :targetobject AND DataflowFlag = :dataflowflag
+            """
+            params = {
+                "watermark": pd.Timestamp(high_watermark).to_pydatetime(),
+                "sourceid": record.sourceid,
+                "targetobject": record.targetobject,
+                "dataflowflag": record.dataflowflag,
+            }
+        else:
+            self._ensure_watermark_table()
+            query = """
+                INSERT INTO ods.etl_watermark (sourceid, targetobject, watermark_column, watermark_value, updated_at)
+                VALUES (:sourceid, :targetobject, :watermark_column, :watermark, CURRENT_TIMESTAMP)
+                ON CONFLICT (sourceid, targetobject) DO UPDATE
+                SET watermark_column = EXCLUDED.watermark_column,
+                    watermark_value = EXCLUDED.watermark_value,
+                    updated_at = EXCLUDED.updated_at
+            """
+            params = {
+                "watermark": str(int(high_watermark)),
+                "sourceid": str(record.sourceid),
+                "targetobject": record.targetobject,
+                "watermark_column": watermark["column"],
+            }
+
+        with self.engine_srcconfig.begin() as conn:
+            conn.execute(text(query), params)
+        self.logger.info(f"✅ Watermark for {record.sourceobject} advanced to {high_watermark}")
+
+    def _conversion_plan(self, record, columns_info):
+        """Maps each column to a target dtype from its source type; cached per object and column set.
+
+        The cached dict is shared across threads and records and is never modified after it is built.
+        """
+        key = (record.sourcetype, record.sourceschema, record.sourceobject, tuple(columns_info.items()))
+        with DatabaseETL._conversion_plan_lock:
+            if key not in DatabaseETL._conversion_plans:
+                DatabaseETL._conversion_plans[key] = {
+                    col: self.SOURCE_TYPE_CONVERSIONS.get(str(col_type).lower(), "string" if str(col_type).lower() in self.CAST_TO_TEXT_TYPES else None)
+                    for col, col_type in columns_info.items()
+                }
+            return DatabaseETL._conversion_plans[key]
+
+    def apply_conversion_plan(self, df, plan):
+        """Applies a conversion plan to a batch with vectorised casts and compact dtypes.
+
+        Integers become nullable ints sized to the source type, timezone-aware types are normalised
+        to UTC, and string columns whose first batch is low-cardinality become categoricals. ``plan``
+        must be the caller's own copy: the category decision is written back into it. A failed cast
+        leaves that column of this batch unchanged and is retried on the next batch.
+        """
+        for col, kind in plan.items():
+            if kind is None or col not in df.columns:
+                continue
+            series = df[col]
+            try:
+                if kind == "datetimetz":
+                    if not isinstance(series.dtype, pd.DatetimeTZDtype):
+                        df[col] = pd.to_datetime(series, errors="coerce", utc=True)
+                elif kind == "datetime":
+                    # ✅ Text arrives as object or, on pandas 3, as the str dtype
+                    if not pd.api.types.is_datetime64_any_dtype(series):
+                        df[col] = pd.to_datetime(series, errors="coerce")
+                elif kind == "string":
+                    # ✅ Decided once, on the first batch, and remembered in the plan
+                    plan[col] = "category" if len(series) >= 1000 and series.nunique() <= len(series) * self.CATEGORY_RATIO else "object"
+                    if plan[col] == "category":
+                        df[col] = series.astype("category")
+                elif kind == "category":
+                    df[col] = series.astype("category")
+                elif kind != "object" and series.dtype != kind:
+                    df[col] = series.astype(kind)
+            except (TypeError, ValueError, OverflowError) as e:
+                self.logger.warning(f"⚠️ Could not convert {col} to {kind} in this batch, leaving it as {series.dtype}: {e}")
+        return df
+
     def convert_data_types(self, df, target_db):
         """Dynamically converts database types for compatibility across different DBs."""
         for col in df.columns:
@@ -341,92 +1102,225 @@ class DatabaseETL:
 
         return df
     def _copy_single_record_flat_file(self, record):
-        """Extracts schema, stores metadata, creates a table, and inserts data for flat files."""
-        self.logger.info(f"🔹 Processing flat file: {record.sourceobject}")
-
-        try:
-            file_extension = record.sourceobject.split('.')[-1].lower()
-            file_path = os.path.join(record.connectionstr, record.sourceobject)
-
-            # ✅ Read the entire file first (to avoid duplicate I/O)
-            if file_extension == 'csv':
-                df = pd.read_csv(file_path)
-            elif file_extension == 'tsv':
-                df = pd.read_csv(file_path, sep='\t')
-            elif file_extension in ['xls', 'xlsx']:
-                df = pd.read_excel(file_path)
-            elif file_extension == 'parquet':
-                df = pd.read_parquet(file_path, engine='pyarrow')
-            elif file_extension == 'json':
-                df = pd.read_json(file_path, lines=True)
-            else:
-                self.logger.error(f"❌ Unsupported file format: {file_extension}")
-                return 0
-            
-            #df.columns = df.columns.str.strip('"')
-            df.columns = [col.lower().strip() for col in df.columns]
-
-            # ✅ Extract schema from first few rows (without re-reading the file)
-            schema_df = df.head(5)
-
-            # ✅ Format metadata for `source_lookup`
-            metadata = pd.DataFrame({
-                "column_id": range(1, len(schema_df.columns) + 1),
-                "column_name": schema_df.columns,
-                "source_data_type": schema_df.dtypes.astype(str),
-                "length": None,
-                "precisions": None,
-                "scale": None,
-                "nullable": True,
-                "key_constraint": None
-            })
-
-            metadata["source_type"] = record.sourcetype
-            metadata["source_schema"] = "FlatFiles"
-            metadata["source_table"] = record.sourceobject
-            metadata["target_table"] = record.targetobject
-
-            # ✅ Store metadata in `source_lookup`
-            with self.engine_srcconfig.connect() as conn:
-                metadata.to_sql("source_lookup", conn, if_exists="append", index=False, schema="ods")
-
-            self.logger.info(f"✅ Metadata for {record.sourceobject} stored in source_lookup!")
+        """Loads a flat file, or every file matched when SourceObject is a glob pattern."""
+        file_path = os.path.join(record.connectionstr, record.sourceobject)
+        if glob.has_magic(record.sourceobject):
+            # ✅ File sets load incrementally through the manifest, so they always append
+            return self._copy_file_set(record, file_path)
+        with self._full_refresh(record, self._swap_enabled()):
+            return self._copy_flat_file(record, file_path)
+
+    def _copy_file_set(self, record, pattern):
+        """Loads the files matched by a glob pattern in parallel, skipping files the manifest marks as loaded.
+
+        A file counts as loaded when its size and mtime match the manifest, or when it changed on disk
+        but its content hash did not. Each file loads in one staging transaction, which also records it
+        in the staging schema's ``etl_file_manifest``. Rows are tagged with their file's path
+        (``etl.file_source_column``), so a loaded file whose content changed is reloaded in place: its
+        earlier rows are deleted in the transaction that writes the new ones. With ``load_mode: merge``
+        into a table with a primary key, the changed file is simply upserted again. ClickHouse staging
+        is not tagged and appends a changed file again.
+        """
+        files = sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        self.logger.info(f"🔹 {len(files)} files match {record.sourceobject}")
+
+        store = FileManifest(self.engine_staging, record.targetschemaname)
+        manifest = store.load(record)
+        pending = []
+        for path in files:
+            stat = os.stat(path)
+            entry = manifest.get(path)
+            if entry and entry["file_size"] == stat.st_size and entry["file_mtime"] == stat.st_mtime:
+                continue
+            content_hash = self._file_hash(path)
+            if entry and entry["content_hash"] == content_hash:
+                store.save(None, record, path, stat, content_hash, entry["rows_loaded"])
+                continue
+            if entry:
+                self.logger.info(f"🔄 {path} changed since it was loaded ({entry['rows_loaded']} rows); reloading it")
+            pending.append((path, stat, content_hash, entry is not None))
+
+        skipped = len(files) - len(pending)
+        if skipped:
+            self.logger.info(f"⏭️ {skipped} files already loaded for {record.sourceobject}")
+        if not pending:
+            return 0
 
-            # ✅ Call stored procedure to process metadata
-            self.call_sp()
+        # ✅ ClickHouse tables are created from main_lookup alone and cannot take the file column
+        tagged = not isinstance(self.writer, ClickHouseWriter)
+
+        def load(item):
+            path, stat, content_hash, reload = item
+            replace = reload and tagged and not self._upserts(record)
+            if replace:
+                self._ensure_source_file_column(record)
+            elif reload and not tagged:
+                self.logger.warning(f"⚠️ {path} is appended again: ClickHouse staging keeps the rows of its earlier load")
+            with metrics.track(DagScheduler.label(record), total=False):
+                # ✅ A file's rows and its manifest entry commit together, so a retry neither skips nor repeats it
+                with self.engine_staging.begin() as conn:
+                    if replace:
+                        self._delete_file_rows(record, path, conn)
+                    rows = self._copy_flat_file(record, path, conn, source_file=tagged)
+                    store.save(conn, record, path, stat, content_hash, rows)
+            return rows
+
+        # ✅ The first file registers the schema; the rest load concurrently
+        total_rows, errors = load(pending[0]), []
+        workers = max(1, int(self.settings.get("file_workers") or 4))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(load, item): item[0] for item in pending[1:]}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    total_rows += future.result()
+                except Exception as e:
+                    errors.append(f"{futures[future]}: {e}")
+
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(pending)} files failed to load: {'; '.join(errors)}")
+
+        self.logger.info(f"✅ Copied {total_rows} records from {len(pending)} files to staging: {record.sourceobject}")
+        return total_rows
+
+    def _upserts(self, record):
+        """Whether writes to the record's table are primary-key upserts, so reloading a file cannot duplicate rows."""
+        return isinstance(self.writer, PostgresMergeWriter) and bool(self.writer._prepare_table(record.targetschemaname, record.targetobject))
+
+    def _source_file_column(self):
+        return str(self.settings.get("file_source_column") or "etl_source_file").lower()
+
+    def _ensure_source_file_column(self, record):
+        """Adds the file-of-origin column to the record's staging table once per process, on its own connection."""
+        key = (str(self.engine_staging.url), record.targetschemaname, record.targetobject)
+        with DatabaseETL._source_file_lock:
+            if key in DatabaseETL._source_file_tables:
+                return
+            column = self._source_file_column()
+            existing = {col["name"].lower() for col in inspect(self.engine_staging).get_columns(record.targetobject, schema=record.targetschemaname)}
+            if column not in existing:
+                preparer = self.engine_staging.dialect.identifier_preparer
+                with self.engine_staging.begin() as conn:
+                    conn.execute(text(
+                        f"ALTER TABLE {preparer.quote(record.targetschemaname)}.{preparer.quote(record.targetobject)} "
+                        f"ADD COLUMN {preparer.quote(column)} TEXT"
+                    ))
+            DatabaseETL._source_file_tables.add(key)
+
+    def _delete_file_rows(self, record, path, conn):
+        """Deletes the rows an earlier load of ``path`` staged, inside the transaction that reloads it."""
+        preparer = self.engine_staging.dialect.identifier_preparer
+        deleted = conn.execute(text(
+            f"DELETE FROM {preparer.quote(record.targetschemaname)}.{preparer.quote(record.targetobject)} "
+            f"WHERE {preparer.quote(self._source_file_column())} = :path"
+        ), {"path": path}).rowcount
+        self.logger.info(f"🔄 Replacing {deleted} rows of {path} in {record.targetobject}")
+
+    @staticmethod
+    def _file_hash(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _copy_flat_file(self, record, file_path, conn=None, source_file=False):
+        """Extracts schema, stores metadata, creates a table, and inserts data for flat files.
+
+        With ``conn``, every batch is written in that staging transaction. With ``source_file``, each
+        row is tagged with ``file_path`` in the ``etl.file_source_column`` column.
+        """
+        self.logger.info(f"🔹 Processing flat file: {file_path}")
 
-            # ✅ Create table using metadata from `main_lookup`
-            self.create_tables_from_lookup(record.targetschemaname)
+        try:
+            reader = FlatFileReader(self.chunk_size, memory_map=bool(self.settings.get("memory_map")))
 
-            # ✅ Insert full data into staging
-            df.to_sql(
-                record.targetobject,
-                self.engine_staging,
-                if_exists="append",
-                index=False,
-                schema=record.targetschemaname
-            )
+            # ✅ Stream the file in batches; the first batch defines the schema
+            total_rows, batches = 0, 0
+            for df in self._timed(reader.iter_batches(file_path)):
+                #df.columns = df.columns.str.strip('"')
+                df.columns = [col.lower().strip() for col in df.columns]
 
-            self.logger.info(f"✅ Copied {len(df)} records to staging")
-            return len(df)
+                if batches == 0:
+                    # ✅ Extract schema from first few rows (without re-reading the file)
+                    schema_df = df.head(5)
+
+                    # ✅ Format metadata for `source_lookup`
+                    metadata = pd.DataFrame({
+                        "column_id": range(1, len(schema_df.columns) + 1),
+                        "column_name": schema_df.columns,
+                        "source_data_type": schema_df.dtypes.astype(str),
+                        "length": None,
+                        "precisions": None,
+                        "scale": None,
+                        "nullable": True,
+                        "key_constraint": None
+                    })
+
+                    # ✅ Register metadata and create the staging table (skipped when the schema is unchanged)
+                    self.register_schema(metadata, record.sourcetype, "FlatFiles", record.sourceobject, record.targetobject, record.targetschemaname)
+                    if source_file:
+                        self._ensure_source_file_column(record)
+
+                if source_file:
+                    df[self._source_file_column()] = file_path
+
+                # ✅ Insert each batch into staging as soon as it is read
+                total_rows += self._write(df, record, conn)
+                batches += 1
+
+            self.logger.info(f"✅ Copied {total_rows} records to staging in {batches} batches: {file_path}")
+            return total_rows
 
         except FileNotFoundError:
             self.logger.error(f"❌ File not found: {file_path}")
+            raise
         except pd.errors.EmptyDataError:
             self.logger.error(f"❌ Empty file: {file_path}")
+            raise
         except Exception as e:
             self.logger.error(f"❌ Flat file processing error: {str(e)}")
+            raise
 
-        return 0
     def _copy_single_record_api(self, record):
         self.logger.info(f"🔹 Processing API record: {record.sourceobject}")
         try:
-            response = requests.get(record.apiurl, headers={'Authorization': f'Bearer {record.apiaccesstoken}'})
-            response.raise_for_status()
+            if self.api_extractor is None:
+                self.api_extractor = APIExtractor(self.settings.get("api"))
+
+            # ✅ Pages stream into staging in batches of ``chunk_size`` records
+            total_rows, batches, columns, pending = 0, 0, None, []
+            with self._full_refresh(record, self._swap_enabled()):
+                for page in self._timed(self.api_extractor.extract(record)):
+                    pending.extend(page)
+                    if len(pending) >= self.chunk_size:
+                        columns = self._load_api_batch(record, pending, columns)
+                        total_rows, batches, pending = total_rows + len(pending), batches + 1, []
+                if pending or columns is None:
+                    columns = self._load_api_batch(record, pending, columns)
+                    total_rows, batches = total_rows + len(pending), batches + 1
+
+            self.logger.info(f"✅ Copied {total_rows} records to staging in {batches} batches: {record.sourceobject}")
+            return total_rows
+
+        except requests.exceptions.RequestException as e:
+            self.logger.error(f"❌ API request error: {str(e)}")
+            raise
+        except Exception as e:
+            self.logger.error(f"❌ API processing error: {str(e)}")
+            raise
 
-            df = pd.json_normalize(response.json())
+    def _load_api_batch(self, record, rows, columns):
+        """Normalizes one batch of API records and loads it; the first batch registers the schema.
+
+        Returns the staging column list. Later batches are aligned to it, since the staging table
+        was created from the first batch.
+        """
+        with metrics.stage("convert") as stage:
+            df = pd.json_normalize(rows)
             df.columns = [col.lower().strip() for col in df.columns]
+            stage.add(len(df))
 
+        if columns is None:
             # ✅ Extract schema from first few rows
             schema_df = df.head(5)
 
@@ -442,38 +1336,15 @@ class DatabaseETL:
                 "key_constraint": None
             })
 
-            metadata["source_type"] = record.sourcetype
-            metadata["source_schema"] = "API"
-            metadata["source_table"] = record.sourceobject
-            metadata["target_table"] = record.targetobject
-
-            # ✅ Store metadata in `source_lookup`
-            with self.engine_srcconfig.connect() as conn:
-                metadata.to_sql("source_lookup", conn, if_exists="append", index=False, schema="ods")
-
-            self.logger.info(f"✅ Metadata for {record.sourceobject} stored in source_lookup!")
-
-            # ✅ Call stored procedure to process metadata
-            self.call_sp()
-
-            # ✅ Create table using metadata from `main_lookup`
-            self.create_tables_from_lookup(record.targetschemaname)
-
-            # ✅ Insert full data into staging
-            df.to_sql(
-                record.targetobject,
-                self.engine_staging,
-                if_exists="append",
-                index=False,
-                schema=record.targetschemaname
-            )
-
-            self.logger.info(f"✅ Copied {len(df)} records to staging")
-            return len(df)
-
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"❌ API request error: {str(e)}")
-        except Exception as e:
-            self.logger.error(f"❌ API processing error: {str(e)}")
-
-
+            # ✅ Register metadata and create the staging table (skipped when the schema is unchanged)
+            self.register_schema(metadata, record.sourcetype, "API", record.sourceobject, record.targetobject, record.targetschemaname)
+            columns = list(df.columns)
+        else:
+            extra = [col for col in df.columns if col not in columns]
+            if extra:
+                self.logger.warning(f"⚠️ Dropping fields not present in the first batch of {record.sourceobject}: {', '.join(extra)}")
+            df = df.reindex(columns=columns)
+
+        if not df.empty:
+            self._write(df, record)
+        return columns
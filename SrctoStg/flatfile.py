@@ -0,0 +1,106 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from SrctoStg.logs import LoggerManager
+
+
+class FlatFileReader:
+    """Reads CSV/TSV, JSON-lines, Parquet and Excel files as a stream of DataFrame batches.
+
+    CSV/TSV dtypes are inferred from a first-batch probe and pinned for the whole file, so every
+    batch matches the staging table created from the first one. Pinned columns are read as text and
+    cast per batch; a column with a value its pinned type cannot hold (``1.5`` in an integer column,
+    free text in a numeric one) stays text from that batch on instead of failing the file. Parquet
+    is read through pyarrow row group by row group; Excel has no streaming reader and comes back as
+    a single batch.
+    """
+
+    EXTENSIONS = ("csv", "tsv", "json", "parquet", "xls", "xlsx")
+    BOOLEANS = {"True": True, "TRUE": True, "true": True, "False": False, "FALSE": False, "false": False}
+
+    def __init__(self, chunk_size=50000, memory_map=False):
+        self.chunk_size = chunk_size
+        self.memory_map = memory_map
+        self.logger = LoggerManager().logger
+
+    @staticmethod
+    def extension(path):
+        return str(path).split('.')[-1].lower()
+
+    def iter_batches(self, file_path):
+        """Yields DataFrames of at most ``chunk_size`` rows from ``file_path``."""
+        file_extension = self.extension(file_path)
+        if file_extension == 'csv':
+            yield from self._iter_csv(file_path, sep=',')
+        elif file_extension == 'tsv':
+            yield from self._iter_csv(file_path, sep='\t')
+        elif file_extension == 'json':
+            with pd.read_json(file_path, lines=True, chunksize=self.chunk_size) as reader:
+                yield from reader
+        elif file_extension == 'parquet':
+            yield from self._iter_parquet(file_path)
+        elif file_extension in ['xls', 'xlsx']:
+            yield pd.read_excel(file_path)
+        else:
+            raise ValueError(f"Unsupported file format: {file_extension}")
+
+    def _iter_csv(self, file_path, sep):
+        # ✅ Infer dtypes from the first batch, then stream the whole file with those dtypes pinned
+        probe = pd.read_csv(file_path, sep=sep, nrows=self.chunk_size, memory_map=self.memory_map)
+        if len(probe) < self.chunk_size:
+            yield probe
+            return
+
+        pinned = {col: dtype for col, dtype in self._pinned_dtypes(probe).items() if dtype != "object"}
+        reader = pd.read_csv(
+            file_path,
+            sep=sep,
+            dtype={col: "object" for col in probe.columns},
+            chunksize=self.chunk_size,
+            memory_map=self.memory_map,
+        )
+        with reader:
+            for chunk in reader:
+                for col, dtype in list(pinned.items()):
+                    try:
+                        chunk[col] = self._cast(chunk[col], dtype)
+                    except (TypeError, ValueError) as e:
+                        # ✅ Relax the column to text for the rest of the file rather than failing it
+                        self.logger.warning(f"⚠️ {file_path}: column {col} no longer fits {dtype} ({e}); reading it as text")
+                        del pinned[col]
+                yield chunk
+
+    @staticmethod
+    def _pinned_dtypes(df):
+        """Explicit dtypes for the remaining chunks; integers and booleans become nullable."""
+        dtypes = {}
+        for col, dtype in df.dtypes.items():
+            if df[col].isna().all():
+                dtypes[col] = "object"
+            elif pd.api.types.is_bool_dtype(dtype):
+                dtypes[col] = "boolean"
+            elif pd.api.types.is_integer_dtype(dtype):
+                dtypes[col] = "Int64"
+            elif pd.api.types.is_float_dtype(dtype):
+                dtypes[col] = "float64"
+            else:
+                dtypes[col] = "object"
+        return dtypes
+
+    @classmethod
+    def _cast(cls, series, dtype):
+        """Casts a text column to its pinned dtype; raises ValueError on a value the dtype cannot hold."""
+        values = series.dropna()
+        if dtype == "boolean":
+            converted = values.map(cls.BOOLEANS)
+        else:
+            converted = pd.to_numeric(values, errors="coerce")
+        invalid = converted.isna()
+        if invalid.any():
+            raise ValueError(f"unparseable value {values[invalid].iloc[0]!r}")
+        return converted.astype(dtype).reindex(series.index)
+
+    def _iter_parquet(self, file_path):
+        parquet_file = pq.ParquetFile(file_path, memory_map=self.memory_map)
+        for row_group in range(parquet_file.num_row_groups):
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size, row_groups=[row_group]):
+                yield batch.to_pandas()
@@ -0,0 +1,226 @@
+import os
+import json
+import glob
+import time
+import uuid
+import shutil
+import threading
+import contextlib
+import datetime as dt
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from SrctoStg.logs import LoggerManager
+
+
+class LandedBatch:
+    """One extract of one object in the landing zone: compressed Parquet parts plus a manifest.
+
+    Parts are written into a hidden temporary directory. ``seal`` writes the manifest and renames
+    the directory into place, so readers only ever see complete extracts. The load stage marks a
+    batch loaded once it has committed to staging.
+    """
+
+    MANIFEST = "_manifest.json"
+    LOADED = "_loaded.json"
+    SCHEMA = "_schema.parquet"
+
+    def __init__(self, path, final_path=None, compression="zstd", manifest=None):
+        self.path = path
+        self.final_path = final_path or path
+        self.compression = compression
+        self.manifest = manifest or {}
+        self.sealed = final_path is None
+        self._parts = 0
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path):
+        with open(os.path.join(path, cls.MANIFEST), "r") as file:
+            return cls(path, manifest=json.load(file))
+
+    @property
+    def name(self):
+        return os.path.basename(self.final_path)
+
+    @property
+    def full(self):
+        return bool(self.manifest.get("full", True))
+
+    @property
+    def rows(self):
+        return self.manifest.get("rows", self._rows)
+
+    @property
+    def loaded(self):
+        return os.path.exists(os.path.join(self.path, self.LOADED))
+
+    def write(self, batch):
+        """Writes one DataFrame or Arrow batch as a Parquet part; returns its row count."""
+        if isinstance(batch, pd.DataFrame):
+            try:
+                table = pa.Table.from_pandas(batch, preserve_index=False)
+            except (pa.ArrowException, TypeError, ValueError):
+                # ✅ Mixed-type object columns land as text, which staging parses as before
+                text_columns = {col: "string" for col in batch.columns[batch.dtypes == object]}
+                table = pa.Table.from_pandas(batch.astype(text_columns), preserve_index=False)
+        else:
+            table = pa.Table.from_batches([batch])
+        if table.num_rows == 0:
+            return 0
+
+        with self._lock:
+            part = self._parts
+            self._parts += 1
+        pq.write_table(table, os.path.join(self.path, f"part-{part:05d}.parquet"), compression=self.compression)
+        with self._lock:
+            self._rows += table.num_rows
+        return table.num_rows
+
+    def defer_schema(self, metadata, source_type, source_schema, source_table, target_table, target_schema):
+        """Keeps the schema registration for the load stage, which runs it against the config and staging DBs."""
+        metadata.to_parquet(os.path.join(self.path, self.SCHEMA), index=False)
+        self.manifest["schema"] = {
+            "source_type": source_type,
+            "source_schema": source_schema,
+            "source_table": source_table,
+            "target_table": target_table,
+            "target_schema": target_schema,
+        }
+
+    def schema(self):
+        """Returns the deferred ``register_schema`` arguments, or None when the extract had none."""
+        args = self.manifest.get("schema")
+        if args is None:
+            return None
+        return (pd.read_parquet(os.path.join(self.path, self.SCHEMA)), args["source_type"], args["source_schema"],
+                args["source_table"], args["target_table"], args["target_schema"])
+
+    def seal(self, full=True):
+        """Writes the manifest and moves the batch into place; a full extract supersedes older batches when loaded."""
+        if self.sealed:
+            return
+        self.manifest.update(full=full, rows=self._rows, parts=self._parts, sealed_at=dt.datetime.now().isoformat(timespec="seconds"))
+        with open(os.path.join(self.path, self.MANIFEST), "w") as file:
+            json.dump(self.manifest, file, separators=(",", ":"))
+        os.makedirs(os.path.dirname(self.final_path), exist_ok=True)
+        os.replace(self.path, self.final_path)
+        self.path = self.final_path
+        self.sealed = True
+
+    def discard(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def iter_batches(self, batch_size):
+        """Yields the landed rows as Arrow record batches, part by part."""
+        for part in sorted(glob.glob(os.path.join(self.path, "part-*.parquet"))):
+            yield from pq.ParquetFile(part).iter_batches(batch_size=batch_size)
+
+    def mark_loaded(self, rows, superseded=False):
+        with open(os.path.join(self.path, self.LOADED), "w") as file:
+            json.dump({"loaded_at": dt.datetime.now().isoformat(timespec="seconds"), "rows": rows, "superseded": superseded}, file)
+
+
+class LandingZone:
+    """Local stand-in for the ADLS landing area: extracts land here as Parquet, loads read them back.
+
+    Each object lands under ``root/<ADLSContainerName>/<DLDirStructure>``. DLDirStructure may use
+    control-record fields as placeholders (``{SourceName}/{TargetObject}``, case-insensitive); when
+    it is empty, ``{SourceId}/{TargetObject}`` is used. Batches are partitioned by extract date:
+    ``load_date=YYYY-MM-DD/batch=<timestamp>-<EtlBatchId>``. Loaded batches beyond the newest ``keep``
+    are pruned, so recent extracts can be replayed into staging without reading the source again.
+    """
+
+    DEFAULT_LAYOUT = "{sourceid}/{targetobject}"
+    STALE_SECONDS = 86400
+
+    def __init__(self, root="landing", compression="zstd", keep=3, etl_batch_id=None):
+        self.root = root
+        self.compression = compression
+        self.keep = max(1, int(keep))
+        self.etl_batch_id = etl_batch_id or uuid.uuid4().hex[:11]
+        self.logger = LoggerManager().logger
+
+    @classmethod
+    def from_settings(cls, settings):
+        """Builds the landing zone from the ``etl.landing`` config section."""
+        landing = settings.get("landing") or {}
+        return cls(
+            root=landing.get("root", "landing"),
+            compression=landing.get("compression", "zstd"),
+            keep=landing.get("keep", 3),
+            etl_batch_id=settings.get("etl_batch_id"),
+        )
+
+    def directory(self, record):
+        fields = record._asdict() if hasattr(record, "_asdict") else vars(record)
+        fields = {str(key).lower(): "" if value is None else str(value) for key, value in fields.items()}
+        template = (fields.get("dldirstructure") or "").strip() or self.DEFAULT_LAYOUT
+        try:
+            relative = template.format_map(_Fields(fields))
+        except (KeyError, ValueError, IndexError) as e:
+            raise ValueError(f"DLDirStructure {template!r} of {record.sourceid}:{record.targetobject} cannot be resolved: {e}") from e
+
+        parts = [part for part in [fields.get("adlscontainername", "")] + relative.replace("\\", "/").split("/") if part and part != "."]
+        if ".." in parts:
+            raise ValueError(f"Landing path of {record.sourceid}:{record.targetobject} leaves the landing root: {'/'.join(parts)}")
+        return os.path.join(self.root, *parts)
+
+    @contextlib.contextmanager
+    def extract(self, record):
+        """Yields a new batch for ``record``; it is sealed when the block completes and discarded if it fails first."""
+        directory = self.directory(record)
+        now = dt.datetime.now()
+        final_path = os.path.join(directory, f"load_date={now:%Y-%m-%d}", f"batch={now:%Y%m%dT%H%M%S%f}-{self.etl_batch_id}")
+        temp_path = os.path.join(directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(temp_path)
+        batch = LandedBatch(temp_path, final_path, self.compression, {
+            "sourceid": str(record.sourceid),
+            "targetobject": record.targetobject,
+            "etl_batch_id": self.etl_batch_id,
+            "extracted_at": now.isoformat(timespec="seconds"),
+        })
+        try:
+            yield batch
+        except Exception:
+            if not batch.sealed:
+                batch.discard()
+            raise
+        batch.seal()
+        self.logger.info(f"💾 Landed {batch.rows} rows of {record.targetobject} in {batch.path}")
+
+    def batches(self, record):
+        """Sealed batches of ``record``, oldest first."""
+        paths = glob.glob(os.path.join(self.directory(record), "load_date=*", "batch=*", LandedBatch.MANIFEST))
+        return [LandedBatch.open(os.path.dirname(path)) for path in sorted(paths, key=lambda path: os.path.basename(os.path.dirname(path)))]
+
+    def pending(self, record, replay=False):
+        """Batches still to load, oldest first; with ``replay``, the newest batch whether loaded or not."""
+        batches = self.batches(record)
+        if replay:
+            return batches[-1:]
+        return [batch for batch in batches if not batch.loaded]
+
+    def prune(self, record):
+        """Drops loaded batches beyond the newest ``keep``, empty date partitions and abandoned temporary extracts."""
+        loaded = [batch for batch in self.batches(record) if batch.loaded]
+        for batch in loaded[:-self.keep]:
+            batch.discard()
+        directory = self.directory(record)
+        for partition in glob.glob(os.path.join(directory, "load_date=*")):
+            with contextlib.suppress(OSError):
+                os.rmdir(partition)
+        for temp_path in glob.glob(os.path.join(directory, ".tmp-*")):
+            if time.time() - os.path.getmtime(temp_path) > self.STALE_SECONDS:
+                shutil.rmtree(temp_path, ignore_errors=True)
+
+
+class _Fields(dict):
+    """Record fields for DLDirStructure placeholders, looked up case-insensitively."""
+
+    def __missing__(self, key):
+        lowered = key.lower()
+        if lowered != key and lowered in self:
+            return self[lowered]
+        raise KeyError(key)
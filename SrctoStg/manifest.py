@@ -0,0 +1,78 @@
+import threading
+from sqlalchemy import text
+
+
+class FileManifest:
+    """Files of a glob file set already loaded, kept in the staging database next to the rows they produced.
+
+    An entry is written on the same connection, and so in the same transaction, as the file's rows:
+    a file is either staged and recorded, or neither, and a rerun never loads it twice.
+    """
+
+    TABLE = "etl_file_manifest"
+    _ready = set()
+    _lock = threading.Lock()
+
+    def __init__(self, engine, schema):
+        self.engine = engine
+        self.schema = schema
+        preparer = engine.dialect.identifier_preparer
+        self.table = f"{preparer.quote(schema)}.{preparer.quote(self.TABLE)}"
+
+    def ensure(self):
+        key = (str(self.engine.url), self.schema)
+        with FileManifest._lock:
+            if key in FileManifest._ready:
+                return
+            with self.engine.begin() as conn:
+                conn.execute(text(f"""
+                    CREATE TABLE IF NOT EXISTS {self.table} (
+                        sourceid VARCHAR(255) NOT NULL,
+                        targetobject VARCHAR(255) NOT NULL,
+                        file_path TEXT NOT NULL,
+                        file_size BIGINT,
+                        file_mtime DOUBLE PRECISION,
+                        content_hash CHAR(64),
+                        rows_loaded BIGINT,
+                        loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (sourceid, targetobject, file_path)
+                    );
+                """))
+            FileManifest._ready.add(key)
+
+    def load(self, record):
+        """Returns ``{file_path: entry}`` of files already loaded for ``record``."""
+        self.ensure()
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(f"""
+                SELECT file_path, file_size, file_mtime, content_hash, rows_loaded FROM {self.table}
+                WHERE sourceid = :sourceid AND targetobject = :targetobject
+            """), self._keys(record)).mappings().fetchall()
+        return {row["file_path"]: dict(row) for row in rows}
+
+    def save(self, conn, record, path, stat, content_hash, rows_loaded):
+        """Records a loaded file on ``conn``, inside the transaction that wrote its rows (its own one without ``conn``)."""
+        query = text(f"""
+            INSERT INTO {self.table} (sourceid, targetobject, file_path, file_size, file_mtime, content_hash, rows_loaded, loaded_at)
+            VALUES (:sourceid, :targetobject, :file_path, :file_size, :file_mtime, :content_hash, :rows_loaded, CURRENT_TIMESTAMP)
+            ON CONFLICT (sourceid, targetobject, file_path) DO UPDATE
+            SET file_size = EXCLUDED.file_size, file_mtime = EXCLUDED.file_mtime, content_hash = EXCLUDED.content_hash,
+                rows_loaded = EXCLUDED.rows_loaded, loaded_at = EXCLUDED.loaded_at
+        """)
+        params = {
+            **self._keys(record),
+            "file_path": path,
+            "file_size": stat.st_size,
+            "file_mtime": stat.st_mtime,
+            "content_hash": content_hash,
+            "rows_loaded": rows_loaded,
+        }
+        if conn is not None:
+            conn.execute(query, params)
+        else:
+            with self.engine.begin() as own_conn:
+                own_conn.execute(query, params)
+
+    @staticmethod
+    def _keys(record):
+        return {"sourceid": str(record.sourceid), "targetobject": record.targetobject}
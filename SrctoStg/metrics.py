@@ -0,0 +1,179 @@
+import os
+import io
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextlib
+import datetime as dt
+from collections import defaultdict
+from SrctoStg.logs import LoggerManager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where it cannot be read."""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class StageTimer:
+    """Handle yielded by ``RunMetrics.stage``; the timed code adds the rows and bytes it handled."""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, rows=0, nbytes=0):
+        self.rows += int(rows or 0)
+        self.bytes += int(nbytes or 0)
+
+
+class RunMetrics:
+    """Process-wide per-object, per-stage wall time, rows, bytes and peak RSS for a run.
+
+    The object a stage belongs to is tracked per thread with ``track(label)``; worker threads
+    that load part of an object (key ranges, files of a glob) call ``track`` themselves.
+    Stages that run once per batch (read, convert, write) accumulate.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stages = defaultdict(lambda: defaultdict(lambda: {"seconds": 0.0, "calls": 0, "rows": 0, "bytes": 0}))
+        self._objects = {}
+        self._counters = defaultdict(lambda: defaultdict(int))
+
+    @contextlib.contextmanager
+    def track(self, label, total=True):
+        """Attributes the stages timed on this thread to ``label`` while the block runs.
+
+        Worker threads that handle part of an object pass ``total=False`` so that the object's
+        wall time is counted once, by the thread that owns it.
+        """
+        previous = getattr(self._local, "label", None)
+        self._local.label = label
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.label = previous
+            if total:
+                with self._lock:
+                    entry = self._objects.setdefault(label, {"seconds": 0.0, "peak_rss_mb": None})
+                    entry["seconds"] += elapsed
+                    entry["peak_rss_mb"] = peak_rss_mb()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times one stage of the current object; ``add`` rows/bytes on the yielded handle."""
+        timer = StageTimer()
+        start = time.perf_counter()
+        try:
+            yield timer
+        finally:
+            elapsed = time.perf_counter() - start
+            label = getattr(self._local, "label", None) or "unattributed"
+            with self._lock:
+                entry = self._stages[label][name]
+                entry["seconds"] += elapsed
+                entry["calls"] += 1
+                entry["rows"] += timer.rows
+                entry["bytes"] += timer.bytes
+
+    def count(self, name, value):
+        """Adds ``value`` to a named counter of the current object (e.g. rows inserted/updated by a merge)."""
+        label = getattr(self._local, "label", None) or "unattributed"
+        with self._lock:
+            self._counters[label][name] += int(value or 0)
+
+    def report(self, labels=None):
+        """Returns the run report: one entry per object with its stages and rows/sec."""
+        with self._lock:
+            objects = []
+            for label in labels or sorted(set(self._stages) | set(self._objects) | set(self._counters)):
+                stages = {}
+                for name, entry in self._stages.get(label, {}).items():
+                    stages[name] = {
+                        **entry,
+                        "seconds": round(entry["seconds"], 4),
+                        "rows_per_sec": round(entry["rows"] / entry["seconds"], 1) if entry["rows"] and entry["seconds"] else None,
+                    }
+                totals = self._objects.get(label, {})
+                objects.append({
+                    "object": label,
+                    "seconds": round(totals.get("seconds", 0.0), 4),
+                    "peak_rss_mb": totals.get("peak_rss_mb"),
+                    "stages": stages,
+                    "counters": dict(self._counters.get(label, {})),
+                })
+            return objects
+
+    def merge(self, objects):
+        """Folds report entries produced in another process into this one."""
+        with self._lock:
+            for obj in objects:
+                entry = self._objects.setdefault(obj["object"], {"seconds": 0.0, "peak_rss_mb": None})
+                entry["seconds"] += obj["seconds"]
+                entry["peak_rss_mb"] = max(filter(None, [entry["peak_rss_mb"], obj["peak_rss_mb"]]), default=None)
+                for name, stage in obj["stages"].items():
+                    target = self._stages[obj["object"]][name]
+                    for key in ("seconds", "calls", "rows", "bytes"):
+                        target[key] += stage[key]
+                for name, value in obj.get("counters", {}).items():
+                    self._counters[obj["object"]][name] += value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._objects.clear()
+            self._counters.clear()
+
+
+metrics = RunMetrics()
+
+
+@contextlib.contextmanager
+def profiled(label, mode="cprofile", log_dir="Logs", top=25):
+    """Captures a cProfile or tracemalloc profile of the block and logs the top entries.
+
+    cProfile output is also saved as a ``.prof`` file for snakeviz/pstats. Only the calling
+    thread is profiled; run with ``--partitions 1`` to keep an object on a single thread.
+    """
+    logger = LoggerManager().logger
+    stamp = dt.datetime.now().strftime('%Y-%m-%d %H-%M-%S')
+    safe_label = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in str(label))
+
+    if mode == "tracemalloc":
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start(25)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if not already_tracing:
+                tracemalloc.stop()
+            lines = [f"{stat.size / 1024 / 1024:10.2f} MB {stat.count:>10} blocks  {stat.traceback}" for stat in snapshot.statistics("lineno")[:top]]
+            logger.info(f"🧪 tracemalloc for {label}: peak traced {peak / 1024 / 1024:.1f} MB, largest live allocations:\n" + "\n".join(lines))
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        file_path = os.path.join(os.getcwd(), log_dir, f"{stamp} {safe_label}.prof")
+        profiler.dump_stats(file_path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        logger.info(f"🧪 cProfile for {label} saved to {file_path}:\n{out.getvalue()}")
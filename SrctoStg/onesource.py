@@ -2,35 +2,64 @@ import time
 import functools
 from collections import namedtuple
 from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from SrctoStg.connections import DBConnectionManager
-from SrctoStg import ArgumentParser
+from SrctoStg import generate_etl_batch_id
 from SrctoStg.logs import LoggerManager
 
 
 class OneSource:
-    def __init__(self):
-        self.cli_args = ArgumentParser().parse_args()
+    def __init__(self, etl_batch_id=None):
+        self.logger = LoggerManager().logger
         self.Record = None
-        self.etl_batch_id = ArgumentParser().etl_batch_id
+        self.etl_batch_id = etl_batch_id or generate_etl_batch_id()
     
-    def control_entries(self, dataflowflag=None, sources=None, groups=None, exclude_sources=None, exclude_groups=None, object_type=None, calling_sequence=None, load_frequency=None, failed_only=False):
+    def control_entries(self, dataflowflag=None, sources=None, groups=None, exclude_sources=None, exclude_groups=None, object_type=None, calling_sequence=None, load_frequency=None, failed_only=False, snapshot=None):
+        """Resolves the control-table entries; with a ``ControlPlanSnapshot`` a fresh local copy is used instead of the query."""
+        filters = {
+            'dataflowflag': dataflowflag,
+            'sources': list(sources) if sources else None,
+            'groups': list(groups) if groups else None,
+            'exclude_sources': list(exclude_sources) if exclude_sources else None,
+            'exclude_groups': list(exclude_groups) if exclude_groups else None,
+            'object_type': list(object_type) if object_type else None,
+            'calling_sequence': list(calling_sequence) if calling_sequence else None,
+            'load_frequency': load_frequency,
+            'failed_only': bool(failed_only),
+        }
+        cached = snapshot.read(filters) if snapshot is not None else None
+        if cached is not None and snapshot.validate == 'ttl' and snapshot.trusted_unchecked(cached):
+            self.logger.info(f"💾 Using control-plan snapshot from {snapshot.age(cached):.0f}s ago")
+            return self._records(cached['columns'], cached['rows'])
+
         engine = DBConnectionManager().new_db_connection('source-config')
         query = self._control_table_query(sources, groups, exclude_sources, exclude_groups, object_type, calling_sequence, load_frequency, failed_only)
         params = {
-            'dataflowflag': dataflowflag,
-            'sources': tuple(sources) if sources else None,
-            'groups': tuple(groups) if groups else None,
-            'exclude_sources': tuple(exclude_sources) if exclude_sources else None,
-            'exclude_groups': tuple(exclude_groups) if exclude_groups else None,
-            'object_type': tuple(object_type) if object_type else None,
-            'calling_sequence': tuple(calling_sequence) if calling_sequence else None,
-            'load_frequency': load_frequency,
+            key: tuple(value) if isinstance(value, list) else value
+            for key, value in filters.items() if key != 'failed_only'
         }
-        with engine.connect() as conn:
-            result = conn.execute(text(query), params)
-            rows = result.fetchall()
-            self.Record = namedtuple('Record', result.keys())
-            return [self.Record(*row) for row in rows]
+        try:
+            with engine.connect() as conn:
+                version = conn.execute(text(snapshot.VERSION_QUERY), params).scalar() if snapshot is not None else None
+                if cached is not None and cached['version'] == version:
+                    self.logger.info("💾 Control tables unchanged; using the control-plan snapshot")
+                    return self._records(cached['columns'], cached['rows'])
+                result = conn.execute(text(query), params)
+                columns, rows = list(result.keys()), result.fetchall()
+        except SQLAlchemyError as e:
+            # ✅ Ride out a brief config-DB outage on a snapshot that is still within its TTL
+            if cached is None or not snapshot.trusted_unchecked(cached):
+                raise
+            self.logger.warning(f"⚠️ Config DB unavailable ({e}); using the control-plan snapshot from {snapshot.age(cached):.0f}s ago")
+            return self._records(cached['columns'], cached['rows'])
+
+        if snapshot is not None:
+            snapshot.write(filters, version, columns, rows)
+        return self._records(columns, rows)
+
+    def _records(self, columns, rows):
+        self.Record = namedtuple('Record', columns)
+        return [self.Record(*row) for row in rows]
     
     def _control_table_query(self, sources=None, groups=None, exclude_sources=None, exclude_groups=None, object_type=None, calling_sequence=None, load_frequency=None, failed_only=False):
         query = '''
@@ -83,51 +112,3 @@ class OneSource:
             query += "\n\tAND detail.FlowStatus = 'Failed'"
         query += '\n\tORDER BY header.Id'
         return query
-
-    def audit_start(self, sourceid, targetobject, dataflowflag, source_count, user_agent, etl_batch_id):
-        engine = DBConnectionManager().new_db_connection('source-config')
-        query = "CALL ods.usp_etlpreprocess(:sourceid, :targetobject, :dataflowflag, :source_count, :user_agent, :etl_batch_id, NULL);"
-        params = {
-            'sourceid': sourceid,
-            'targetobject': targetobject,
-            'dataflowflag': dataflowflag,
-            'source_count': source_count,
-            'user_agent': user_agent,
-            'etl_batch_id': etl_batch_id,
-        }
-        with engine.begin() as conn:
-            result = conn.execute(text(query), params)
-            latestbatchid, = result.fetchone()
-        return latestbatchid
-    
-    def audit_end(self, sourceid, targetobject, dataflowflag, latestbatchid, source_count, insert_count, update_count):
-        engine = DBConnectionManager().new_db_connection('source-config')
-        query = "CALL ods.usp_etlpostprocess(:sourceid, :targetobject, :dataflowflag, :latestbatchid, :source_count, :insert_count, :update_count);"
-        params = {
-            'sourceid': sourceid,
-            'targetobject': targetobject,
-            'dataflowflag': dataflowflag,
-            'latestbatchid': latestbatchid,
-            'source_count': source_count,
-            'insert_count': insert_count,
-            'update_count': update_count,
-        }
-        with engine.begin() as conn:
-            conn.execute(text(query), params)
-
-    def audit_error(self, sourceid, targetobject, dataflowflag, latestbatchid, task, package, error_id, error_desc, error_line):
-        engine = DBConnectionManager().new_db_connection('source-config')
-        query = "CALL ods.usp_etlerrorinsert(:sourceid, :targetobject, :dataflowflag, :latestbatchid, :task, :package, :error_id, :error_desc, :error_line);"
-        params = {
-            'sourceid': sourceid,
-            'targetobject': targetobject,
-            'dataflowflag': dataflowflag,
-            'latestbatchid': latestbatchid,
-            'task': task,
-            'package': package,
-            'error_id': error_id,
-            'error_desc': error_desc,
-            'error_line': error_line,
-        }
-        with engine.begin() as conn:
-            conn.execute(text(query), params)
@@ -0,0 +1,166 @@
+import heapq
+import concurrent.futures
+from collections import defaultdict
+from SrctoStg.logs import LoggerManager
+
+
+class DagScheduler:
+    """Runs control records as a dependency graph built from DepSource and SourceCallingSeq.
+
+    ``DepSource`` lists the SourceIds (or, for non-numeric values, SourceNames) a record waits for,
+    delimited like ``--sources``; dependencies outside the current record set are treated as already
+    satisfied. A record never waits on itself or on records sharing its SourceId or SourceName, so a
+    DepSource naming the record's own source system adds no edges.
+    Among records that are ready, lower ``SourceCallingSeq`` values are released first.
+    A failed record marks everything downstream of it as skipped.
+
+    ``limits(record)`` may return ``(key, cap)`` pairs; a record is only released while fewer
+    than ``cap`` running records share each of its keys (e.g. per source type or per server).
+    """
+
+    SUCCEEDED, FAILED, SKIPPED = "succeeded", "failed", "skipped"
+
+    def __init__(self, records, max_workers=8, delimiter=",", limits=None):
+        self.logger = LoggerManager().logger
+        self.records = list(records)
+        self.max_workers = max(1, int(max_workers))
+        self.delimiter = delimiter
+        self.limits = limits or (lambda record: ())
+        self.results = {}
+        self._build_graph()
+
+    @staticmethod
+    def label(record):
+        return f"{record.sourceid}:{record.targetobject}"
+
+    def _build_graph(self):
+        by_id, by_name = defaultdict(set), defaultdict(set)
+        for index, record in enumerate(self.records):
+            by_id[self._key(record.sourceid)].add(index)
+            if self._key(getattr(record, "sourcename", None)):
+                by_name[self._key(record.sourcename)].add(index)
+
+        self.upstream = {index: set() for index in range(len(self.records))}
+        self.downstream = defaultdict(set)
+        for index, record in enumerate(self.records):
+            # ✅ Siblings share the record's header, and with it its DepSource
+            siblings = by_id[self._key(record.sourceid)] | by_name.get(self._key(getattr(record, "sourcename", None)), set())
+            for dependency in str(record.depsource or "").split(self.delimiter):
+                dependency = self._key(dependency)
+                if not dependency or dependency in ("none", "null", "0"):
+                    continue
+                matches = by_id.get(dependency, set())
+                if not self._numeric(dependency):
+                    matches = matches | by_name.get(dependency, set())
+                if not matches:
+                    self.logger.info(f"🔹 {self.label(record)} depends on '{dependency}', which is not in this run; treating it as satisfied")
+                    continue
+                for upstream in matches - siblings - {index}:
+                    self.upstream[index].add(upstream)
+                    self.downstream[upstream].add(index)
+
+    @staticmethod
+    def _key(value):
+        return str(value if value is not None else "").strip().lower()
+
+    @staticmethod
+    def _numeric(value):
+        try:
+            float(value)
+        except ValueError:
+            return False
+        return True
+
+    def _priority(self, index):
+        seq = self.records[index].sourcecallingseq
+        try:
+            return (float(seq), index)
+        except (TypeError, ValueError):
+            return (float("inf"), index)
+
+    def _skip_downstream(self, index):
+        stack = list(self.downstream[index])
+        while stack:
+            node = stack.pop()
+            if node in self.results:
+                continue
+            self.results[node] = (self.SKIPPED, f"upstream {self.label(self.records[index])} failed")
+            self.logger.warning(f"⏭️ Skipping {self.label(self.records[node])}: upstream {self.label(self.records[index])} failed")
+            stack.extend(self.downstream[node])
+
+    def _next_ready(self, ready, in_use):
+        """Pops the highest-priority ready record whose concurrency limits have room, if any."""
+        blocked = []
+        chosen = None
+        while ready:
+            item = heapq.heappop(ready)
+            if all(in_use[key] < cap for key, cap in self.limits(self.records[item[1]])):
+                chosen = item[1]
+                break
+            blocked.append(item)
+        for item in blocked:
+            heapq.heappush(ready, item)
+        return chosen
+
+    def run(self, process, executor=None, payload=None, on_start=None, on_finish=None):
+        """Calls ``process(payload(record))`` for every record, respecting dependencies and limits.
+
+        Uses a private thread pool unless an ``executor`` is given (the caller owns its shutdown).
+        ``on_start(record)`` and ``on_finish(record, status, result_or_error)`` run on the scheduling
+        thread as each record is submitted and completes (skipped records are never started).
+        Returns ``{label: (status, result_or_error)}``.
+        """
+        payload = payload or (lambda record: record)
+        if executor is None:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return self.run(process, executor, payload, on_start, on_finish)
+
+        remaining = {index: len(upstream) for index, upstream in self.upstream.items()}
+        ready = [self._priority(index) for index, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        in_use = defaultdict(int)
+
+        running = {}
+        while ready or running:
+            while len(running) < self.max_workers:
+                index = self._next_ready(ready, in_use)
+                if index is None:
+                    break
+                for key, _ in self.limits(self.records[index]):
+                    in_use[key] += 1
+                if on_start is not None:
+                    on_start(self.records[index])
+                running[executor.submit(process, payload(self.records[index]))] = index
+
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                record = self.records[index]
+                for key, _ in self.limits(record):
+                    in_use[key] -= 1
+                try:
+                    self.results[index] = (self.SUCCEEDED, future.result())
+                except Exception as e:
+                    self.results[index] = (self.FAILED, e)
+                    self.logger.error(f"❌ Error processing record {record.sourceobject}: {e}")
+                    if on_finish is not None:
+                        on_finish(record, *self.results[index])
+                    self._skip_downstream(index)
+                    continue
+                if on_finish is not None:
+                    on_finish(record, *self.results[index])
+
+                for node in self.downstream[index]:
+                    remaining[node] -= 1
+                    if remaining[node] == 0 and node not in self.results:
+                        heapq.heappush(ready, self._priority(node))
+
+        # ✅ Anything never released sits on a dependency cycle
+        for index in range(len(self.records)):
+            if index not in self.results:
+                self.results[index] = (self.FAILED, "dependency cycle")
+                self.logger.error(f"❌ Dependency cycle detected at {self.label(self.records[index])}, not processed")
+
+        return {self.label(self.records[index]): outcome for index, outcome in sorted(self.results.items())}
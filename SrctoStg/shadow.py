@@ -0,0 +1,127 @@
+import re
+import threading
+from sqlalchemy import text
+from SrctoStg.logs import LoggerManager
+
+
+class ShadowTable:
+    """Full-refresh target for a PostgreSQL staging table, swapped in by rename once the load completes.
+
+    The shadow is an UNLOGGED, index-free copy of the staging table's columns, created on the
+    first write. ``swap`` makes it durable (unless ``logged`` is off), rebuilds the live table's
+    constraints, indexes and grants on it, then renames it over the live table and drops the old
+    one in a single transaction. Readers see either the previous snapshot or the new one, never a
+    half-loaded table, and no DELETE is needed before the next refresh.
+    """
+
+    SUFFIX = "__shadow"
+    OLD_SUFFIX = "__old"
+    INDEX_PATTERN = re.compile(r'^(CREATE (?:UNIQUE )?INDEX )("(?:[^"]|"")+"|\S+)( ON (?:ONLY )?)(\S+)')
+
+    def __init__(self, engine, schema, table, logged=True, lock_timeout="30s"):
+        self.engine = engine
+        self.schema = schema
+        self.table = table
+        self.name = self._name(table, self.SUFFIX)
+        self.logged = logged
+        self.lock_timeout = lock_timeout
+        self.logger = LoggerManager().logger
+        self._lock = threading.Lock()
+        self._created = False
+
+    @classmethod
+    def from_settings(cls, engine, schema, table, settings):
+        settings = settings or {}
+        return cls(engine, schema, table, logged=settings.get("logged", True), lock_timeout=settings.get("lock_timeout", "30s"))
+
+    def ensure(self):
+        """Creates the shadow table on first use and returns its name."""
+        with self._lock:
+            if not self._created:
+                with self.engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {self._qualified(self.name)}"))
+                    conn.execute(text(
+                        f"CREATE UNLOGGED TABLE {self._qualified(self.name)} (LIKE {self._qualified(self.table)} "
+                        "INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING IDENTITY)"
+                    ))
+                self._created = True
+        return self.name
+
+    def swap(self):
+        """Indexes the shadow table and atomically replaces the live table with it."""
+        self.ensure()
+        live = self._qualified(self.table)
+        shadow = self._qualified(self.name)
+        with self.engine.connect() as conn:
+            constraints = conn.execute(text("""
+                SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+                WHERE conrelid = to_regclass(:table) AND contype IN ('p', 'u', 'x', 'f')
+                ORDER BY contype = 'f', conname
+            """), {"table": live}).fetchall()
+            indexes = conn.execute(text("""
+                SELECT index_class.relname, pg_get_indexdef(index_class.oid)
+                FROM pg_index idx JOIN pg_class index_class ON index_class.oid = idx.indexrelid
+                WHERE idx.indrelid = to_regclass(:table)
+                  AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = idx.indexrelid)
+            """), {"table": live}).fetchall()
+            grants = conn.execute(text("""
+                SELECT grantee, privilege_type FROM information_schema.role_table_grants
+                WHERE table_schema = :schema AND table_name = :table AND grantee <> current_user
+            """), {"schema": self.schema, "table": self.table}).fetchall()
+
+        try:
+            # ✅ Make the table durable and build its keys and indexes once, after the bulk load
+            renames = []
+            with self.engine.begin() as conn:
+                if self.logged:
+                    conn.execute(text(f"ALTER TABLE {shadow} SET LOGGED"))
+                for name, definition in constraints:
+                    temp = self._name(name, self.SUFFIX)
+                    conn.execute(text(f"ALTER TABLE {shadow} ADD CONSTRAINT {self._quote(temp)} {definition}"))
+                    renames.append(f"ALTER TABLE {live} RENAME CONSTRAINT {self._quote(temp)} TO {self._quote(name)}")
+                for name, definition in indexes:
+                    temp = self._name(name, self.SUFFIX)
+                    statement, count = self.INDEX_PATTERN.subn(lambda m: f"{m.group(1)}{self._quote(temp)}{m.group(3)}{shadow}", definition)
+                    if not count:
+                        self.logger.warning(f"⚠️ Could not rebuild index {name} on {self.table}: {definition}")
+                        continue
+                    conn.execute(text(statement))
+                    renames.append(f"ALTER INDEX {self._qualified(temp)} RENAME TO {self._quote(name)}")
+                for grantee, privilege in grants:
+                    conn.execute(text(f"GRANT {privilege} ON {shadow} TO {grantee if grantee == 'PUBLIC' else self._quote(grantee)}"))
+
+            # ✅ Swap in one transaction: readers block briefly on the rename, then see the new snapshot
+            old_name = self._name(self.table, self.OLD_SUFFIX)
+            with self.engine.begin() as conn:
+                if self.lock_timeout:
+                    conn.execute(text(f"SET LOCAL lock_timeout = '{self.lock_timeout}'"))
+                conn.execute(text(f"ALTER TABLE {live} RENAME TO {self._quote(old_name)}"))
+                conn.execute(text(f"ALTER TABLE {shadow} RENAME TO {self._quote(self.table)}"))
+                # Fails, and rolls the renames back, when a view still depends on the old table
+                conn.execute(text(f"DROP TABLE {self._qualified(old_name)}"))
+                for statement in renames:
+                    conn.execute(text(statement))
+        except Exception as e:
+            self.discard()
+            raise RuntimeError(f"Swapping in the refreshed {self.schema}.{self.table} failed; the live table is unchanged: {e}") from e
+        self.logger.info(f"🔄 Swapped the refreshed {self.schema}.{self.table} into place")
+
+    def discard(self):
+        """Drops the shadow table after a failed load; the live table is untouched."""
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {self._qualified(self.name)}"))
+        except Exception as e:
+            self.logger.warning(f"⚠️ Could not drop shadow table {self.schema}.{self.name}: {e}")
+
+    def _qualified(self, name):
+        return f"{self._quote(self.schema)}.{self._quote(name)}"
+
+    @staticmethod
+    def _quote(identifier):
+        return '"' + str(identifier).replace('"', '""') + '"'
+
+    @staticmethod
+    def _name(name, suffix):
+        # PostgreSQL truncates identifiers at 63 bytes; keep the suffix
+        return name[:63 - len(suffix)] + suffix
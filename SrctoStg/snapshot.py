@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import hashlib
+import datetime as dt
+from decimal import Decimal
+from SrctoStg.logs import LoggerManager
+
+
+class ControlPlanSnapshot:
+    """Local JSON copy of a resolved control-table record set, keyed by the filters that produced it.
+
+    A snapshot is reused while it is younger than ``ttl`` seconds (``validate: ttl``), or while the
+    version token of ``ods.ControlHeader`` / ``ods.ControlDetail`` still matches (``validate: version``).
+    When the config DB cannot be reached, a version-checked snapshot still younger than ``ttl`` is
+    used with a warning, so a brief outage does not stop the run.
+
+    Runs move state the plan carries: incremental loads advance ``EtlLastRunDate`` and audits set
+    ``FlowStatus``. A plan with incremental entries, or one selected by ``failed_only``, is therefore
+    only reused after the version check, never on age alone.
+    """
+
+    INCREMENTAL_LOAD_TYPES = {"incremental", "delta"}
+
+    VERSION_QUERY = '''
+        SELECT (SELECT COUNT(*) FROM ods.ControlDetail detail WHERE detail.DataflowFlag = :dataflowflag)
+            || ':' || COALESCE((SELECT md5(string_agg(detail::text, '|' ORDER BY detail::text)) FROM ods.ControlDetail detail WHERE detail.DataflowFlag = :dataflowflag), '')
+            || ':' || COALESCE((SELECT md5(string_agg(header::text, '|' ORDER BY header::text)) FROM ods.ControlHeader header), '')'''
+
+    def __init__(self, directory=".control_plan", ttl=900, validate="version", refresh=False):
+        self.logger = LoggerManager().logger
+        self.directory = directory
+        self.ttl = float(ttl)
+        self.validate = validate
+        self.refresh = refresh
+
+    @classmethod
+    def from_config(cls, settings, refresh=False):
+        """Builds the snapshot from the ``etl.control_snapshot`` config section."""
+        settings = settings or {}
+        return cls(
+            directory=settings.get("directory", ".control_plan"),
+            ttl=settings.get("ttl", 900),
+            validate=settings.get("validate", "version"),
+            refresh=refresh,
+        )
+
+    def path(self, filters):
+        key = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()[:12]
+        return os.path.join(self.directory, f"{filters.get('dataflowflag')}-{key}.json")
+
+    def age(self, payload):
+        return time.time() - payload["saved_at"]
+
+    def trusted_unchecked(self, payload):
+        """Whether ``payload`` may be reused without asking the config DB: fresh, and free of run-moved state."""
+        if self.age(payload) >= self.ttl or payload["filters"].get("failed_only"):
+            return False
+        columns = [str(column).lower() for column in payload["columns"]]
+        if "loadtype" not in columns:
+            return True
+        index = columns.index("loadtype")
+        return not any(str(row[index] or "").strip().lower() in self.INCREMENTAL_LOAD_TYPES for row in payload["rows"])
+
+    def read(self, filters):
+        """Returns the stored snapshot for ``filters``, or None when there is none (or it is unreadable)."""
+        if self.refresh:
+            return None
+        try:
+            with open(self.path(filters), "r") as file:
+                payload = json.load(file, object_hook=self._decode)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️ Ignoring unreadable control-plan snapshot {self.path(filters)}: {e}")
+            return None
+        return payload if payload.get("filters") == filters else None
+
+    def write(self, filters, version, columns, rows):
+        """Saves the record set atomically, so a concurrent run never reads a half-written file."""
+        os.makedirs(self.directory, exist_ok=True)
+        file_path = self.path(filters)
+        payload = {"saved_at": time.time(), "version": version, "filters": filters, "columns": list(columns), "rows": [list(row) for row in rows]}
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(payload, file, separators=(",", ":"), default=self._encode)
+        os.replace(temp_path, file_path)
+        self.logger.info(f"💾 Saved control-plan snapshot of {len(payload['rows'])} entries to {file_path}")
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, dt.datetime):
+            return {"$datetime": value.isoformat()}
+        if isinstance(value, dt.date):
+            return {"$date": value.isoformat()}
+        if isinstance(value, dt.time):
+            return {"$time": value.isoformat()}
+        if isinstance(value, Decimal):
+            return {"$decimal": str(value)}
+        raise TypeError(f"Cannot store {type(value).__name__} in a control-plan snapshot")
+
+    @staticmethod
+    def _decode(obj):
+        if len(obj) == 1:
+            (key, value), = obj.items()
+            if key == "$datetime":
+                return dt.datetime.fromisoformat(value)
+            if key == "$date":
+                return dt.date.fromisoformat(value)
+            if key == "$time":
+                return dt.time.fromisoformat(value)
+            if key == "$decimal":
+                return Decimal(value)
+        return obj
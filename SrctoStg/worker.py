@@ -0,0 +1,31 @@
+from collections import namedtuple
+from SrctoStg.db import DatabaseETL
+from SrctoStg.metrics import metrics
+
+# Per-process state for --executor process: one DatabaseETL per source type, built on first use
+_options = {}
+_etls = {}
+_record_types = {}
+
+
+def init_worker(options):
+    """Pool initializer: stores the DatabaseETL options for this worker process."""
+    _options.clear()
+    _options.update(options)
+
+
+def process_record(fields):
+    """Processes one control record passed as a field dict (control records are not picklable).
+
+    Returns ``(rows, metrics_report)``; the parent merges the report into its run report.
+    """
+    key = tuple(fields)
+    if key not in _record_types:
+        _record_types[key] = namedtuple("Record", key)
+    record = _record_types[key](**fields)
+
+    if record.sourcetype not in _etls:
+        _etls[record.sourcetype] = DatabaseETL(record.sourcetype, **_options)
+    metrics.reset()
+    rows = _etls[record.sourcetype].copy_single_record_from_source(record)
+    return rows, metrics.report()
@@ -0,0 +1,473 @@
+import io
+import csv
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from decimal import Decimal
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from sqlalchemy import text
+from SrctoStg.logs import LoggerManager
+from SrctoStg.metrics import metrics
+
+
+class StagingWriter(ABC):
+    """Base class for writers that load DataFrame batches into a staging table."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.logger = LoggerManager().logger
+
+    @abstractmethod
+    def write(self, df, table, schema, conn=None):
+        """Writes ``df`` into ``schema.table`` and returns the number of rows written.
+
+        When ``conn`` is given the rows are written inside the caller's transaction,
+        otherwise the writer commits on its own connection.
+        """
+
+    def write_arrow(self, batch, table, schema, conn=None):
+        """Writes a ``pyarrow.RecordBatch``; writers without a native Arrow path go through pandas."""
+        return self.write(batch.to_pandas(), table, schema, conn)
+
+
+class ToSqlWriter(StagingWriter):
+    """Loads batches with ``DataFrame.to_sql`` (parameterised INSERTs)."""
+
+    def __init__(self, engine, method=None):
+        super().__init__(engine)
+        self.method = method
+
+    def write(self, df, table, schema, conn=None):
+        df.to_sql(
+            table,
+            conn if conn is not None else self.engine,
+            if_exists="append",
+            index=False,
+            schema=schema,
+            method=self.method,
+        )
+        return len(df)
+
+
+class PostgresCopyWriter(StagingWriter):
+    """Streams batches into PostgreSQL with ``COPY ... FROM STDIN`` through psycopg2's ``copy_expert``.
+
+    Batches are rendered in COPY text format: ``\\N`` marks NULL (so empty strings survive),
+    bytes become bytea hex literals and timezone-aware timestamps keep their UTC offset.
+    """
+
+    NULL = "\\N"
+
+    def write(self, df, table, schema, conn=None):
+        if df.empty:
+            return 0
+
+        columns = ", ".join(self._quote(col) for col in df.columns)
+        sql = f"COPY {self._quote(schema)}.{self._quote(table)} ({columns}) FROM STDIN WITH (FORMAT text, NULL '\\N')"
+
+        frame = self._prepare_frame(df)
+        single = len(frame.columns) == 1
+        if single:
+            # ✅ The csv module refuses a lone empty field unquoted; pad with an empty column and strip it below
+            frame = frame.assign(**{uuid.uuid4().hex: ""})
+
+        buffer = io.StringIO()
+        frame.to_csv(
+            buffer,
+            sep="\t",
+            header=False,
+            index=False,
+            na_rep=self.NULL,
+            quoting=csv.QUOTE_NONE,
+            quotechar="\x07",  # never emitted: every special character is escaped up front
+            lineterminator="\n",
+        )
+        if single:
+            # values have their tabs escaped, so "\t\n" only ever ends the padding column
+            buffer = io.StringIO(buffer.getvalue().replace("\t\n", "\n"))
+        buffer.seek(0)
+        self._copy(sql, buffer, conn)
+        return len(df)
+
+    def write_arrow(self, batch, table, schema, conn=None):
+        """Loads an Arrow record batch with COPY in CSV format, rendered by Arrow's CSV writer without pandas.
+
+        Arrow quotes every string value and leaves NULLs as empty unquoted fields, which is exactly
+        how CSV COPY tells NULL from an empty string.
+        """
+        if batch.num_rows == 0:
+            return 0
+
+        columns = ", ".join(self._quote(col) for col in batch.schema.names)
+        sql = f"COPY {self._quote(schema)}.{self._quote(table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+        buffer = io.BytesIO()
+        pa_csv.write_csv(self._prepare_batch(batch), buffer, pa_csv.WriteOptions(include_header=False, quoting_style="needed"))
+        buffer.seek(0)
+        self._copy(sql, buffer, conn)
+        return batch.num_rows
+
+    def _copy(self, sql, buffer, conn=None):
+        if conn is not None:
+            with conn.connection.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+            return
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.copy_expert(sql, buffer)
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+
+    @staticmethod
+    def _quote(identifier):
+        return '"' + str(identifier).replace('"', '""') + '"'
+
+    @classmethod
+    def _prepare_frame(cls, df):
+        """Returns a copy of ``df`` whose values render as valid COPY text fields."""
+        out = {}
+        for col in df.columns:
+            series = df[col]
+
+            if pd.api.types.is_bool_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+                out[col] = series
+
+            elif pd.api.types.is_float_dtype(series):
+                # ✅ read_sql turns nullable integer columns into floats; "1.0" is rejected by INTEGER columns
+                non_null = series.dropna()
+                if not non_null.empty and (non_null % 1 == 0).all() and (non_null.abs() < 2 ** 53).all():
+                    out[col] = series.astype("Int64")
+                else:
+                    out[col] = series
+
+            elif pd.api.types.is_numeric_dtype(series):
+                out[col] = series
+
+            elif isinstance(series.dtype, pd.CategoricalDtype):
+                # ✅ Escape the (few) categories instead of every value
+                categories = series.cat.categories.astype(str)
+                out[col] = series.cat.rename_categories(cls._escape_text(pd.Series(categories)).tolist())
+
+            else:
+                non_null = series.dropna()
+                if not non_null.empty and isinstance(non_null.iloc[0], (bytes, bytearray, memoryview)):
+                    # ✅ bytea hex input; the backslash itself is escaped for the text format
+                    out[col] = series.map(lambda value: "\\\\x" + bytes(value).hex(), na_action="ignore")
+                else:
+                    out[col] = cls._escape_text(series.where(series.isna(), series.astype(str)))
+
+        return pd.DataFrame(out, index=df.index)
+
+    @staticmethod
+    def _prepare_batch(batch):
+        """Turns binary columns into bytea hex literals; Arrow's CSV writer would emit raw bytes."""
+        arrays = []
+        for array in batch.columns:
+            if pa.types.is_binary(array.type) or pa.types.is_large_binary(array.type):
+                array = pa.array([None if value is None else "\\x" + value.hex() for value in array.to_pylist()], type=pa.string())
+            arrays.append(array)
+        return pa.RecordBatch.from_arrays(arrays, names=batch.schema.names)
+
+    @staticmethod
+    def _escape_text(series):
+        return (
+            series.str.replace("\\", "\\\\", regex=False)
+            .str.replace("\t", "\\t", regex=False)
+            .str.replace("\n", "\\n", regex=False)
+            .str.replace("\r", "\\r", regex=False)
+        )
+
+
+class PostgresMergeWriter(PostgresCopyWriter):
+    """Upserts batches into PostgreSQL staging by primary key, writing only new and changed rows.
+
+    Each row gets a 64-bit hash of its non-key columns (``pandas.util.hash_pandas_object``), stored
+    in ``hash_column`` of the staging table. A batch is COPYed into a temp table and applied with one
+    ``INSERT ... ON CONFLICT (key) DO UPDATE ... WHERE hash IS DISTINCT FROM EXCLUDED.hash``, so
+    unchanged rows produce no new tuple versions. Inserted and updated counts are added to the
+    current object's metrics. Tables without a primary key are appended to as before.
+    """
+
+    def __init__(self, engine, hash_column="etl_row_hash"):
+        super().__init__(engine)
+        self.hash_column = hash_column
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+
+    def write(self, df, table, schema, conn=None):
+        if df.empty:
+            return 0
+        keys = self._prepare_table(schema, table)
+        if not keys:
+            return super().write(df, table, schema, conn)
+
+        missing = [key for key in keys if key not in df.columns]
+        if missing:
+            raise KeyError(f"Merge into {schema}.{table} needs its primary key columns, missing: {', '.join(missing)}")
+
+        # ✅ One row per key (the last one wins), each tagged with the hash of its non-key columns
+        df = df.drop_duplicates(subset=keys, keep="last")
+        df = df.assign(**{self.hash_column: self._row_hashes(df.drop(columns=keys + [self.hash_column], errors="ignore"))})
+
+        if conn is None:
+            with self.engine.begin() as own_conn:
+                inserted, updated = self._merge(df, table, schema, keys, own_conn)
+        else:
+            inserted, updated = self._merge(df, table, schema, keys, conn)
+        metrics.count("inserted", inserted)
+        metrics.count("updated", updated)
+        return len(df)
+
+    def write_arrow(self, batch, table, schema, conn=None):
+        return self.write(batch.to_pandas(), table, schema, conn)
+
+    @staticmethod
+    def _row_hashes(values):
+        """Signed 64-bit hash per row; decimals are normalised so 1.0 and 1.00 (pandas vs Arrow batches) hash alike."""
+        for col in values.columns[values.dtypes == object]:
+            sample = values[col].dropna()
+            if not sample.empty and isinstance(sample.iloc[0], Decimal):
+                values = values.assign(**{col: values[col].map(lambda v: v.normalize() if isinstance(v, Decimal) else v)})
+        return pd.util.hash_pandas_object(values, index=False).to_numpy().view("int64")
+
+    def _merge(self, df, table, schema, keys, conn):
+        live = f"{self._quote(schema)}.{self._quote(table)}"
+        temp = f"etl_merge_{uuid.uuid4().hex[:16]}"
+        conn.execute(text(f"CREATE TEMP TABLE {self._quote(temp)} (LIKE {live} INCLUDING DEFAULTS) ON COMMIT DROP"))
+        super().write(df, temp, "pg_temp", conn)
+
+        columns = ", ".join(self._quote(col) for col in df.columns)
+        updates = [col for col in df.columns if col not in keys]
+        if updates:
+            action = (
+                "DO UPDATE SET " + ", ".join(f"{self._quote(col)} = EXCLUDED.{self._quote(col)}" for col in updates)
+                + f" WHERE {live}.{self._quote(self.hash_column)} IS DISTINCT FROM EXCLUDED.{self._quote(self.hash_column)}"
+            )
+        else:
+            action = "DO NOTHING"
+        inserted, updated = conn.execute(text(f"""
+            WITH upserted AS (
+                INSERT INTO {live} ({columns})
+                SELECT {columns} FROM pg_temp.{self._quote(temp)}
+                ON CONFLICT ({", ".join(self._quote(key) for key in keys)}) {action}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+        """)).fetchone()
+        conn.execute(text(f"DROP TABLE pg_temp.{self._quote(temp)}"))
+        return inserted, updated
+
+    def _prepare_table(self, schema, table):
+        """Returns the table's primary-key columns, adding the hash column on first use; cached per table."""
+        with self._tables_lock:
+            if (schema, table) not in self._tables:
+                qualified = f"{self._quote(schema)}.{self._quote(table)}"
+                with self.engine.begin() as conn:
+                    keys = [row[0] for row in conn.execute(text("""
+                        SELECT att.attname
+                        FROM pg_index idx
+                        JOIN pg_attribute att ON att.attrelid = idx.indrelid AND att.attnum = ANY(idx.indkey)
+                        WHERE idx.indrelid = to_regclass(:table) AND idx.indisprimary
+                        ORDER BY array_position(idx.indkey::int2[], att.attnum)
+                    """), {"table": qualified})]
+                    if keys:
+                        conn.execute(text(f"ALTER TABLE {qualified} ADD COLUMN IF NOT EXISTS {self._quote(self.hash_column)} BIGINT"))
+                    else:
+                        self.logger.warning(f"⚠️ {schema}.{table} has no primary key; appending instead of merging")
+                self._tables[(schema, table)] = keys
+            return self._tables[(schema, table)]
+
+
+class ClickHouseWriter(StagingWriter):
+    """Loads batches into ClickHouse over the native TCP protocol as columnar insert blocks.
+
+    Staging schemas map to ClickHouse databases. Tables are created from ``ods.main_lookup`` rows
+    with ``MergeTree`` DDL: nullable columns become ``Nullable(...)`` and short CHAR/VARCHAR
+    columns (or those listed in ``low_cardinality_columns``) become ``LowCardinality(...)``.
+    The native client is not thread-safe, so each thread gets its own connection.
+    """
+
+    CLICKHOUSE_TYPES = {
+        "SMALLINT": "Int16", "INT2": "Int16", "INTEGER": "Int32", "INT": "Int32", "INT4": "Int32",
+        "BIGINT": "Int64", "INT8": "Int64", "REAL": "Float32", "FLOAT4": "Float32",
+        "DOUBLE PRECISION": "Float64", "FLOAT": "Float64", "FLOAT8": "Float64",
+        "BOOLEAN": "Bool", "BOOL": "Bool", "DATE": "Date32",
+        "TIMESTAMP": "DateTime64(6)", "TIMESTAMP WITHOUT TIME ZONE": "DateTime64(6)",
+        "TIMESTAMPTZ": "DateTime64(6, 'UTC')", "TIMESTAMP WITH TIME ZONE": "DateTime64(6, 'UTC')",
+        "UUID": "UUID",
+    }
+
+    def __init__(self, connection, block_size=100000, compression=False, table_engine="MergeTree",
+                 low_cardinality_length=32, low_cardinality_columns=None):
+        super().__init__(engine=None)
+        self.connection = connection
+        self.block_size = int(block_size)
+        self.compression = compression
+        self.table_engine = table_engine
+        self.low_cardinality_length = int(low_cardinality_length or 0)
+        self.low_cardinality_columns = low_cardinality_columns or {}
+        self._local = threading.local()
+        self._column_types = {}
+        self._column_types_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config, settings=None):
+        """Builds the writer from the ``etl.clickhouse`` settings and the config section they point to."""
+        settings = settings or {}
+        location = settings.get("location", "clickhouse-tcp")
+        if location not in config:
+            raise KeyError(f"ClickHouse location '{location}' not found in config")
+        connection = config[location]["connection"]
+        return cls(
+            {
+                "host": connection.get("host") or "localhost",
+                "port": int(connection.get("port") or 9000),
+                "database": connection.get("database") or "default",
+                "user": connection.get("username") or "default",
+                "password": str(connection.get("password") or ""),
+            },
+            block_size=settings.get("block_size") or 100000,
+            compression=settings.get("compression") or False,
+            table_engine=settings.get("table_engine") or "MergeTree",
+            low_cardinality_length=settings.get("low_cardinality_length", 32),
+            low_cardinality_columns=settings.get("low_cardinality_columns"),
+        )
+
+    @property
+    def client(self):
+        if getattr(self._local, "client", None) is None:
+            from clickhouse_driver import Client
+
+            self._local.client = Client(
+                **self.connection,
+                compression=self.compression,
+                settings={"insert_block_size": self.block_size},
+            )
+        return self._local.client
+
+    def write(self, df, table, schema, conn=None):
+        if df.empty:
+            return 0
+        columns = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in df.columns]
+        return self._insert(list(df.columns), columns, table, schema)
+
+    def write_arrow(self, batch, table, schema, conn=None):
+        if batch.num_rows == 0:
+            return 0
+        return self._insert(batch.schema.names, [array.to_pylist() for array in batch.columns], table, schema)
+
+    def _insert(self, names, columns, table, schema):
+        """Sends one columnar INSERT; the client splits it into ``block_size``-row native blocks."""
+        types = self.column_types(table, schema)
+        columns = [self._coerce(values, types.get(name, "")) for name, values in zip(names, columns)]
+        column_list = ", ".join(self._quote(name) for name in names)
+        self.client.execute(
+            f"INSERT INTO {self._quote(schema)}.{self._quote(table)} ({column_list}) VALUES",
+            columns,
+            columnar=True,
+        )
+        return len(columns[0])
+
+    def column_types(self, table, schema):
+        """Returns ``{column: type}`` for a ClickHouse table, cached per table."""
+        with self._column_types_lock:
+            if (schema, table) not in self._column_types:
+                rows = self.client.execute(
+                    "SELECT name, type FROM system.columns WHERE database = %(database)s AND table = %(table)s",
+                    {"database": schema, "table": table},
+                )
+                self._column_types[(schema, table)] = dict(rows)
+            return self._column_types[(schema, table)]
+
+    @staticmethod
+    def _coerce(values, column_type):
+        """Casts Python values to what the native protocol packs for ``column_type``."""
+        base = column_type.replace("LowCardinality(", "").replace("Nullable(", "")
+        if base.startswith(("Int", "UInt")):
+            cast = int
+        elif base.startswith("Float"):
+            cast = float
+        elif base.startswith("Bool"):
+            cast = bool
+        elif base.startswith("String"):
+            cast = lambda value: value if isinstance(value, (str, bytes)) else str(value)
+        else:
+            return values
+        return [None if value is None else cast(value) for value in values]
+
+    def table_names(self, schema):
+        """Returns the set of table names in a ClickHouse database."""
+        rows = self.client.execute("SELECT name FROM system.tables WHERE database = %(database)s", {"database": schema})
+        return {row[0] for row in rows}
+
+    def column_type(self, row):
+        """Maps one ``ods.main_lookup`` row to a ClickHouse column type."""
+        data_type = str(row["target_data_type"]).upper().strip()
+        table, column = str(row["target_table"]), str(row["column_name"]).lower()
+
+        if data_type in ("DECIMAL", "NUMERIC"):
+            if pd.notna(row["precisions"]) and pd.notna(row["scale"]):
+                column_type = f"Decimal({min(int(row['precisions']), 76)}, {int(row['scale'])})"
+            else:
+                column_type = "Float64"
+        else:
+            column_type = self.CLICKHOUSE_TYPES.get(data_type, "String")
+
+        if row["nullable"] != False:
+            column_type = f"Nullable({column_type})"
+
+        short_text = (
+            data_type in ("CHAR", "VARCHAR", "CHARACTER", "CHARACTER VARYING")
+            and pd.notna(row["length"]) and 0 < int(row["length"]) <= self.low_cardinality_length
+        )
+        if column_type.endswith("String)") or column_type == "String":
+            if short_text or column in [str(c).lower() for c in self.low_cardinality_columns.get(table, [])]:
+                column_type = f"LowCardinality({column_type})"
+        return column_type
+
+    def create_tables(self, lookup, schema):
+        """Creates the ClickHouse tables described by ``ods.main_lookup`` rows; returns their names."""
+        self.client.execute(f"CREATE DATABASE IF NOT EXISTS {self._quote(schema)}")
+        created = []
+        for table, rows in lookup.groupby("target_table", sort=False):
+            columns = [f"{self._quote(str(row['column_name']).lower())} {self.column_type(row)}" for _, row in rows.iterrows()]
+            keys = rows[(rows["key_constraint"] == "PRIMARY KEY") & (rows["nullable"] == False)]["column_name"]
+            order_by = f"({', '.join(self._quote(str(col).lower()) for col in keys)})" if not keys.empty else "tuple()"
+            self.client.execute(
+                f"CREATE TABLE IF NOT EXISTS {self._quote(schema)}.{self._quote(table)} (\n    "
+                + ",\n    ".join(columns)
+                + f"\n) ENGINE = {self.table_engine} ORDER BY {order_by}"
+            )
+            with self._column_types_lock:
+                self._column_types.pop((schema, table), None)
+            created.append(table)
+        return created
+
+    @staticmethod
+    def _quote(identifier):
+        return "`" + str(identifier).replace("\\", "\\\\").replace("`", "\\`") + "`"
+
+
+STAGING_WRITERS = {
+    "copy": PostgresCopyWriter,
+    "multi": lambda engine: ToSqlWriter(engine, method="multi"),
+    "to_sql": ToSqlWriter,
+}
+
+
+def get_staging_writer(engine, method=None):
+    """Returns the staging writer for ``method``; defaults to COPY on PostgreSQL and multi-row INSERTs elsewhere."""
+    method = (method or ("copy" if engine.dialect.name == "postgresql" else "multi")).lower()
+    if method not in STAGING_WRITERS:
+        raise ValueError(f"Unknown staging writer '{method}'. Expected one of: {', '.join(STAGING_WRITERS)}")
+    if method == "copy" and engine.dialect.name != "postgresql":
+        raise ValueError(f"The 'copy' staging writer requires PostgreSQL, got '{engine.dialect.name}'")
+    return STAGING_WRITERS[method](engine)
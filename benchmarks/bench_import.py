@@ -0,0 +1,82 @@
+"""Guards the cold-start cost of the SrctoStg CLI.
+
+Every repeat imports ``SrctoStg.__main__`` in a fresh interpreter with ``-X importtime``. The
+benchmark reports the median import time and the slowest modules. It fails when the median is
+above ``--max_ms``, or when a module that should load only once data moves (pandas, pyarrow,
+the DB drivers) is imported at startup. Cron-driven runs and ``--list_sources`` pay this cost on
+every invocation.
+
+Usage:
+    python -m benchmarks.bench_import --repeats 7 --max_ms 600
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+MODULE = "SrctoStg.__main__"
+DEFERRED = ["pandas", "numpy", "pyarrow", "requests", "pyodbc", "oracledb", "psycopg2", "clickhouse_driver"]
+
+PROBE = """
+import sys, json
+import {module}
+print(json.dumps(sorted(name for name in {deferred!r} if name in sys.modules)))
+"""
+
+
+def import_once(module=MODULE):
+    """Imports ``module`` in a fresh interpreter; returns ``(total_ms, {module: cumulative_ms}, deferred modules loaded)``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, deferred=DEFERRED)],
+        capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if cumulative_us.isdigit():
+            cumulative[name] = int(cumulative_us) / 1000
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return cumulative.get(module, 0.0), cumulative, loaded
+
+
+def run(repeats, top, module=MODULE):
+    totals, loaded, slowest = [], set(), {}
+    for _ in range(repeats):
+        total_ms, cumulative, deferred = import_once(module)
+        totals.append(total_ms)
+        loaded.update(deferred)
+        for name, ms in cumulative.items():
+            slowest[name] = min(ms, slowest.get(name, ms))
+
+    median_ms = statistics.median(totals)
+    print(f"{module}: median {median_ms:.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms over {repeats} runs")
+    print("Slowest top-level imports (best of runs, cumulative):")
+    top_level = {name: ms for name, ms in slowest.items() if "." not in name and name != module.split(".")[0]}
+    for name, ms in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"    {ms:8.1f} ms  {name}")
+    return median_ms, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules to list")
+    parser.add_argument("--max_ms", type=float, default=600, help="Fail when the median import time exceeds this (default: 600)")
+    args = parser.parse_args()
+
+    median_ms, loaded = run(args.repeats, args.top)
+    failed = False
+    if loaded:
+        print(f"❌ Imported at startup but should be deferred until data moves: {', '.join(loaded)}")
+        failed = True
+    if median_ms > args.max_ms:
+        print(f"❌ Median import time {median_ms:.1f} ms is above the {args.max_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
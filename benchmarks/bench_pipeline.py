@@ -0,0 +1,105 @@
+"""Compares the pandas and Arrow extract->load pipelines of DatabaseETL on a synthetic table.
+
+The source table is created in the target database itself, then each pipeline streams it back
+out through a server-side cursor and COPYs it into a staging table. Every pipeline runs in a
+fresh process so that peak RSS is measured independently.
+
+Usage:
+    python -m benchmarks.bench_pipeline --rows 500000 --location staging --schema stg
+"""
+import time
+import argparse
+import resource
+import multiprocessing
+from sqlalchemy import create_engine, text
+from SrctoStg.connections import DBConnectionManager
+from SrctoStg.db import DatabaseETL
+from SrctoStg.writers import get_staging_writer
+from benchmarks.bench_staging_writer import synthetic_frame
+
+SOURCE, TARGET = "bench_pipeline_source", "bench_pipeline_target"
+COLUMNS_INFO = {
+    "id": "bigint", "amount": "numeric", "quantity": "integer", "name": "text",
+    "created_at": "timestamp with time zone", "payload": "bytea",
+}
+
+
+def pipeline_etl(engine, pipeline, chunk_size, batch_mb):
+    """A DatabaseETL wired to ``engine`` only, without the control-DB connections ``__init__`` opens."""
+    return DatabaseETL.from_engines("PostgreSQL", engine, engine, pipeline=pipeline, chunksize=chunk_size, batch_mb=batch_mb, writer="copy")
+
+
+def peak_rss_mb():
+    """Peak RSS of this process; VmHWM on Linux, since ``ru_maxrss`` carries over the parent's peak across exec."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_pipeline(url, schema, pipeline, chunk_size, batch_mb):
+    """Runs one pipeline and returns ``(rows, seconds, peak_rss_mb)``; meant for a fresh process."""
+    engine = create_engine(url)
+    baseline = peak_rss_mb()
+    etl = pipeline_etl(engine, pipeline, chunk_size, batch_mb)
+    record = argparse.Namespace(sourceid="bench", sourcetype="PostgreSQL", sourceschema=schema, sourceobject=SOURCE, targetobject=TARGET, targetschemaname=schema)
+    plan = {col: DatabaseETL.SOURCE_TYPE_CONVERSIONS.get(col_type) for col, col_type in COLUMNS_INFO.items()}
+
+    start = time.perf_counter()
+    rows, _, _ = etl._load_query(record, f"SELECT * FROM {schema}.{SOURCE}", {}, None, plan)
+    elapsed = time.perf_counter() - start
+    peak_mb = peak_rss_mb() - baseline
+    engine.dispose()
+    return rows, elapsed, peak_mb
+
+
+def run(url, schema, rows, chunk_size, batch_mb, pipelines):
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{SOURCE}; DROP TABLE IF EXISTS {schema}.{TARGET}"))
+        conn.execute(text(f"""
+            CREATE TABLE {schema}.{SOURCE} (
+                id BIGINT, amount NUMERIC(12, 2), quantity INTEGER, name TEXT,
+                created_at TIMESTAMPTZ, payload BYTEA
+            )
+        """))
+    get_staging_writer(engine, "copy").write(synthetic_frame(rows), SOURCE, schema)
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for pipeline in pipelines:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{TARGET}"))
+            conn.execute(text(f"CREATE TABLE {schema}.{TARGET} (LIKE {schema}.{SOURCE})"))
+
+        with context.Pool(1) as pool:
+            loaded, elapsed, peak_mb = pool.apply(run_pipeline, (url, schema, pipeline, chunk_size, batch_mb))
+        results[pipeline] = {"rows_per_sec": loaded / elapsed, "peak_rss_mb": peak_mb}
+        print(f"{pipeline:<8} {loaded:>10} rows  {elapsed:8.2f} s  {loaded / elapsed:12,.0f} rows/sec  {peak_mb:8.1f} MB peak RSS")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{SOURCE}; DROP TABLE IF EXISTS {schema}.{TARGET}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SQLAlchemy URL of the PostgreSQL database (overrides --location)")
+    parser.add_argument("--location", default="staging", help="Config section of the PostgreSQL database")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--batch_mb", type=float, default=0)
+    parser.add_argument("--pipelines", default="pandas,arrow", help="Pipelines to compare, delimited by ','")
+    args = parser.parse_args()
+
+    url = args.url or DBConnectionManager().new_db_connection(args.location).url.render_as_string(hide_password=False)
+    run(url, args.schema, args.rows, args.chunksize, args.batch_mb, args.pipelines.split(","))
+
+
+if __name__ == "__main__":
+    main()
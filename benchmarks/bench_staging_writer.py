@@ -0,0 +1,78 @@
+"""Compares staging writers (COPY vs to_sql) on a synthetic batch.
+
+Usage:
+    python -m benchmarks.bench_staging_writer --rows 200000 --location staging --schema stg
+"""
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from SrctoStg.connections import DBConnectionManager
+from SrctoStg.writers import STAGING_WRITERS, get_staging_writer
+
+TABLE = "bench_staging_writer"
+
+
+def synthetic_frame(rows, seed=42):
+    """Builds a batch mixing ints, floats, text, timestamps with time zone, bytea and NULLs."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "id": np.arange(rows, dtype="int64"),
+        "amount": rng.normal(1000, 250, rows).round(2),
+        "quantity": rng.integers(0, 500, rows).astype("float64"),
+        "name": rng.choice(["alpha", "beta", "gamma\twith tab", "delta\nnewline", ""], rows),
+        "created_at": pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 86400 * 365, rows), unit="s"),
+        "payload": [bytes(rng.integers(0, 255, 8, dtype="uint8")) for _ in range(rows)],
+    })
+    df.loc[df.index % 7 == 0, "quantity"] = np.nan
+    df.loc[df.index % 11 == 0, "name"] = None
+    return df
+
+
+def run(engine, schema, rows, batch_size, writers):
+    df = synthetic_frame(rows)
+    ddl = f"""
+        DROP TABLE IF EXISTS {schema}.{TABLE};
+        CREATE TABLE {schema}.{TABLE} (
+            id BIGINT, amount NUMERIC(12, 2), quantity INTEGER, name TEXT,
+            created_at TIMESTAMPTZ, payload BYTEA
+        );
+    """
+    results = {}
+    for method in writers:
+        with engine.begin() as conn:
+            conn.execute(text(ddl))
+
+        writer = get_staging_writer(engine, method)
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            writer.write(df.iloc[offset:offset + batch_size], TABLE, schema)
+        elapsed = time.perf_counter() - start
+
+        with engine.connect() as conn:
+            loaded = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.{TABLE}")).scalar()
+        results[method] = rows / elapsed
+        print(f"{method:<8} {loaded:>10} rows  {elapsed:8.2f} s  {rows / elapsed:12,.0f} rows/sec")
+
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{TABLE}"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SQLAlchemy URL of the PostgreSQL target (overrides --location)")
+    parser.add_argument("--location", default="staging", help="Config section of the PostgreSQL target")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--batch_size", type=int, default=50000)
+    parser.add_argument("--writers", default=",".join(STAGING_WRITERS), help="Writers to compare, delimited by ','")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url) if args.url else DBConnectionManager().new_db_connection(args.location)
+    run(engine, args.schema, args.rows, args.batch_size, args.writers.split(","))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Reproducible load benchmarks for DatabaseETL with regression thresholds.
+
+Generates seeded synthetic data for a set of table profiles and runs the DB, flat-file, API and
+landing-zone load paths against local stand-ins:
+- DB sources: a SQLite database, loaded directly or landed as Parquet and then loaded;
+- flat files: CSV and Parquet files in a temporary directory;
+- APIs: a stub HTTP server paging JSON records.
+
+Staging is a SQLite database (executemany INSERTs) unless ``--url`` points at a PostgreSQL
+database, in which case the COPY writer is used. Every case runs in a fresh process and reports
+rows/sec, peak RSS and per-stage latency from ``SrctoStg.metrics``.
+
+``--save_baseline`` stores the results in the baseline file. Otherwise the results are compared
+with it, and the run exits non-zero when a case is slower, or uses more memory, than its
+baseline by more than ``--threshold``. Baselines are machine-specific, so record them on the
+machine that runs the comparison.
+
+Usage:
+    python -m benchmarks.suite --rows 200000 --save_baseline
+    python -m benchmarks.suite --rows 200000 --threshold 0.15
+    python -m benchmarks.suite --profiles wide,nullable --paths db,api --url postgresql://...
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from types import SimpleNamespace
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from SrctoStg.db import DatabaseETL
+from SrctoStg.metrics import metrics
+from benchmarks.bench_pipeline import peak_rss_mb
+
+# Column kinds cycled through to build each profile, and the default width of the profile
+PROFILES = {
+    "narrow": (["int", "float", "string", "timestamp"], 6),
+    "wide": (["int", "float", "string", "timestamp", "float", "int"], 60),
+    "strings": (["string", "string", "string", "int"], 12),
+    "timestamps": (["timestamp", "timestamp", "int"], 12),
+    "nullable": (["int", "float", "string", "timestamp"], 12),
+}
+PATHS = ("db", "landing", "csv", "parquet", "api")
+# Source DATA_TYPE reported for each kind, so DB loads use the metadata-driven conversion plan
+SOURCE_TYPES = {"int": "bigint", "float": "float", "string": "nvarchar", "timestamp": "datetime2"}
+NULL_FRACTION = 0.4
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+
+def synthetic_table(profile, rows, width=None, seed=7):
+    """Returns ``(DataFrame, {column: kind})`` for a profile; identical for the same arguments."""
+    kinds, default_width = PROFILES[profile]
+    width = width or default_width
+    rng = np.random.default_rng(seed)
+    words = np.array(["".join(rng.choice(list("abcdefghijklmnopqrstuvwxyz "), rng.integers(8, 25))) for _ in range(1000)])
+
+    data, column_kinds = {"id": np.arange(rows, dtype="int64")}, {"id": "int"}
+    for index in range(width - 1):
+        kind = kinds[index % len(kinds)]
+        name = f"{kind}_{index}"
+        if kind == "int":
+            values = pd.Series(rng.integers(0, 1_000_000, rows), dtype="Int64")
+        elif kind == "float":
+            values = pd.Series(rng.normal(1000, 250, rows).round(2))
+        elif kind == "string":
+            values = pd.Series(words[rng.integers(0, len(words), rows)], dtype=object)
+        else:
+            values = pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 86400 * 365, rows), unit="s"))
+        if profile == "nullable":
+            values = values.mask(rng.random(rows) < NULL_FRACTION)
+        data[name] = values
+        column_kinds[name] = kind
+    return pd.DataFrame(data), column_kinds
+
+
+class StubAPI:
+    """Serves ``records`` as page-numbered JSON (``?pageNumber=N&pageSize=M`` -> ``{"data": [...]}``)."""
+
+    def __init__(self, records):
+        self.records = records
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                size = int(query.get("pageSize", ["100"])[0])
+                page = int(query.get("pageNumber", ["1"])[0])
+                body = json.dumps({"data": api.records[(page - 1) * size:page * size]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/records"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_etl(source_url, staging_url, chunk_size, landing_root=None):
+    """A DatabaseETL wired to the stand-ins; schema registration needs the control DB, so targets are pre-created."""
+    staging = create_engine(staging_url)
+    etl = DatabaseETL.from_engines(
+        "SQLite",
+        create_engine(source_url),
+        staging,
+        chunksize=chunk_size,
+        batch_mb=0,
+        pipeline="pandas",
+        # COPY on PostgreSQL; executemany on SQLite, whose bound-parameter limit rules out multi-row INSERTs of whole batches
+        writer="copy" if staging.dialect.name == "postgresql" else "to_sql",
+        checkpoints=False,
+        api={"page_size": 1000, "concurrency": 4, "rate_limit": 0, "pagination": {}},
+        landing={"enabled": landing_root is not None, "root": landing_root},
+    )
+    etl.register_schema = lambda *args, **kwargs: False
+    return etl
+
+
+def run_case(case, staging_url, chunk_size):
+    """Loads one case into staging and returns its measurements; meant for a fresh process."""
+    baseline_rss = peak_rss_mb()
+    etl = bench_etl(case["source_url"], staging_url, chunk_size, case.get("landing_root"))
+    record = SimpleNamespace(
+        sourceid=case["name"], sourcetype="API" if case["path"] == "api" else "Flatfile",
+        sourceschema="main", sourceobject=case.get("source_object") or case["name"], targetobject=case["target"],
+        targetschemaname=case["schema"], apiurl=case.get("api_url"), apimethod="GET", apiaccesstoken=None,
+        apiqueryparameters=None, apirequestbody=None,
+    )
+    etl.settings["api"]["pagination"] = {case["target"]: {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"}}
+
+    start = time.perf_counter()
+    with metrics.track(case["name"]):
+        if case["path"] in ("db", "landing"):
+            plan = {col: DatabaseETL.SOURCE_TYPE_CONVERSIONS.get(SOURCE_TYPES[kind]) for col, kind in case["kinds"].items()}
+            query = f"SELECT * FROM {case['source_object']}"
+            if case["path"] == "db":
+                rows, _, _ = etl._load_query(record, query, {}, None, plan)
+            else:
+                # SQLite has no INFORMATION_SCHEMA, so the extract half is the query load; landing and loading run as in production
+                etl._copy_from_source = lambda record: etl._load_query(record, query, {}, None, plan)[0]
+                rows = etl._copy_through_landing(record)
+        elif case["path"] == "api":
+            rows = etl._copy_single_record_api(record)
+        else:
+            rows = etl._copy_flat_file(record, case["file"])
+    elapsed = time.perf_counter() - start
+
+    stages = metrics.report([case["name"]])[0]["stages"]
+    return {
+        "rows": int(rows),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1),
+        "peak_rss_mb": round(peak_rss_mb() - baseline_rss, 1),
+        "stages": {name: {"seconds": stage["seconds"], "calls": stage["calls"]} for name, stage in stages.items()},
+    }
+
+
+def prepare_cases(workdir, staging_url, schema, profiles, paths, rows, width, api_rows, seed):
+    """Generates the synthetic sources for every (profile, path) pair and empty staging targets."""
+    source_url = f"sqlite:///{os.path.join(workdir, 'source.db')}"
+    source = create_engine(source_url)
+    staging = create_engine(staging_url)
+    cases, servers = [], []
+
+    for profile in profiles:
+        df, kinds = synthetic_table(profile, rows, width, seed)
+        for path in paths:
+            name = f"{profile}/{path}"
+            target = f"bench_{profile}_{path}"
+            case = {"name": name, "path": path, "target": target, "schema": schema, "kinds": kinds, "source_url": source_url}
+            frame = df
+
+            if path in ("db", "landing"):
+                if path == "db" or "db" not in paths:
+                    df.to_sql(f"src_{profile}", source, if_exists="replace", index=False, chunksize=10000)
+                case["source_object"] = f"src_{profile}"
+                if path == "landing":
+                    case["landing_root"] = os.path.join(workdir, "landing")
+            elif path == "csv":
+                case["file"] = os.path.join(workdir, f"{profile}.csv")
+                df.to_csv(case["file"], index=False)
+            elif path == "parquet":
+                case["file"] = os.path.join(workdir, f"{profile}.parquet")
+                df.to_parquet(case["file"], index=False, row_group_size=50000)
+            else:
+                frame = df.head(api_rows)
+                server = StubAPI(json.loads(frame.to_json(orient="records", date_format="iso")))
+                servers.append(server)
+                case["api_url"] = server.url
+
+            with staging.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{target}"))
+            frame.head(0).to_sql(target, staging, schema=schema, index=False)
+            case["expected_rows"] = len(frame)
+            cases.append(case)
+    return cases, servers
+
+
+def compare(results, baseline, threshold):
+    """Returns the regressions of ``results`` against ``baseline`` beyond ``threshold`` (a fraction)."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["rows_per_sec"] < base["rows_per_sec"] * (1 - threshold):
+            regressions.append(f"{name}: {result['rows_per_sec']:,.0f} rows/sec vs baseline {base['rows_per_sec']:,.0f}")
+        if base.get("peak_rss_mb") and result["peak_rss_mb"] > max(base["peak_rss_mb"] * (1 + threshold), base["peak_rss_mb"] + 16):
+            regressions.append(f"{name}: {result['peak_rss_mb']:.1f} MB peak RSS vs baseline {base['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="SQLAlchemy URL of a PostgreSQL staging database (default: a local SQLite file)")
+    parser.add_argument("--schema", help="Staging schema (default: public on PostgreSQL, main on SQLite)")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="Table profiles, delimited by ','")
+    parser.add_argument("--paths", default=",".join(PATHS), help="Load paths, delimited by ','")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--width", type=int, help="Columns per table (default: per profile)")
+    parser.add_argument("--api_rows", type=int, help="Rows served by the stub API (default: rows / 10)")
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file (default: benchmarks/baselines.json)")
+    parser.add_argument("--save_baseline", action="store_true", help="Store this run as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed regression as a fraction (default: 0.2)")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    profiles = [p for p in args.profiles.split(",") if p]
+    paths = [p for p in args.paths.split(",") if p]
+    unknown = sorted(set(profiles) - set(PROFILES)) + sorted(set(paths) - set(PATHS))
+    if unknown:
+        parser.error(f"unknown profiles/paths: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="srctostg-bench-") as workdir:
+        staging_url = args.url or f"sqlite:///{os.path.join(workdir, 'staging.db')}"
+        schema = args.schema or ("public" if args.url else "main")
+        cases, servers = prepare_cases(
+            workdir, staging_url, schema, profiles, paths, args.rows, args.width, args.api_rows or max(1, args.rows // 10), args.seed,
+        )
+
+        results = {}
+        context = multiprocessing.get_context("spawn")
+        try:
+            for case in cases:
+                with context.Pool(1) as pool:
+                    result = pool.apply(run_case, (case, staging_url, args.chunksize))
+                if result["rows"] != case["expected_rows"]:
+                    raise RuntimeError(f"{case['name']} loaded {result['rows']} rows, expected {case['expected_rows']}")
+                results[case["name"]] = result
+                stages = "  ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in result["stages"].items())
+                print(f"{case['name']:<22} {result['rows']:>9} rows  {result['seconds']:8.2f} s  {result['rows_per_sec']:12,.0f} rows/sec  "
+                      f"{result['peak_rss_mb']:8.1f} MB  | {stages}")
+        finally:
+            for server in servers:
+                server.close()
+            with create_engine(staging_url).begin() as conn:
+                for case in cases:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {schema}.{case['target']}"))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({name: {"rows_per_sec": r["rows_per_sec"], "peak_rss_mb": r["peak_rss_mb"]} for name, r in results.items()})
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=4, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save_baseline to record one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"Regressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print(f"No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import json
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from SrctoStg.api import APIExtractor
+
+ROWS = [{"id": i} for i in range(250)]
+
+
+class StubServer:
+    """Serves ``ROWS`` through one pagination style; ``respond`` maps (query, call number) to (status, headers, body)."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                with stub.lock:
+                    stub.calls.append(query)
+                    call = len(stub.calls)
+                status, headers, body = stub.respond(parsed.path, query, call, stub.url)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in {"Content-Type": "application/json", **headers}.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/records"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(respond):
+        servers.append(StubServer(respond))
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def extract(server, pagination, **settings):
+    extractor = APIExtractor({"page_size": 100, "concurrency": 3, "rate_limit": 0, "backoff": 0.01, "retries": 3,
+                              "pagination": {"stub": pagination}, **settings})
+    record = SimpleNamespace(sourcetype="API", targetobject="stub", apiurl=server.url, apimethod="GET",
+                             apiqueryparameters=None, apirequestbody=None, apiaccesstoken=None)
+    try:
+        return [row for page in extractor.extract(record) for row in page]
+    finally:
+        extractor.close()
+
+
+def offset_pages(cap=None, total=False, has_more=False):
+    def respond(path, query, call, url):
+        size = min(int(query["limit"]), cap or len(ROWS))
+        offset = int(query["offset"])
+        body = {"data": ROWS[offset:offset + size]}
+        if total:
+            body["total"] = len(ROWS)
+        if has_more:
+            body["has_more"] = offset + size < len(ROWS)
+        return 200, {}, body
+    return respond
+
+
+def numbered_pages(cap=None, missing=None):
+    def respond(path, query, call, url):
+        size = min(int(query["pageSize"]), cap or len(ROWS))
+        page = int(query["pageNumber"])
+        rows = ROWS[(page - 1) * size:page * size]
+        if missing is not None and not rows:
+            return missing, {}, {"error": "no such page"}
+        return 200, {}, {"data": rows}
+    return respond
+
+
+def test_cursor_pagination(serve):
+    def respond(path, query, call, url):
+        start = int(query.get("after", 0))
+        body = {"results": ROWS[start:start + int(query["limit"])]}
+        if start + int(query["limit"]) < len(ROWS):
+            body["paging"] = {"next": {"after": str(start + int(query["limit"]))}}
+        return 200, {}, body
+
+    server = serve(respond)
+    spec = {"type": "cursor", "records": "results", "cursor": "paging.next.after", "cursor_param": "after", "size_param": "limit"}
+    assert extract(server, spec) == ROWS
+    assert len(server.calls) == 3
+
+
+def test_next_url_pagination(serve):
+    def respond(path, query, call, url):
+        start = int(query.get("start", 0))
+        body = {"records": ROWS[start:start + 100]}
+        if start + 100 < len(ROWS):
+            body["nextRecordsUrl"] = f"/records?start={start + 100}"
+        return 200, {}, body
+
+    server = serve(respond)
+    assert extract(server, {"type": "next_url", "records": "records", "next_url": "nextRecordsUrl"}) == ROWS
+
+
+def test_link_pagination(serve):
+    def respond(path, query, call, url):
+        start = int(query.get("start", 0))
+        headers = {"Link": f'<{url}?start={start + 100}>; rel="next"'} if start + 100 < len(ROWS) else {}
+        return 200, headers, ROWS[start:start + 100]
+
+    server = serve(respond)
+    assert extract(server, {"type": "link"}) == ROWS
+
+
+def test_offset_pagination(serve):
+    server = serve(offset_pages())
+    assert extract(server, {"type": "offset", "records": "data"}) == ROWS
+
+
+def test_page_pagination(serve):
+    server = serve(numbered_pages())
+    spec = {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"}
+    assert extract(server, spec) == ROWS
+
+
+def test_offset_pagination_follows_a_capped_page_size(serve):
+    server = serve(offset_pages(cap=40))
+    assert extract(server, {"type": "offset", "records": "data"}) == ROWS
+
+
+def test_page_pagination_follows_a_capped_page_size(serve):
+    server = serve(numbered_pages(cap=40))
+    spec = {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"}
+    assert extract(server, spec) == ROWS
+
+
+def test_reported_total_stops_without_an_empty_page(serve):
+    server = serve(offset_pages(total=True))
+    assert extract(server, {"type": "offset", "records": "data", "total": "total"}) == ROWS
+    assert len(server.calls) == 3
+
+
+def test_has_more_stops_without_an_empty_page(serve):
+    server = serve(offset_pages(has_more=True))
+    assert extract(server, {"type": "offset", "records": "data", "has_more": "has_more"}, concurrency=1) == ROWS
+    assert len(server.calls) == 3
+
+
+def test_client_error_past_the_last_page_ends_the_data(serve):
+    server = serve(numbered_pages(cap=50, missing=404))
+    spec = {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"}
+    assert extract(server, spec) == ROWS
+
+
+def test_client_error_before_the_last_page_raises(serve):
+    def respond(path, query, call, url):
+        if query["pageNumber"] == "2":
+            return 400, {}, {"error": "bad request"}
+        return numbered_pages()(path, query, call, url)
+
+    server = serve(respond)
+    spec = {"type": "page", "records": "data", "page_param": "pageNumber", "size_param": "pageSize"}
+    with pytest.raises(requests.HTTPError):
+        extract(server, spec)
+
+
+@pytest.mark.parametrize("status, headers", [(429, {"Retry-After": "0"}), (503, {})])
+def test_throttled_and_failed_responses_are_retried(serve, status, headers):
+    def respond(path, query, call, url):
+        if call == 1:
+            return status, headers, {"error": "try again"}
+        return offset_pages()(path, query, call, url)
+
+    server = serve(respond)
+    assert extract(server, {"type": "offset", "records": "data"}, concurrency=1) == ROWS
+
+
+def test_persistent_server_errors_raise(serve):
+    server = serve(lambda path, query, call, url: (500, {}, {"error": "down"}))
+    with pytest.raises(requests.HTTPError):
+        extract(server, {"type": "offset", "records": "data"}, retries=2)
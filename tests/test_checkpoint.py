@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+
+from SrctoStg.checkpoint import CheckpointStore, SegmentCheckpoint
+
+RECORD = SimpleNamespace(sourceid=7, targetobject="orders")
+
+
+class RecordingStore:
+    """Stands in for CheckpointStore and remembers what each save would have written, and on which connection."""
+
+    def __init__(self):
+        self.saves = []
+
+    def save(self, conn, segment):
+        self.saves.append((conn, segment.last_key, segment.rows, segment.high_watermark, segment.done))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CheckpointStore(create_engine(f"sqlite:///{tmp_path / 'staging.db'}"), "main")
+
+
+def test_range_segments_bind_their_bounds():
+    segment = SegmentCheckpoint(RecordingStore(), RECORD, 0, "id >= :range_start AND id < :range_end", 0, 1000)
+    assert segment.query({"watermark": "2024-01-01"}) == (
+        "id >= :range_start AND id < :range_end", {"watermark": "2024-01-01", "range_start": 0, "range_end": 1000}, None,
+    )
+
+
+def test_keyed_segments_resume_after_the_last_committed_key():
+    segment = SegmentCheckpoint(RecordingStore(), RECORD, 1, "id >= :range_start", 100, None, key="id", last_key=250)
+    predicate, params, order_by = segment.query({})
+    assert predicate == "(id >= :range_start) AND id > :checkpoint_key"
+    assert params == {"range_start": 100, "range_end": None, "checkpoint_key": 250}
+    assert order_by == "id"
+
+
+def test_keyed_segments_start_from_the_beginning():
+    segment = SegmentCheckpoint(RecordingStore(), RECORD, 0, None, key="id")
+    assert segment.query({}) == (None, {}, "id")
+
+
+def test_advance_records_each_batch_on_its_connection():
+    store = RecordingStore()
+    segment = SegmentCheckpoint(store, RECORD, 0, key="id")
+    segment.advance("tx1", 500, 500, "2024-01-02")
+    segment.advance("tx2", 400, 100, None)
+    assert store.saves == [("tx1", 500, 500, "2024-01-02", False), ("tx2", 500, 600, "2024-01-02", False)]
+
+
+def test_finish_counts_rows_only_for_single_transaction_segments():
+    keyed = SegmentCheckpoint(RecordingStore(), RECORD, 0, key="id", rows=600)
+    keyed.finish(rows=600)
+    assert (keyed.rows, keyed.done) == (600, True)
+
+    store = RecordingStore()
+    whole = SegmentCheckpoint(store, RECORD, 1)
+    whole.finish("tx", 1000, "2024-01-03")
+    assert store.saves == [("tx", None, 1000, "2024-01-03", True)]
+
+
+def test_store_plans_and_reloads_segments(store):
+    ranges = [("id < :range_end", {"range_start": None, "range_end": 100}), ("id >= :range_start", {"range_start": 100, "range_end": None})]
+    first, second = store.plan(RECORD, "abc", ranges, key="id")
+    with store.engine.begin() as conn:
+        first.advance(conn, 99, 99, None)
+    first.finish()
+
+    loaded = store.load(RECORD, "abc")
+    assert [(s.segment, s.predicate, s.range_start, s.range_end, s.key, s.last_key, s.rows, s.done) for s in loaded] == [
+        (0, "id < :range_end", None, 100, "id", 99, 99, True),
+        (1, "id >= :range_start", 100, None, "id", None, 0, False),
+    ]
+
+
+def test_store_discards_checkpoints_of_a_changed_extract(store):
+    store.plan(RECORD, "abc", [(None, {})])
+    assert store.load(RECORD, "def") == []
+    assert store.load(RECORD, "abc") == []
+
+
+def test_replanning_replaces_previous_segments(store):
+    store.plan(RECORD, "abc", [(None, {}), (None, {})])
+    store.plan(RECORD, "abc", [(None, {})])
+    assert [segment.segment for segment in store.load(RECORD, "abc")] == [0]
+    store.clear(RECORD)
+    assert store.load(RECORD, "abc") == []
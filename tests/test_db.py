@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+from SrctoStg.db import DatabaseETL
+
+
+@pytest.fixture
+def etl():
+    engine = create_engine("sqlite://")
+    return DatabaseETL.from_engines("SQL Server", engine, engine)
+
+
+def metadata(**changes):
+    columns = pd.DataFrame({
+        "column_id": [1, 2, 3],
+        "column_name": ["id", "name", "created"],
+        "source_data_type": ["int", "nvarchar", "datetime2"],
+        "length": [4, 100, 8],
+        "precisions": [10, 0, 27],
+        "scale": [0, 0, 7],
+        "nullable": [False, True, True],
+        "key_constraint": ["PRIMARY KEY", None, None],
+    })
+    for column, values in changes.items():
+        columns[column] = values
+    return columns
+
+
+def test_fingerprint_is_stable():
+    assert DatabaseETL._schema_fingerprint(metadata()) == DatabaseETL._schema_fingerprint(metadata())
+
+
+def test_fingerprint_ignores_columns_outside_the_schema():
+    # ✅ register_schema tags the frame with source_type etc. after fingerprinting it
+    tagged = metadata(source_type="SQL Server", target_table="orders")
+    assert DatabaseETL._schema_fingerprint(tagged) == DatabaseETL._schema_fingerprint(metadata())
+
+
+@pytest.mark.parametrize("column, values", [
+    ("source_data_type", ["bigint", "nvarchar", "datetime2"]),
+    ("length", [4, 200, 8]),
+    ("nullable", [False, False, True]),
+    ("key_constraint", [None, None, None]),
+    ("column_name", ["id", "title", "created"]),
+])
+def test_fingerprint_changes_with_the_schema(column, values):
+    assert DatabaseETL._schema_fingerprint(metadata(**{column: values})) != DatabaseETL._schema_fingerprint(metadata())
+
+
+def test_fingerprint_changes_when_a_column_is_added():
+    added = pd.concat([metadata(), pd.DataFrame({"column_id": [4], "column_name": ["total"], "source_data_type": ["money"]})])
+    assert DatabaseETL._schema_fingerprint(added) != DatabaseETL._schema_fingerprint(metadata())
+
+
+def test_unchanged_schema_skips_registration(etl, monkeypatch):
+    key = ("SQL Server", "dbo", "Orders", "orders")
+    monkeypatch.setattr(etl, "_stored_fingerprints", lambda: {key: DatabaseETL._schema_fingerprint(metadata())})
+    monkeypatch.setattr(etl, "_staging_tables", lambda schema: {"orders"})
+    monkeypatch.setattr(etl, "call_sp", lambda: pytest.fail("usp_srctomain_lookup called for an unchanged schema"))
+    assert etl.register_schema(metadata(), *key, "stg") is False
+
+
+def record(sourceobject="Orders"):
+    return SimpleNamespace(sourcetype="SQL Server", sourceschema="dbo", sourceobject=sourceobject)
+
+
+@pytest.fixture
+def plans(monkeypatch):
+    monkeypatch.setattr(DatabaseETL, "_conversion_plans", {})
+    return DatabaseETL._conversion_plans
+
+
+def test_conversion_plan_maps_source_types(etl, plans):
+    columns = {"id": "INT", "flag": "bit", "at": "datetimeoffset", "shape": "geography", "name": "nvarchar", "price": "money"}
+    assert etl._conversion_plan(record(), columns) == {
+        "id": "Int32", "flag": "Int8", "at": "datetimetz", "shape": "string", "name": "string", "price": None,
+    }
+
+
+def test_conversion_plans_are_cached_per_object_and_column_set(etl, plans):
+    plan = etl._conversion_plan(record(), {"id": "int"})
+    assert etl._conversion_plan(record(), {"id": "int"}) is plan
+    assert etl._conversion_plan(record(), {"id": "bigint"}) == {"id": "Int64"}
+    assert etl._conversion_plan(record("Lines"), {"id": "int"}) is not plan
+    assert len(plans) == 3
+
+
+def test_conversion_plan_casts_a_batch(etl):
+    df = pd.DataFrame({
+        "id": [1.0, None, 3.0],
+        "at": ["2024-03-01T12:00:00+02:00", None, "2024-03-01T10:00:00+00:00"],
+        "created": ["2024-03-01 08:00:00", "bad", None],
+        "price": [1.5, 2.5, 3.5],
+    })
+    out = etl.apply_conversion_plan(df, {"id": "Int32", "at": "datetimetz", "created": "datetime", "price": None, "missing": "Int64"})
+    assert out["id"].dtype == "Int32" and out["id"].isna().tolist() == [False, True, False]
+    assert out["at"].tolist()[0] == out["at"].tolist()[2] == pd.Timestamp("2024-03-01 10:00:00", tz="UTC")
+    assert pd.api.types.is_datetime64_dtype(out["created"]) and out["created"].isna().tolist() == [False, True, True]
+    assert out["price"].dtype == "float64"
+
+
+def test_string_columns_are_categorised_in_the_loads_copy_only(etl, plans):
+    plan = etl._conversion_plan(record(), {"status": "varchar", "note": "varchar"})
+    df = pd.DataFrame({"status": ["open", "closed"] * 1000, "note": [str(i) for i in range(2000)]})
+
+    load_plan = dict(plan)
+    out = etl.apply_conversion_plan(df, load_plan)
+    assert isinstance(out["status"].dtype, pd.CategoricalDtype)
+    assert not isinstance(out["note"].dtype, pd.CategoricalDtype)
+    assert load_plan == {"status": "category", "note": "object"}
+    assert plan == {"status": "string", "note": "string"}
+
+
+def test_failed_cast_leaves_the_batch_and_plan_unchanged(etl):
+    plan = {"id": "Int32", "qty": "Int16"}
+    df = pd.DataFrame({"id": ["1", "x"], "qty": [1.0, 2.0]})
+    out = etl.apply_conversion_plan(df, plan)
+    assert out["id"].tolist() == ["1", "x"]
+    assert out["qty"].dtype == "Int16"
+    assert plan == {"id": "Int32", "qty": "Int16"}
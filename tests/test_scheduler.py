@@ -0,0 +1,106 @@
+import threading
+from types import SimpleNamespace
+
+from SrctoStg.scheduler import DagScheduler
+
+
+def record(sourceid, targetobject, depsource=None, sourcecallingseq=None, sourcename=None):
+    return SimpleNamespace(sourceid=sourceid, targetobject=targetobject, sourceobject=targetobject,
+                           depsource=depsource, sourcecallingseq=sourcecallingseq, sourcename=sourcename)
+
+
+def run(records, fail=(), **settings):
+    """Runs ``records`` through the scheduler; returns the call order and the results."""
+    order = []
+    lock = threading.Lock()
+
+    def process(rec):
+        with lock:
+            order.append(rec.targetobject)
+        if rec.targetobject in fail:
+            raise RuntimeError(f"{rec.targetobject} failed")
+        return rec.targetobject
+
+    results = DagScheduler(records, **{"max_workers": 1, **settings}).run(process)
+    return order, results
+
+
+def status(results, rec):
+    return results[DagScheduler.label(rec)][0]
+
+
+def test_ready_records_run_by_calling_sequence():
+    records = [record(1, "c", sourcecallingseq=3), record(2, "a", sourcecallingseq=1),
+               record(3, "b", sourcecallingseq=2), record(4, "z")]
+    order, results = run(records)
+    assert order == ["a", "b", "c", "z"]
+    assert all(outcome == (DagScheduler.SUCCEEDED, rec.targetobject) for rec, outcome in zip(records, results.values()))
+
+
+def test_dependencies_run_before_their_dependents():
+    records = [record(1, "report", depsource="2,3", sourcecallingseq=1),
+               record(2, "orders", depsource="3", sourcecallingseq=2),
+               record(3, "customers", sourcecallingseq=3)]
+    order, _ = run(records)
+    assert order == ["customers", "orders", "report"]
+
+
+def test_dependencies_match_source_names():
+    records = [record(1, "report", depsource="CRM", sourcecallingseq=1), record(2, "accounts", sourcename="crm")]
+    order, _ = run(records)
+    assert order == ["accounts", "report"]
+
+
+def test_missing_dependencies_count_as_satisfied():
+    order, results = run([record(1, "orders", depsource="99, none")])
+    assert order == ["orders"]
+    assert status(results, record(1, "orders")) == DagScheduler.SUCCEEDED
+
+
+def test_a_failure_skips_everything_downstream():
+    records = [record(1, "customers"), record(2, "orders", depsource="1"), record(3, "report", depsource="2"),
+               record(4, "products")]
+    order, results = run(records, fail={"customers"})
+    assert order == ["customers", "products"]
+    assert [status(results, rec) for rec in records] == [DagScheduler.FAILED, DagScheduler.SKIPPED,
+                                                         DagScheduler.SKIPPED, DagScheduler.SUCCEEDED]
+    assert isinstance(results[DagScheduler.label(records[0])][1], RuntimeError)
+
+
+def test_cycles_are_reported_and_not_processed():
+    records = [record(1, "a", depsource="2"), record(2, "b", depsource="1"), record(3, "c")]
+    order, results = run(records)
+    assert order == ["c"]
+    assert results[DagScheduler.label(records[0])] == (DagScheduler.FAILED, "dependency cycle")
+    assert results[DagScheduler.label(records[1])] == (DagScheduler.FAILED, "dependency cycle")
+
+
+def test_a_record_never_waits_on_its_own_source():
+    # ✅ Rows of one header share its SourceId, SourceName and DepSource
+    records = [record(7, "orders", depsource="7,ERP", sourcename="ERP"), record(7, "lines", depsource="7,ERP", sourcename="ERP"),
+               record(8, "stock", depsource="ERP", sourcename="WMS")]
+    scheduler = DagScheduler(records)
+    assert scheduler.upstream == {0: set(), 1: set(), 2: {0, 1}}
+
+
+def test_numeric_dependencies_only_match_source_ids():
+    scheduler = DagScheduler([record(1, "orders", sourcename="2"), record(3, "report", depsource="2")])
+    assert scheduler.upstream == {0: set(), 1: set()}
+
+
+def test_limits_cap_concurrent_records_per_key():
+    running, peak = [], []
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def process(rec):
+        with lock:
+            running.append(rec)
+            peak.append(len(running))
+        release.wait(0.05)
+        with lock:
+            running.remove(rec)
+
+    records = [record(index, f"t{index}") for index in range(6)]
+    DagScheduler(records, max_workers=4, limits=lambda rec: [("server", 2)]).run(process)
+    assert max(peak) == 2
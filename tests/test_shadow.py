@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+
+import SrctoStg.db
+from SrctoStg.db import DatabaseETL
+from SrctoStg.shadow import ShadowTable
+
+RECORD = SimpleNamespace(sourceid=7, targetobject="orders", targetschemaname="stg")
+
+
+class FakeShadow:
+    """Records what the load did with its shadow table instead of touching a database."""
+
+    instances = []
+
+    def __init__(self, table):
+        self.table = table
+        self.events = []
+        FakeShadow.instances.append(self)
+
+    @classmethod
+    def from_settings(cls, engine, schema, table, settings):
+        return cls(table)
+
+    def ensure(self):
+        return self.table + ShadowTable.SUFFIX
+
+    def swap(self):
+        self.events.append("swap")
+
+    def discard(self):
+        self.events.append("discard")
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.tables = []
+
+    def write(self, df, table, schema, conn=None):
+        self.tables.append(table)
+        return len(df)
+
+
+@pytest.fixture
+def etl(monkeypatch):
+    FakeShadow.instances = []
+    monkeypatch.setattr(SrctoStg.db, "ShadowTable", FakeShadow)
+    engine = create_engine("sqlite://")
+    etl = DatabaseETL.from_engines("SQL Server", engine, engine)
+    etl.writer = RecordingWriter()
+    return etl
+
+
+def test_full_refresh_writes_to_the_shadow_and_swaps_it_in(etl):
+    with etl._full_refresh(RECORD):
+        etl._write(pd.DataFrame({"id": [1, 2]}), RECORD)
+    assert etl.writer.tables == ["orders__shadow"]
+    assert FakeShadow.instances[0].events == ["swap"]
+    assert etl._shadows == {}
+
+
+def test_failed_full_refresh_discards_the_shadow(etl):
+    with pytest.raises(RuntimeError):
+        with etl._full_refresh(RECORD):
+            etl._write(pd.DataFrame({"id": [1]}), RECORD)
+            raise RuntimeError("extract failed")
+    assert FakeShadow.instances[0].events == ["discard"]
+    assert etl._shadows == {}
+
+
+def test_disabled_full_refresh_writes_to_the_live_table(etl):
+    with etl._full_refresh(RECORD, enabled=False):
+        etl._write(pd.DataFrame({"id": [1]}), RECORD)
+    assert etl.writer.tables == ["orders"]
+    assert FakeShadow.instances == []
+
+
+def test_swap_needs_postgresql_staging():
+    engine = create_engine("sqlite://")
+    assert DatabaseETL.from_engines("SQL Server", engine, engine, load_mode="swap")._swap_enabled() is False
+
+
+def test_shadow_names_keep_their_suffix_within_the_identifier_limit():
+    name = ShadowTable._name("x" * 80, ShadowTable.SUFFIX)
+    assert len(name) == 63 and name.endswith(ShadowTable.SUFFIX)
+    assert ShadowTable._name("orders", ShadowTable.OLD_SUFFIX) == "orders__old"
+
+
+@pytest.mark.parametrize("definition, expected", [
+    ("CREATE INDEX ix_orders_date ON stg.orders USING btree (order_date)",
+     'CREATE INDEX "ix_orders_date__shadow" ON "stg"."orders__shadow" USING btree (order_date)'),
+    ('CREATE UNIQUE INDEX "Ix ""Code""" ON ONLY "stg"."orders" USING btree (code)',
+     'CREATE UNIQUE INDEX "Ix ""Code""__shadow" ON ONLY "stg"."orders__shadow" USING btree (code)'),
+])
+def test_index_definitions_are_pointed_at_the_shadow(definition, expected):
+    shadow = ShadowTable(None, "stg", "orders")
+    name = 'Ix "Code"' if "Code" in definition else "ix_orders_date"
+    temp = shadow._quote(ShadowTable._name(name, ShadowTable.SUFFIX))
+    rewritten = ShadowTable.INDEX_PATTERN.sub(lambda m: f"{m.group(1)}{temp}{m.group(3)}{shadow._qualified(shadow.name)}", definition)
+    assert rewritten == expected
@@ -0,0 +1,79 @@
+import datetime as dt
+
+import pandas as pd
+import pyarrow as pa
+
+from SrctoStg.writers import PostgresCopyWriter
+
+
+class CapturingWriter(PostgresCopyWriter):
+    """Keeps the COPY statement and payload instead of sending them to a database."""
+
+    def __init__(self):
+        super().__init__(engine=None)
+        self.copies = []
+
+    def _copy(self, sql, buffer, conn=None):
+        value = buffer.getvalue()
+        self.copies.append((sql, value.decode() if isinstance(value, bytes) else value))
+
+
+def render(df):
+    writer = CapturingWriter()
+    assert writer.write(df, "orders", "ods") == len(df)
+    return writer.copies[0]
+
+
+def fields(payload):
+    return [line.split("\t") for line in payload.split("\n")[:-1]]
+
+
+def test_copy_statement_quotes_identifiers():
+    sql, _ = render(pd.DataFrame({"Order Id": [1], 'say "hi"': ["x"]}))
+    assert sql.startswith('COPY "ods"."orders" ("Order Id", "say ""hi""") FROM STDIN WITH (FORMAT text')
+
+
+def test_null_and_empty_string_stay_distinct():
+    _, payload = render(pd.DataFrame({"name": ["a", "", None]}))
+    assert fields(payload) == [["a"], [""], ["\\N"]]
+
+
+def test_special_characters_are_escaped():
+    _, payload = render(pd.DataFrame({"note": ["tab\there", "line\nbreak", "back\\slash", "cr\rx"]}))
+    assert fields(payload) == [["tab\\there"], ["line\\nbreak"], ["back\\\\slash"], ["cr\\rx"]]
+
+
+def test_bytes_become_bytea_hex():
+    _, payload = render(pd.DataFrame({"blob": [b"\x00\xffA", None]}))
+    assert fields(payload) == [["\\\\x00ff41"], ["\\N"]]
+
+
+def test_timezone_aware_timestamps_keep_their_offset():
+    stamp = pd.Timestamp("2024-03-01 12:30:00", tz=dt.timezone(dt.timedelta(hours=2)))
+    _, payload = render(pd.DataFrame({"at": [stamp, pd.NaT]}))
+    assert fields(payload) == [["2024-03-01 12:30:00+02:00"], ["\\N"]]
+
+
+def test_whole_floats_render_as_integers():
+    _, payload = render(pd.DataFrame({"qty": [1.0, None, 3.0], "price": [1.5, None, 2.0]}))
+    assert fields(payload) == [["1", "1.5"], ["\\N", "\\N"], ["3", "2.0"]]
+
+
+def test_categories_are_escaped():
+    _, payload = render(pd.DataFrame({"code": pd.Categorical(["a\tb", None, "a\tb"])}))
+    assert fields(payload) == [["a\\tb"], ["\\N"], ["a\\tb"]]
+
+
+def test_empty_frames_are_not_copied():
+    writer = CapturingWriter()
+    assert writer.write(pd.DataFrame({"id": []}), "orders", "ods") == 0
+    assert writer.copies == []
+
+
+def test_arrow_batches_keep_null_apart_from_empty_string():
+    batch = pa.RecordBatch.from_pydict({"name": ["a", "", None], "blob": [b"\x01", None, b"\xff"]})
+    writer = CapturingWriter()
+    assert writer.write_arrow(batch, "orders", "ods") == 3
+    sql, payload = writer.copies[0]
+    assert sql.endswith("FROM STDIN WITH (FORMAT csv)")
+    assert payload.split("\n")[:-1] == ['"a","\\x01"', '"",', ',"\\xff"']